@@ -0,0 +1,115 @@
+# Per-request latency of bare requests.get vs the shared keep-alive session.
+#
+# Starts a local HTTPS server (self-signed certificate from the openssl CLI)
+# that answers like the GitHub repos endpoint, then times N sequential
+# requests with each client.
+#
+# Usage:
+#   python benchmarks/bench_http.py --requests=200
+import argparse
+import gzip
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import urllib3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+from github_client import make_session
+
+# Roughly the size of a /repos/:owner/:repo response
+BODY = json.dumps(
+    {"full_name": "owner/repo", "stargazers_count": 12345, "description": "x" * 4000}
+).encode()
+BODY_GZIP = gzip.compress(BODY)
+
+
+class GitHubLikeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_GET(self):
+        body = BODY
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = BODY_GZIP
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Remaining", "4999")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_tls_server(workdir: str):
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+        + ["-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GitHubLikeHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(fn, n: int) -> list:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = fn()
+        response.json()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<22} mean {statistics.mean(latencies):7.2f} ms"
+        f"  p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP client microbenchmark.")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_tls_server(workdir)
+        url = f"https://127.0.0.1:{server.server_address[1]}/repos/owner/repo"
+        headers = {"Accept": "application/vnd.github.v3+json"}
+
+        bare = timed(lambda: requests.get(url, headers=headers, verify=False), args.requests)
+        session = make_session()
+        pooled = timed(
+            lambda: session.get(url, headers=headers, verify=False), args.requests
+        )
+        server.shutdown()
+
+    print(f"{args.requests} sequential requests against a local TLS server")
+    report("requests.get (before)", bare)
+    report("shared session (after)", pooled)
+    print(f"speedup: {statistics.mean(bare) / statistics.mean(pooled):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
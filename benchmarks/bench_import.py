@@ -0,0 +1,92 @@
+# Start-up cost of the stargazers-py CLI.
+#
+# Runs each case with `python -X importtime`, sums the import time and checks
+# that no heavy library a command does not need was loaded. Exits non-zero on
+# a forbidden import or when a case exceeds its time budget, so it can guard
+# against regressions in CI or before a commit.
+#
+# Usage:
+#   python benchmarks/bench_import.py
+#   python benchmarks/bench_import.py --repeat=5 --budget-scale=2
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "stargazers-py")
+
+HEAVY = ["pandas", "numpy", "scipy", "matplotlib", "seaborn", "networkx", "openai"]
+PLOTTING = ["matplotlib", "seaborn", "networkx"]
+
+# (arguments, modules that must not be imported, budget in ms)
+CASES = [
+    (["--help"], HEAVY + ["requests"], 150),
+    (["fetch-stars", "--help"], HEAVY, 400),
+    (["pipeline", "--help"], HEAVY, 400),
+    (["star-trends", "--help"], PLOTTING + ["scipy", "openai"], 1500),
+    (["combine-emails", "--help"], PLOTTING + ["scipy", "openai"], 1500),
+]
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_case(args: list) -> tuple:
+    """Wall time (ms), import time (ms) and top-level modules imported."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", CLI] + args,
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    wall = (time.perf_counter() - start) * 1000
+    total, modules = 0, set()
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match[2]), len(match[3]), match[4]
+        modules.add(name.split(".")[0])
+        # Top-level entries (least indented) add up to the whole import time
+        if indent == 1:
+            total += cumulative
+    return wall, total / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for stargazers-py.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (median)")
+    parser.add_argument(
+        "--budget-scale", type=float, default=1.0, help="Multiply budgets (slow machines)"
+    )
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'command':<32}{'wall ms':>9}{'import ms':>11}{'budget':>8}  heavy imports")
+    for case_args, forbidden, budget in CASES:
+        runs = [run_case(case_args) for _ in range(args.repeat)]
+        wall = statistics.median(r[0] for r in runs)
+        imports = statistics.median(r[1] for r in runs)
+        modules = runs[-1][2]
+        heavy = sorted(m for m in HEAVY + ["requests"] if m in modules)
+        budget *= args.budget_scale
+        name = " ".join(case_args)
+        print(f"{name:<32}{wall:>9.0f}{imports:>11.0f}{budget:>8.0f}  {', '.join(heavy) or '-'}")
+
+        bad = sorted(m for m in forbidden if m in modules)
+        if bad:
+            failures.append(f"{name}: imports {', '.join(bad)}")
+        if imports > budget:
+            failures.append(f"{name}: {imports:.0f} ms of imports > {budget:.0f} ms budget")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
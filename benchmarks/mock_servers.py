@@ -0,0 +1,291 @@
+# Local stand-ins for the GitHub REST/GraphQL API and Azure OpenAI.
+#
+# Responses are deterministic functions of the request, so benchmark runs are
+# repeatable and never touch the network. Point the scripts at them with
+#   GITHUB_API_URL=http://127.0.0.1:<port>
+#   AZURE_OPENAI_ENDPOINT=http://127.0.0.1:<port>
+#
+# Usage:
+#   python benchmarks/mock_servers.py --latency-ms=50
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PER_PAGE = 100
+# Leads in the intro prompt: a "Login<TAB>..." header with tab-separated rows,
+# or JSON records
+HEADER_RE = re.compile(r"^Login(\t.*)?$", re.MULTILINE)
+RECORDS_RE = re.compile(r"\[\s*\{.*\}\s*\]", re.DOTALL)
+TOPICS = [
+    "llm", "LLMs", "ai-agents", "agents", "web-scraping", "crawler", "browser-automation",
+    "playwright", "python", "typescript", "machine-learning", "nlp", "rag", "chatgpt",
+    "openai", "automation", "data-extraction", "headless-chrome",
+]
+# Batched queries: `u0: user(login: "x") {...}`, `r1: repository(owner: "o", name: "r") {...}`
+ALIAS_RE = re.compile(r'(\w+):\s*(user|repository)\(([^)]*)\)')
+# A literal string or a $variable
+ARG_RE = re.compile(r'(\w+):\s*(?:"([^"]*)"|\$(\w+))')
+
+
+def _seed(text: str) -> int:
+    return zlib.crc32(text.encode())
+
+
+def _records(prompt: str) -> list:
+    header = HEADER_RE.search(prompt)
+    if header:
+        lines = prompt[header.start() :].splitlines()
+        columns = lines[0].split("\t")
+        return [dict(zip(columns, line.split("\t"))) for line in lines[1:] if line.strip()]
+    match = RECORDS_RE.search(prompt)
+    return json.loads(match.group(0)) if match else []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _send(self, status: int, payload, headers=None):
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class GitHubHandler(_Handler):
+    """Repos, users, paged stargazers, /rate_limit and /graphql."""
+
+    stargazers = 500
+    rate_headers = {
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": "4999",
+        "X-RateLimit-Reset": str(int(time.time()) + 3600),
+        "X-RateLimit-Resource": "core",
+    }
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["rate_limit"]:
+            bucket = {"limit": 5000, "remaining": 4999, "reset": int(time.time()) + 3600}
+            return self._send(200, {"resources": {"core": bucket, "graphql": bucket}})
+        if len(parts) == 3 and parts[0] == "repos":
+            return self._send(200, self._repo(f"{parts[1]}/{parts[2]}"), self.rate_headers)
+        if len(parts) == 4 and parts[0] == "repos" and parts[3] == "stargazers":
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            return self._stargazers(f"{parts[1]}/{parts[2]}", page)
+        if len(parts) == 2 and parts[0] == "users":
+            return self._send(200, self._user(parts[1]), self.rate_headers)
+        self._send(404, {"message": "Not Found"}, self.rate_headers)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/graphql":
+            return self._send(404, {"message": "Not Found"})
+        request = self._body()
+        aliases = ALIAS_RE.findall(request.get("query", ""))
+        variables = request.get("variables") or {}
+        if aliases:
+            data = {}
+            for alias, field, args in aliases:
+                args = {
+                    key: value if not name else variables.get(name, "")
+                    for key, value, name in ARG_RE.findall(args)
+                }
+                if field == "user":
+                    data[alias] = self._graphql_user(args["login"])
+                else:
+                    data[alias] = self._graphql_repo(f"{args['owner']}/{args['name']}")
+            return self._send(200, {"data": data}, self.rate_headers)
+        login = (request.get("variables") or {}).get("username", "")
+        self._send(200, {"data": {"user": self._graphql_user(login)}}, self.rate_headers)
+
+    def _repo(self, name: str) -> dict:
+        seed = _seed(name)
+        return {
+            "full_name": name,
+            "stargazers_count": seed % 50000,
+            "forks_count": seed % 5000,
+            "language": ["Python", "TypeScript", "Go", "Rust"][seed % 4],
+            "description": f"Synthetic repository {name}",
+            "topics": ["llm", "agents", "scraping"][: seed % 3 + 1],
+        }
+
+    def _user(self, login: str) -> dict:
+        seed = _seed(login)
+        return {
+            "login": login,
+            "name": login.title(),
+            "company": ["", "Stripe", "@google"][seed % 3],
+            "location": ["", "Berlin, Germany", "San Francisco, CA"][seed % 3],
+            "email": f"{login}@example.com" if seed % 5 == 0 else None,
+            "bio": "Building web agents" if seed % 2 else "",
+            "followers": seed % 1000,
+            "following": seed % 100,
+            "public_repos": seed % 60,
+            "created_at": "2018-06-01T00:00:00Z",
+        }
+
+    def _stargazers(self, repo: str, page: int):
+        start = (page - 1) * PER_PAGE
+        stop = min(start + PER_PAGE, self.stargazers)
+        users = [
+            {
+                "starred_at": "2024-01-01T00:00:00Z",
+                "user": {"login": f"user{i}", "id": i},
+            }
+            for i in range(start, stop)
+        ]
+        headers = dict(self.rate_headers)
+        if stop < self.stargazers:
+            host = self.headers.get("Host", "127.0.0.1")
+            headers["Link"] = f'<http://{host}/repos/{repo}/stargazers?page={page + 1}>; rel="next"'
+        self._send(200, users, headers)
+
+    def _graphql_repo(self, name: str) -> dict:
+        repo = self._repo(name)
+        topics = TOPICS[_seed(name) % len(TOPICS) :][: _seed(name) % 5]
+        return {
+            "nameWithOwner": name,
+            "stargazerCount": repo["stargazers_count"],
+            "description": repo["description"],
+            "primaryLanguage": {"name": repo["language"]},
+            "repositoryTopics": {"nodes": [{"topic": {"name": t}} for t in topics]},
+        }
+
+    def _graphql_user(self, login: str) -> dict:
+        seed = _seed(login)
+        days = [{"contributionCount": (seed >> i) % 4} for i in range(365)]
+        weeks = [{"contributionDays": days[i : i + 7]} for i in range(0, 365, 7)]
+        return {
+            "login": login,
+            "followers": {"totalCount": seed % 1000},
+            "pullRequests": {"totalCount": seed % 300},
+            "issues": {"totalCount": seed % 200},
+            "publicRepos": {"totalCount": seed % 60},
+            "contributionsCollection": {
+                "totalCommitContributions": seed % 2000,
+                "totalIssueContributions": seed % 200,
+                "totalPullRequestContributions": seed % 300,
+                "totalPullRequestReviewContributions": seed % 150,
+                "totalRepositoryContributions": seed % 40,
+                "restrictedContributionsCount": seed % 100,
+                "contributionCalendar": {
+                    "totalContributions": sum(d["contributionCount"] for d in days),
+                    "weeks": weeks,
+                },
+            },
+            "repositories": {"nodes": []},
+            "topRepositories": {"nodes": []},
+            "email": f"{login}@example.com" if seed % 5 == 0 else "",
+            "company": ["", "Stripe", "@google"][seed % 3],
+            "location": ["", "Berlin, Germany", "San Francisco, CA"][seed % 3],
+            "bio": "Building web agents" if seed % 2 else "",
+            "starredRepositories": {
+                "totalCount": seed % 400,
+                # Low numbers are starred most often
+                "nodes": [
+                    {"nameWithOwner": f"org{n}/repo{n}"}
+                    for n in {(seed >> i) % (i + 1) * 7 for i in range(seed % 100)}
+                ],
+            },
+        }
+
+
+class OpenAIHandler(_Handler):
+    """Azure OpenAI chat completions answering the intro prompt."""
+
+    def do_POST(self):
+        if not urlparse(self.path).path.endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": "Not Found"}})
+        request = self._body()
+        prompt = request["messages"][-1]["content"]
+        records = _records(prompt)
+        result = {
+            str(r.get("Login")): {
+                "intro": f"Hi {r.get('Name') or r.get('Login')}, I saw your work on GitHub.",
+                "score": round(_seed(str(r.get("Login"))) % 100 / 100, 2),
+            }
+            for r in records
+        }
+        content = json.dumps(result)
+        self._send(
+            200,
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4,
+                },
+            },
+        )
+
+
+def _start(handler, port: int, latency: float, **attrs):
+    handler = type(handler.__name__, (handler,), dict(latency=latency, **attrs))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_github(port: int = 0, latency: float = 0.0, stargazers: int = 500):
+    """Start the mock GitHub API in a thread; returns (server, base URL)."""
+    return _start(GitHubHandler, port, latency, stargazers=stargazers)
+
+
+def start_openai(port: int = 0, latency: float = 0.0):
+    """Start the mock Azure OpenAI endpoint in a thread; returns (server, base URL)."""
+    return _start(OpenAIHandler, port, latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock GitHub and OpenAI servers.")
+    parser.add_argument("--github-port", type=int, default=8781)
+    parser.add_argument("--openai-port", type=int, default=8782)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay per response")
+    parser.add_argument("--stargazers", type=int, default=500, help="Stargazers per repo")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    _, github = start_github(args.github_port, latency, args.stargazers)
+    _, openai = start_openai(args.openai_port, latency)
+    print(f"export GITHUB_API_URL={github}")
+    print(f"export AZURE_OPENAI_ENDPOINT={openai} AZURE_OPENAI_KEY=mock")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# End-to-end pipeline benchmark on synthetic data, fully offline.
+#
+# Generates a dataset with synthetic.py in a scratch directory, starts the
+# mock GitHub and OpenAI servers and times every stage as the real script
+# (interpreter start-up and imports included). Results are appended to
+# benchmarks/results.jsonl with the current commit, and each run is compared
+# with the previous one at the same scale.
+#
+# get_stars.py is not timed: it sleeps a second between repos on purpose.
+#
+# Usage:
+#   python benchmarks/run.py --stargazers=100000
+#   python benchmarks/run.py --stargazers=1000000 --stage=combine_emails --stage=index
+#   python benchmarks/run.py --replay=recordings/  # replay recorded GitHub calls
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_servers import start_github, start_openai
+from synthetic import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = os.path.join(ROOT, "benchmarks", "results.jsonl")
+
+# name -> (command relative to ROOT, modules it needs)
+STAGES = {
+    "combine_emails": (["emails/create_data.py", "--full"], ["pandas"]),
+    "index": (["utils/star_index.py", "index", "--cache", "stargazer_cache", "--rebuild"], ["scipy"]),
+    "cohorts": (["utils/cohorts.py"], ["scipy"]),
+    "star_trends": (["utils/star_trends.py", "--cache", "stargazer_cache"], ["pandas"]),
+    "score_leads": (["emails/create_personlized_message.py"], ["openai"]),
+    "github_stats": (["test_github_stats.py"], ["dotenv", "tabulate"]),
+}
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT, capture_output=True, text=True,
+        ).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_stage(name: str, workdir: str, env: dict) -> dict:
+    command, modules = STAGES[name]
+    missing = [m for m in modules if importlib.util.find_spec(m) is None]
+    if missing:
+        return {"stage": name, "status": "skipped", "reason": f"missing {', '.join(missing)}"}
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, os.path.join(ROOT, command[0])] + command[1:],
+        cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    result = {"stage": name, "seconds": round(elapsed, 3), "status": "ok"}
+    if proc.returncode != 0:
+        result["status"] = "failed"
+        result["error"] = proc.stderr.strip().splitlines()[-1:] or [""]
+    return result
+
+
+def previous_run(scale: int):
+    if not os.path.exists(RESULTS):
+        return None
+    last = None
+    with open(RESULTS) as f:
+        for line in f:
+            run = json.loads(line)
+            if run.get("stargazers") == scale:
+                last = run
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data.")
+    parser.add_argument("--stargazers", type=int, default=10000, help="Dataset scale")
+    parser.add_argument(
+        "--stage", action="append", choices=list(STAGES), help="Stages to run (default: all)"
+    )
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mock server latency")
+    parser.add_argument("--replay", help="Replay recorded GitHub responses from this folder")
+    parser.add_argument("--keep", help="Generate into this folder and keep it")
+    parser.add_argument("--no-save", action="store_true", help="Don't append to results.jsonl")
+    args = parser.parse_args()
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="stargazers-bench-")
+    start = time.perf_counter()
+    summary = generate(workdir, stargazers=args.stargazers)
+    print(
+        f"Generated {summary['stargazers']:,} stargazers in"
+        f" {time.perf_counter() - start:.1f}s ({workdir})"
+    )
+
+    latency = args.latency_ms / 1000
+    github, github_url = start_github(latency=latency)
+    openai, openai_url = start_openai(latency=latency)
+    env = dict(
+        os.environ,
+        GITHUB_API_URL=github_url,
+        GITHUB_TOKENS="bench-token",
+        AZURE_OPENAI_ENDPOINT=openai_url,
+        AZURE_OPENAI_KEY="mock",
+    )
+    env.pop("STARGAZERS_RECORD_DIR", None)
+    if args.replay:
+        env["STARGAZERS_REPLAY_DIR"] = os.path.abspath(args.replay)
+        env.pop("GITHUB_API_URL")
+
+    results = []
+    try:
+        for name in args.stage or list(STAGES):
+            result = run_stage(name, workdir, env)
+            results.append(result)
+    finally:
+        github.shutdown()
+        openai.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    previous = previous_run(args.stargazers)
+    before = {r["stage"]: r.get("seconds") for r in previous["stages"]} if previous else {}
+    print(f"\n{'stage':<16}{'seconds':>10}{'previous':>10}{'change':>9}")
+    for r in results:
+        if r["status"] != "ok":
+            detail = r.get("reason") or " ".join(r.get("error", []))
+            print(f"{r['stage']:<16}{r['status']:>10}  {detail}")
+            continue
+        old = before.get(r["stage"])
+        change = f"{(r['seconds'] / old - 1) * 100:+.0f}%" if old else ""
+        print(f"{r['stage']:<16}{r['seconds']:>10.3f}{old or '':>10}{change:>9}")
+    if previous:
+        print(f"\nCompared with {previous['commit']} ({previous['date']})")
+
+    if not args.no_save:
+        run = {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "stargazers": args.stargazers,
+            "python": sys.version.split()[0],
+            "stages": results,
+        }
+        with open(RESULTS, "a") as f:
+            f.write(json.dumps(run) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# Synthetic pipeline data at configurable scale (1k to 1M stargazers).
+#
+# Writes the same files the Go tool and the scripts produce, laid out
+# relative to an output directory that is used as the working directory:
+#   email_reachout/<owner>_<repo>_emails.csv
+#   stargazer_cache/<owner>/<repo>/saved_state, correlated_starred_repos.csv,
+#       cumulative_stars.csv and (with --responses) Go-style cached responses
+#   output/repo-tags-all.json
+#
+# Usage:
+#   python benchmarks/synthetic.py --stargazers=100000 --output=/tmp/sg
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+from go_cache import cache_entry_path, write_entry
+
+# The scripts hard-code browser-use as the analyzed repo
+COMPETITORS = [
+    "gregpr07/browser-use",
+    "microsoft/playwright",
+    "apify/crawlee",
+    "mendableai/firecrawl",
+    "unclecode/crawl4ai",
+    "langchain-ai/langchain",
+    "openai/codex",
+    "bytedance/deer-flow",
+]
+FIRST_NAMES = ["Anna", "Ben", "Chen", "Diego", "Eva", "Felix", "Hana", "Ivan", "Jonas", "Lea", "Mia", "Noah", "Priya", "Sara", "Tom", "Yuki"]
+LAST_NAMES = ["Schmidt", "Li", "Garcia", "Kim", "Novak", "Weber", "Singh", "Rossi", "Sato", "Müller", "Brown", "Silva"]
+COMPANIES = ["@google", "Microsoft", "Zalando", "Freelance", "Stripe", "ByteDance", "SAP", "Shopify", "Student", "@apify", "Delivery Hero", "N26"]
+LOCATIONS = ["Berlin, Germany", "Munich", "San Francisco, CA", "London, UK", "Bangalore, India", "Beijing", "Zurich", "Paris, France", "New York", "Tokyo, Japan", "Remote", "Hamburg"]
+BIO_WORDS = ["web", "scraping", "automation", "LLM", "agents", "NLP", "backend", "frontend", "data", "engineer", "researcher", "founder", "Python", "Rust", "TypeScript", "browser", "testing", "ML", "crawler", "devops"]
+TOPICS = ["llm", "agents", "scraping", "browser-automation", "rag", "nlp", "computer-vision", "devtools", "testing", "python", "typescript", "data-engineering"]
+FREE_DOMAINS = ["gmail.com", "outlook.com", "qq.com", "yahoo.com", "proton.me"]
+
+
+def _profiles(rng, n: int) -> pd.DataFrame:
+    """People pool: one row per unique GitHub user."""
+    ids = np.arange(n)
+    logins = np.char.add("user", ids.astype(str))
+    first = rng.choice(FIRST_NAMES, n)
+    last = rng.choice(LAST_NAMES, n)
+    names = np.char.add(np.char.add(first, " "), last)
+
+    # ~20% have a public email; some with case, +tag and noreply variants
+    email_kind = rng.choice(
+        ["none", "free", "work", "tagged", "noreply"], n, p=[0.8, 0.1, 0.06, 0.02, 0.02]
+    )
+    domains = rng.choice(FREE_DOMAINS, n)
+    company_domains = np.char.add(
+        np.char.lower(np.char.replace(rng.choice(COMPANIES, n), "@", "")), ".com"
+    )
+    company_domains = np.char.replace(company_domains, " ", "")
+    emails = np.full(n, "", dtype=object)
+    free = email_kind == "free"
+    emails[free] = np.char.add(np.char.add(logins[free], "@"), domains[free])
+    work = email_kind == "work"
+    emails[work] = np.char.add(
+        np.char.add(np.char.lower(first[work]), "@"), company_domains[work]
+    )
+    tagged = email_kind == "tagged"
+    emails[tagged] = np.char.add(np.char.upper(logins[tagged]), "+github@gmail.com")
+    noreply = email_kind == "noreply"
+    emails[noreply] = np.char.add(
+        np.char.add(ids[noreply].astype(str), "+"),
+        np.char.add(logins[noreply], "@users.noreply.github.com"),
+    )
+
+    words = rng.choice(BIO_WORDS, (n, 4))
+    bios = np.where(
+        rng.random(n) < 0.6, [" ".join(w) for w in words], ""
+    )
+    return pd.DataFrame(
+        {
+            "Login": logins,
+            "Email": emails,
+            "Name": np.where(rng.random(n) < 0.7, names, ""),
+            "Company": np.where(rng.random(n) < 0.4, rng.choice(COMPANIES, n), ""),
+            "Location": np.where(rng.random(n) < 0.6, rng.choice(LOCATIONS, n), ""),
+            "Bio": bios,
+            "Followers": rng.lognormal(2.0, 1.5, n).astype(int),
+            "Following": rng.lognormal(2.0, 1.0, n).astype(int),
+        }
+    )
+
+
+def _popular_repos(n: int) -> list:
+    return [f"org{i}/project{i}" for i in range(n)]
+
+
+def generate(
+    output: str,
+    stargazers: int = 10000,
+    competitors: int = len(COMPETITORS),
+    correlated: int = 2000,
+    starred_per_user: int = 20,
+    saved_state: bool = True,
+    responses: int = 0,
+    seed: int = 0,
+) -> dict:
+    """Write a synthetic dataset under output; returns a summary."""
+    rng = np.random.default_rng(seed)
+    repos = COMPETITORS[:competitors]
+    people = _profiles(rng, max(int(stargazers / 1.4), 1))
+    pool = _popular_repos(correlated)
+    # Zipf-like popularity of the other starred repos
+    popularity = 1.0 / np.arange(1, correlated + 1) ** 0.9
+    popularity /= popularity.sum()
+
+    for d in ("email_reachout", "emails", "output", "stargazer_cache"):
+        os.makedirs(os.path.join(output, d), exist_ok=True)
+
+    # Split stargazers over competitors; people overlap across repos
+    shares = rng.dirichlet(np.ones(len(repos)) * 2) * stargazers
+    summary = {"stargazers": 0, "people": len(people), "repos": repos}
+    start = np.datetime64("2024-01-01T00:00:00", "s")
+    for repo, share in zip(repos, shares.astype(int) + 1):
+        rows = people.iloc[rng.choice(len(people), share, replace=share > len(people))]
+        rows = rows.drop_duplicates("Login")
+        owner, name = repo.split("/")
+        rows.to_csv(
+            os.path.join(output, "email_reachout", f"{owner}_{name}_emails.csv"),
+            index=False,
+        )
+        summary["stargazers"] += len(rows)
+
+        repo_dir = os.path.join(output, "stargazer_cache", owner, name)
+        os.makedirs(repo_dir, exist_ok=True)
+        n = len(rows)
+
+        # Star times: steady growth plus a launch spike
+        offsets = np.sort(rng.integers(0, 365 * 86400, n))
+        spike = rng.random(n) < 0.1
+        offsets[spike] = 120 * 86400 + rng.integers(0, 86400, spike.sum())
+        starred_at = np.sort(start + offsets.astype("timedelta64[s]"))
+        starred = rng.choice(correlated, (n, starred_per_user), p=popularity)
+
+        days = pd.Series(starred_at.astype("datetime64[D]")).value_counts().sort_index()
+        pd.DataFrame(
+            {
+                "Date": days.index.strftime("%m/%d/%Y"),
+                "New": days.to_numpy(),
+                "Cumulative": days.cumsum().to_numpy(),
+            }
+        ).to_csv(os.path.join(repo_dir, "cumulative_stars.csv"), index=False)
+
+        counts = np.bincount(starred.ravel(), minlength=correlated)
+        top = np.argsort(-counts)[:51]
+        pd.DataFrame(
+            {
+                "Repository": [pool[i] for i in top],
+                "URL": [f"https://github.com/{pool[i]}" for i in top],
+                "Count": counts[top],
+                "Committers": rng.integers(0, 50, len(top)),
+                "Commits": rng.integers(0, 5000, len(top)),
+                "Additions": rng.integers(0, 10**6, len(top)),
+                "Deletions": rng.integers(0, 10**6, len(top)),
+            }
+        ).to_csv(os.path.join(repo_dir, "correlated_starred_repos.csv"), index=False)
+
+        if saved_state:
+            _write_saved_state(rng, repo_dir, rows, starred_at, starred, pool, people)
+        if responses:
+            _write_responses(output, repo, rows.head(responses), starred_at)
+
+    scores = rng.random(correlated) * 10
+    tags = {
+        pool[i]: {
+            "tags": list(rng.choice(TOPICS, rng.integers(1, 4), replace=False)),
+            "score": round(float(scores[i]), 2),
+        }
+        for i in range(min(correlated, 200))
+    }
+    with open(os.path.join(output, "output", "repo-tags-all.json"), "w") as f:
+        json.dump(tags, f, indent=2)
+    return summary
+
+
+def _write_saved_state(rng, repo_dir, rows, starred_at, starred, pool, people):
+    logins = people["Login"].to_numpy()
+    follower_ids = rng.integers(0, len(people), (len(rows), 5))
+    stargazers = []
+    for i, r in enumerate(rows.itertuples(index=False)):
+        stargazers.append(
+            {
+                "user": {
+                    "login": r.Login,
+                    "id": int(r.Login[4:]),
+                    "name": r.Name,
+                    "company": r.Company,
+                    "location": r.Location,
+                    "email": r.Email,
+                    "bio": r.Bio,
+                    "followers": int(r.Followers),
+                    "following": int(r.Following),
+                    "public_repos": int(r.Following) % 50,
+                    "created_at": "2018-06-01T00:00:00Z",
+                },
+                "starred_at": str(starred_at[i]) + "Z",
+                "follower_list": [
+                    {"login": logins[j], "id": int(j)} for j in follower_ids[i]
+                ],
+                "starred": [pool[j] for j in starred[i]],
+                "subscribed": None,
+                "contributions": None,
+            }
+        )
+    repos = {name: {"full_name": name, "stargazers_count": 1000} for name in pool[:100]}
+    with open(os.path.join(repo_dir, "saved_state"), "w") as f:
+        f.write(json.dumps(stargazers) + "\n" + json.dumps(repos) + "\n")
+
+
+def _write_responses(output, repo, rows, starred_at):
+    """Go-style cached responses: stargazer pages and user profiles."""
+    cache_dir = os.path.join(output, "stargazer_cache")
+    headers = {"Content-Type": "application/json; charset=utf-8"}
+    records = rows.to_dict("records")
+    pages = [records[i : i + 100] for i in range(0, len(records), 100)]
+    for p, page in enumerate(pages, start=1):
+        url = f"https://api.github.com/repos/{repo}/stargazers"
+        if p > 1:
+            url += f"?page={p}"
+        body = [
+            {"starred_at": str(starred_at[(p - 1) * 100 + i]) + "Z",
+             "user": {"login": r["Login"], "url": f"https://api.github.com/users/{r['Login']}"}}
+            for i, r in enumerate(page)
+        ]
+        page_headers = dict(headers)
+        if p < len(pages):
+            page_headers["Link"] = (
+                f'<https://api.github.com/repos/{repo}/stargazers?page={p + 1}>; rel="next"'
+            )
+        write_entry(
+            cache_entry_path(cache_dir, repo, url), 200, page_headers, json.dumps(body).encode()
+        )
+    for r in records:
+        url = f"https://api.github.com/users/{r['Login']}"
+        user = {
+            "login": r["Login"],
+            "name": r["Name"],
+            "company": r["Company"],
+            "location": r["Location"],
+            "email": r["Email"],
+            "bio": r["Bio"],
+            "followers": int(r["Followers"]),
+            "following": int(r["Following"]),
+        }
+        write_entry(
+            cache_entry_path(cache_dir, repo, url), 200, headers, json.dumps(user).encode()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic pipeline data.")
+    parser.add_argument("--output", required=True, help="Directory to write into")
+    parser.add_argument("--stargazers", type=int, default=10000, help="Total stargazer rows")
+    parser.add_argument("--competitors", type=int, default=len(COMPETITORS))
+    parser.add_argument("--correlated", type=int, default=2000, help="Other starred repos")
+    parser.add_argument("--no-saved-state", action="store_true")
+    parser.add_argument(
+        "--responses", type=int, default=0, help="Cached Go responses per repo (stargazers)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = generate(
+        args.output,
+        stargazers=args.stargazers,
+        competitors=args.competitors,
+        correlated=args.correlated,
+        saved_state=not args.no_saved_state,
+        responses=args.responses,
+        seed=args.seed,
+    )
+    print(
+        f"Wrote {summary['stargazers']:,} stargazers ({summary['people']:,} people)"
+        f" for {len(summary['repos'])} repos to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,43 @@
 import os
+import sys
 import subprocess
 import argparse
 from pathlib import Path
 
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from cache_archive import has_archive, unpack
+from github_client import TokenPool, tokens_from_env
+from metrics import count, stage
+
 
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Scrape GitHub repository data.')
-    parser.add_argument('--token', required=True, help='GitHub API token')
+    parser.add_argument('--token', action='append', default=[], help='GitHub API token (repeat for a pool; also read from GITHUB_TOKENS/GITHUB_TOKEN)')
     parser.add_argument('--repos-csv', required=True, help='Path to CSV file containing repositories to scrape')
+    parser.add_argument('--sample', action='store_true', help='Estimate each audience from a stargazer sample instead of crawling it (see utils/sample_audience.py)')
     args = parser.parse_args()
-    
-    github_token = args.token
+
+    # Each fetch leases the token with the most quota left, so other scripts
+    # on this host steer around it
+    tokens = list(dict.fromkeys(args.token + tokens_from_env()))
+    if not tokens:
+        parser.error("no GitHub token given; use --token or set GITHUB_TOKEN")
+    pool = TokenPool(tokens)
 
     # Read the repos CSV
     df = pd.read_csv(args.repos_csv)
 
+    if args.sample:
+        # Minutes per repo instead of days; crawl only the repos worth it
+        from sample_audience import sample_repos
+
+        table = sample_repos(df["Repository"].tolist(), pool=pool)
+        print(table.to_string(index=False))
+        return
+
     # Create cache directory if it doesn't exist
     Path("stargazer_cache").mkdir(exist_ok=True)
     Path("email_reachout").mkdir(exist_ok=True)
@@ -32,31 +52,40 @@ def main():
         print(f"\nProcessing {repo}...")
 
         try:
-            # Run the stargazers command using the built binary
-            cmd = [
-                "./stargazers",
-                "fetch",
-                f"--repo={repo}",
-                f"--token={github_token}",
-                "--cache=./stargazer_cache",
-                "--mode=basic",
-            ]
-
-            print(f"Running command: {' '.join(cmd)}")
-
-            result = subprocess.run(
-                cmd,
-                text=True,
-                check=False,  # Don't raise exception on non-zero exit
-            )
+            # Packed cache entries go back to files so the fetch does not redo them
+            repo_dir = os.path.join("stargazer_cache", repo)
+            if has_archive(repo_dir):
+                unpack(repo_dir)
+
+            with stage(f"fetch/{repo}"), pool.lease("core") as github_token:
+                # Run the stargazers command using the built binary
+                cmd = [
+                    "./stargazers",
+                    "fetch",
+                    f"--repo={repo}",
+                    f"--token={github_token}",
+                    "--cache=./stargazer_cache",
+                    "--mode=basic",
+                ]
+
+                print(f"Running command: {' '.join(cmd[:3] + cmd[4:])}")
+
+                result = subprocess.run(
+                    cmd,
+                    text=True,
+                    check=False,  # Don't raise exception on non-zero exit
+                )
 
             if result.returncode != 0:
                 print(f"Error processing {repo} (exit code {result.returncode})")
+                count("repos_failed")
             else:
                 print(f"Successfully processed {repo}")
+                count("repos_fetched")
 
         except Exception as e:
             print(f"Failed to process {repo}: {str(e)}")
+            count("repos_failed")
             continue
 
 
@@ -2,13 +2,22 @@ data_dir = "email_reachout"
 
 
 # read all csv files in data_dir of competition_scraping.py and combine them into a single dataframe each gets a column for the repo name and ownder (seperated by _) without the _emails.csv suffix
+import argparse
 import os
-import re
+import sys
 
+import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+from delta import DeltaTracker, merge_delta
+from email_normalize import dedupe_leads
+from lead_schema import clean_column, compact, read_leads
+from leads import DEFAULT_STORE, LeadStore
+from metrics import rows, stage
 
-def combine_csv_files(data_dir: str, output_file: str):
+
+def combine_csv_files(data_dir: str, output_file: str, tracker: DeltaTracker = None):
     # List to hold dataframes
     dfs = []
 
@@ -16,7 +25,12 @@ def combine_csv_files(data_dir: str, output_file: str):
     for filename in os.listdir(data_dir):
         if filename.endswith("_emails.csv"):
             # Read the CSV file into a dataframe
-            df = pd.read_csv(os.path.join(data_dir, filename))
+            df = read_leads(os.path.join(data_dir, filename))
+
+            # Only keep stargazers that are new or changed since the last run
+            if tracker is not None:
+                df = tracker.changed(df, source=filename)
+                tracker.commit(df, source=filename)
 
             # Extract repo name and owner from the filename
             repo_owner = filename.replace("_emails.csv", "")
@@ -29,48 +43,107 @@ def combine_csv_files(data_dir: str, output_file: str):
             # Append the dataframe to the list
             dfs.append(df)
 
-    # Combine all dataframes into a single dataframe
-    combined_df = pd.concat(dfs, ignore_index=True)
-
-    # Save to csv
-    combined_df.to_csv(output_file, index=False)
+    # Combine all dataframes into a single dataframe; categories differ per
+    # file, so the schema is applied again
+    combined_df = compact(pd.concat(dfs, ignore_index=True))
+
+    # Save to csv, merging the delta into the previous output
+    if tracker is not None and os.path.exists(output_file):
+        previous = read_leads(output_file)
+        merged = merge_delta(previous, combined_df, key=["Login", "owner", "repo"])
+        merged.to_csv(output_file, index=False)
+    else:
+        combined_df.to_csv(output_file, index=False)
     return combined_df
 
 
-def clean_text(text: str):
-    if pd.isna(text) or not isinstance(text, str):
-        return text
-    # Replace newlines with spaces and collapse multiple spaces into one
-    cleaned = re.sub(r"\s+", " ", text.strip())
-    return cleaned
-
-
-def filter_data(df: pd.DataFrame, output_file: str):
+def filter_data(
+    df: pd.DataFrame, output_file: str, incremental: bool = False, store: LeadStore = None
+):
     # Clean all string columns
     for column in df.columns:
-        df[column] = df[column].apply(clean_text)
+        df[column] = clean_column(df[column])
 
-    # Filter out empty emails and duplicates
-    df = df[df["Email"].notna()]
-    df = df[df["Email"] != ""]
+    # Merge every row into the cross-repo identity store before the dedupe
+    # below throws away the other repos a person starred
+    if store is not None:
+        store.upsert(df)
+
+    # Filter out duplicates
     df = df.drop_duplicates()
 
-    # remove duplicate emails
-    df = df.drop_duplicates(subset=["Email"])
+    # Drop invalid and noreply emails, keep the richest profile per email
+    df = dedupe_leads(df)
+    if store is not None:
+        # and per person: one whose address changed between scrapes is
+        # scored and contacted once
+        df = dedupe_leads(_with_person(df, store), key="PersonId")
+        known = (df["PersonId"] >= 0).to_numpy()
+        df["repos"] = ""
+        df.loc[known, "repos"] = store.repo_lists(df["PersonId"].to_numpy()[known]).to_numpy()
     # remove columns Following and Followers and owner
     df = df.drop(columns=["Following", "Followers", "owner"])
 
+    # Merge new and changed leads into the previous output
+    if incremental and os.path.exists(output_file):
+        previous = read_leads(output_file)
+        df = merge_delta(previous, df, key="EmailKey")
+        if store is not None:
+            # The new row of a person replaces an older row under another email
+            df = _with_person(df, store).drop_duplicates("PersonId", keep="last")
+    df = df.drop(columns="PersonId", errors="ignore")
+
     # Save to CSV with proper line endings
     df.to_csv(output_file, index=False, lineterminator="\n")
     return df
 
 
-def count_duplicate_emails(df: pd.DataFrame):
-    return df.duplicated(subset=["Email"]).sum()
+def _with_person(df: pd.DataFrame, store: LeadStore) -> pd.DataFrame:
+    """df with the store's PersonId per row; rows it does not know get unique negative ids."""
+    people = store.lookup(logins=df["Login"], emails=df["Email"])
+    unknown = people < 0
+    people[unknown] = -1 - np.arange(unknown.sum())
+    return df.assign(PersonId=people)
 
 
-data_dir = "email_reachout"
-output_dir = "emails"
-combined_df = combine_csv_files(data_dir, os.path.join(output_dir, "all.csv"))
-df = filter_data(combined_df, os.path.join(output_dir, "all_competitors_filtered.csv"))
-print(count_duplicate_emails(df))
+def count_duplicate_emails(df: pd.DataFrame):
+    return df.duplicated(subset=["EmailKey"]).sum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Combine and filter scraped emails.")
+    parser.add_argument(
+        "--full", action="store_true", help="Reprocess every row instead of the delta"
+    )
+    args = parser.parse_args(argv)
+
+    data_dir = "email_reachout"
+    output_dir = "emails"
+    tracker = DeltaTracker("create_data")
+    store = LeadStore.load(DEFAULT_STORE)
+    if args.full:
+        tracker.reset()
+        store = LeadStore()
+    incremental = not args.full
+
+    with stage("combine"):
+        combined_df = combine_csv_files(
+            data_dir, os.path.join(output_dir, "all.csv"), tracker
+        )
+        rows(rows_out=len(combined_df))
+    print(f"New or changed rows: {len(combined_df)}")
+    with stage("filter", rows_in=len(combined_df)):
+        df = filter_data(
+            combined_df,
+            os.path.join(output_dir, "all_competitors_filtered.csv"),
+            incremental,
+            store,
+        )
+        rows(rows_out=len(df))
+    print(count_duplicate_emails(df))
+    store.save(DEFAULT_STORE)
+    tracker.save()
+
+
+if __name__ == "__main__":
+    main()
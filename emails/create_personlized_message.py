@@ -1,33 +1,47 @@
+# Personalized intros and fit scores for leads with Azure OpenAI.
+#
+# score_new_leads() only sends leads that are new or whose profile changed
+# since the last run, resumes from per-chunk checkpoints after a crash and
+# merges the results into the previous output. The client is passed in, so a
+# long-running worker can keep one client (and its connections) warm.
+#
+# Usage:
+#   python emails/create_personlized_message.py
+import argparse
+import ast
+import json
 import os
+import sys
+import time
+from functools import lru_cache
 
 import pandas as pd
 
-df = pd.read_csv("emails/all_competitors_filtered.csv")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+from delta import DeltaTracker, merge_delta
+from lead_schema import read_leads
+from metrics import count, rows, stage
+from suppression import DEFAULT_DB, load_suppression
 
-from openai import AzureOpenAI
+INPUT_FILE = "emails/all_competitors_filtered.csv"
+OUTPUT_FILE = "emails/all_competitors_with_intros.csv"
+CHECKPOINT_FILE = "emails/checkpoint_intros.txt"
+CHECKPOINT_FILE_SCORES = "emails/checkpoint_scores.txt"
+CHUNK_SIZE = 100
+MODEL = "gpt-4o"
 
-client = AzureOpenAI(
-    api_version="2024-10-21",
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT", ""),
-    api_key=os.getenv("AZURE_OPENAI_KEY", ""),
-)
+# Fields sent to the model, as header + tab-separated rows; a bio is cut to
+# BIO_CHARS and the starred list to REPOS_LIMIT repos
+PROMPT_COLUMNS = ["Login", "Name", "Company", "Location", "Bio", "repo", "repos"]
+BIO_CHARS = 200
+REPOS_LIMIT = 5
 
-n = 100
+# The starred repo is not part of the score, so it is not part of the hash
+PROFILE_COLUMNS = ["Login", "Email", "Name", "Company", "Location", "Bio"]
 
-# split df into chunks of n rows
-chunks = [df.iloc[i : i + n] for i in range(0, len(df), n)]
-print(f"Number of chunks: {len(chunks)}")
-
-
-def generate_personalized_intros(chunk):
-    # drop email column
-    chunk = chunk.drop(columns=["Email"])
-    messages = [
-        {
-            "role": "system",
-            "content": """
-You are a professional cold email writer. Create short, friendly personalized email introductions to enrich my database. Your input is a a list with people i found on github in the format:
-Login name,Name,Company,Location,Bio,repo(where i found them - they starred this repo) - some fields might be missing.
+SYSTEM_PROMPT = """
+You are a professional cold email writer. Create short, friendly personalized email introductions to enrich my database. Your input is a list with people i found on github, a header line and then one tab-separated line per person with the fields:
+Login(login name),Name,Company,Location,Bio,repo(where i found them - they starred this repo),repos(every repo of my list they starred) - some fields might be empty, long bios end with "…".
 Output must be a JSON dictionary 
 {
     "login name1": {"intro": "intro1", "score": 0.5},
@@ -37,7 +51,7 @@ Output must be a JSON dictionary
 The login name is the key from the input.
 The intro is the personalized message you write.
 The score is how well they fit to my project. E.g. A super experienced person in web automation / scraping is 1, LLM agents is 0.9, only NLP is 0.3, no information is 0. If not advanced - deduct points. Be moderate. So that >0.8 are good leads.
-The repo which they starred should not count into the score - they only starred this - this means nothing. Use only the bio and company.
+The repos which they starred should not count into the score - they only starred this - this means nothing. Use only the bio and company.
 My project is browser-use (no need to mention it in the intro - just for your context): We build the interface between LLMs and browsers. So that LLMs can understand the web and e.g. fix automation scripts which break otherwise when websites change.
 
 I will continue your intro message with my own message: 
@@ -53,43 +67,141 @@ Rules:
 - Don't be salesy,
 - if no information is provided, just write general short intro
 - write things like Hi firstname, I saw you are working on ... on github. 
-""",
-        },
+"""
+
+
+def make_client(endpoint: str = None, api_key: str = None, api_version: str = "2024-10-21"):
+    """Azure OpenAI client from arguments or AZURE_OPENAI_ENDPOINT/AZURE_OPENAI_KEY."""
+    from openai import AzureOpenAI
+
+    return AzureOpenAI(
+        api_version=api_version,
+        azure_endpoint=endpoint or os.getenv("AZURE_OPENAI_ENDPOINT", ""),
+        api_key=api_key or os.getenv("AZURE_OPENAI_KEY", ""),
+    )
+
+
+def _truncate(values: pd.Series, limit: int) -> pd.Series:
+    """values cut to limit characters at a word boundary, marked with an ellipsis."""
+    long = values.str.len() > limit
+    if not long.any():
+        return values
+    cut = values[long].str.slice(0, limit).str.replace(r"\s+\S*$", "", regex=True)
+    return values.mask(long, cut + "…")
+
+
+def serialize_leads(chunk: pd.DataFrame, bio_chars: int = BIO_CHARS) -> str:
+    """The leads of chunk as a header line and one tab-separated line each.
+
+    Unlike JSON records the field names are written once, empty fields are
+    blank and columns empty for every lead are left out, which roughly halves
+    the prompt tokens.
+    """
+    columns = [c for c in PROMPT_COLUMNS if c in chunk.columns]
+    fields = {}
+    for column in columns:
+        values = chunk[column].astype(object)
+        values = values.where(values.notna(), "").astype(str)
+        # Tabs and newlines would break the rows
+        values = values.str.replace(r"\s+", " ", regex=True).str.strip()
+        if column == "Bio":
+            values = _truncate(values, bio_chars)
+        elif column == "repos":
+            repos = values.str.split(";")
+            extra = repos.str.len() - REPOS_LIMIT
+            values = repos.str[:REPOS_LIMIT].str.join(";").mask(extra > 0, lambda v: v + ";…")
+        if column == "Login" or values.ne("").any():
+            fields[column] = values
+    frame = pd.DataFrame(fields)
+    return "\n".join(["\t".join(frame.columns)] + ["\t".join(row) for row in frame.to_numpy()])
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding of model, or None when tiktoken cannot provide one.
+
+    Besides a missing install, tiktoken fails when it cannot download its
+    BPE file (offline, behind a proxy); the estimate is used then and the
+    failure is remembered, so it is not retried for every prompt.
+    """
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"No tiktoken encoding for {model} ({e}); estimating tokens")
+        return None
+
+
+def count_tokens(text: str, model: str = MODEL) -> int:
+    """Tokens of text for model; about 4 characters per token without tiktoken."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        try:
+            # Bios may contain "<|endoftext|>"; count it as text
+            return len(encoding.encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    return -(-len(text) // 4)
+
+
+def build_messages(chunk: pd.DataFrame, bio_chars: int = BIO_CHARS) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
-            "content": f"""these are the people i found on github:
-            {chunk.to_json(orient='records')}
-
-""",
+            "content": "these are the people i found on github:\n"
+            + serialize_leads(chunk, bio_chars),
         },
     ]
+
+
+def generate_personalized_intros(chunk: pd.DataFrame, client, model: str = MODEL):
+    """(intros, scores) for the rows of chunk, in order.
+
+    The score is None where the model gave no result (the request failed or
+    the login is missing from its answer), so those leads can be retried.
+    """
+    messages = build_messages(chunk)
+    prompt_tokens = sum(count_tokens(m["content"], model) for m in messages)
+    count("llm_prompt_tokens_estimated", prompt_tokens)
+    print(f"Prompt: {prompt_tokens} tokens for {len(chunk)} leads")
     try:
+        count("llm_requests")
+        start = time.perf_counter()
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=model,
             messages=messages,
             response_format={"type": "json_object"},
             temperature=0.7,
         )
+        count("llm_seconds", round(time.perf_counter() - start, 3))
+        if response.usage is not None:
+            count("llm_prompt_tokens", response.usage.prompt_tokens)
+            count("llm_completion_tokens", response.usage.completion_tokens)
 
         # Parse JSON response (will be in format {username1: message1, username2: message2, ...})
-        import json
-
         user_dict = json.loads(response.choices[0].message.content)
         # Map the messages back to the dataframe order
         intros_list = [
             user_dict.get(username, {}).get("intro", "") for username in chunk["Login"]
         ]
         scores_list = [
-            user_dict.get(username, {}).get("score", 0) for username in chunk["Login"]
+            user_dict[username].get("score", 0) if username in user_dict else None
+            for username in chunk["Login"]
         ]
         actual_usernames_count = sum(1 for intro in intros_list if intro)
 
     except Exception as e:
         print(f"Error generating personalized intros: {e}")
+        count("llm_errors")
         # fallback
         intros_list = []
-        scores_list = [0] * len(chunk)
-        actual_usernames_count = len(chunk)
+        scores_list = [None] * len(chunk)
+        actual_usernames_count = 0
 
         for i in range(len(chunk)):
             intros_list.append(f"Hi {chunk.iloc[i]['Name']}, I found you on GitHub.")
@@ -98,56 +210,183 @@ Rules:
     return intros_list, scores_list
 
 
-# Process each chunk and store results
-checkpoint_file = "emails/checkpoint_intros.txt"
-checkpoint_file_scores = "emails/checkpoint_scores.txt"
-all_intros = []
-all_scores = []
-# read in files and continue
-if os.path.exists(checkpoint_file):
-    print(f"Resuming from checkpoint {checkpoint_file}")
-    with open(checkpoint_file, "r") as f:
-        all_intros = f.read().splitlines()
-if os.path.exists(checkpoint_file_scores):
-    print(f"Resuming from checkpoint {checkpoint_file_scores}")
-    with open(checkpoint_file_scores, "r") as f:
-        all_scores = f.read().splitlines()
-assert len(all_intros) == len(all_scores), "Length of intros and scores must match"
-
-l = len(all_intros)
-print(f"Resuming from {l}")
-for i, chunk in enumerate(chunks[l:]):
-    print(f"Processing chunk {l+i+1}/{len(chunks)}")
-    chunk_intros, chunk_scores = generate_personalized_intros(chunk)
-    all_intros.extend(chunk_intros)
-    all_scores.extend(chunk_scores)
-    with open(checkpoint_file, "a") as f:
-        f.write(f"{chunk_intros}\n")
-    with open(checkpoint_file_scores, "a") as f:
-        f.write(f"{chunk_scores}\n")
-
-
-print(f"Length of all_intros: {len(all_intros)}")
-print(f"Length of df: {len(df)}")
-print(f"all_intros: {all_intros}")
-
-# Ensure the length of all_intros matches the length of the dataframe
-if len(all_intros) < len(df):
-    all_intros.extend([""] * (len(df) - len(all_intros)))
-
-elif len(all_intros) > len(df):
-    raise ValueError(
-        f"Length of values ({len(all_intros)}) exceeds length of index ({len(df)})"
+def prompt_report(df: pd.DataFrame, chunk_size: int = CHUNK_SIZE, model: str = MODEL):
+    """Prompt tokens per chunk, compact and as the JSON records sent before."""
+    report = []
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        records = chunk.drop(columns=["Email", "EmailKey", "EmailType"], errors="ignore")
+        tokens = sum(count_tokens(m["content"], model) for m in build_messages(chunk))
+        json_tokens = count_tokens(SYSTEM_PROMPT, model) + count_tokens(
+            records.to_json(orient="records"), model
+        )
+        report.append((start // chunk_size + 1, len(chunk), tokens, json_tokens))
+    return pd.DataFrame(report, columns=["chunk", "leads", "tokens", "json_tokens"])
+
+
+def _read_checkpoint(path: str) -> list:
+    # every line holds the results of one chunk
+    if not os.path.exists(path):
+        return []
+    print(f"Resuming from checkpoint {path}")
+    with open(path, "r") as f:
+        return [ast.literal_eval(line) for line in f.read().splitlines()]
+
+
+def score_leads(
+    df: pd.DataFrame,
+    client,
+    chunk_size: int = CHUNK_SIZE,
+    model: str = MODEL,
+    checkpoint_file: str = CHECKPOINT_FILE,
+    checkpoint_file_scores: str = CHECKPOINT_FILE_SCORES,
+) -> pd.DataFrame:
+    """df with personalized_intro and personalized_intro_score columns.
+
+    The score is NaN for the leads the model gave no result for.
+
+    Each chunk's results are appended to the checkpoint files first, so a
+    rerun after a crash continues with the next chunk.
+    """
+    df = df.reset_index(drop=True)
+    chunks = [df.iloc[i : i + chunk_size] for i in range(0, len(df), chunk_size)]
+    print(f"Number of chunks: {len(chunks)}")
+
+    intro_chunks = _read_checkpoint(checkpoint_file)
+    score_chunks = _read_checkpoint(checkpoint_file_scores)
+    all_intros = [intro for chunk in intro_chunks for intro in chunk]
+    all_scores = [score for chunk in score_chunks for score in chunk]
+    assert len(all_intros) == len(all_scores), "Length of intros and scores must match"
+
+    done_chunks = len(intro_chunks)
+    print(f"Resuming from {done_chunks}")
+    with stage("score", rows_in=len(df) - done_chunks * chunk_size):
+        for i, chunk in enumerate(chunks[done_chunks:]):
+            print(f"Processing chunk {done_chunks + i + 1}/{len(chunks)}")
+            chunk_intros, chunk_scores = generate_personalized_intros(chunk, client, model)
+            all_intros.extend(chunk_intros)
+            all_scores.extend(chunk_scores)
+            with open(checkpoint_file, "a") as f:
+                f.write(f"{chunk_intros}\n")
+            with open(checkpoint_file_scores, "a") as f:
+                f.write(f"{chunk_scores}\n")
+
+    print(f"Length of all_intros: {len(all_intros)}")
+    print(f"Length of df: {len(df)}")
+
+    # Ensure the length of all_intros matches the length of the dataframe
+    if len(all_intros) < len(df):
+        all_intros.extend([""] * (len(df) - len(all_intros)))
+    elif len(all_intros) > len(df):
+        raise ValueError(
+            f"Length of values ({len(all_intros)}) exceeds length of index ({len(df)})"
+        )
+    if len(all_scores) < len(df):
+        all_scores.extend([None] * (len(df) - len(all_scores)))
+    elif len(all_scores) > len(df):
+        raise ValueError(
+            f"Length of values ({len(all_scores)}) exceeds length of index ({len(df)})"
+        )
+    scores = pd.to_numeric(pd.Series(all_scores, dtype=object), errors="coerce")
+    return df.assign(personalized_intro=all_intros, personalized_intro_score=scores.to_numpy())
+
+
+def score_new_leads(
+    leads: pd.DataFrame,
+    client,
+    output_file: str = OUTPUT_FILE,
+    tracker: DeltaTracker = None,
+    chunk_size: int = CHUNK_SIZE,
+    model: str = MODEL,
+    checkpoint_file: str = CHECKPOINT_FILE,
+    checkpoint_file_scores: str = CHECKPOINT_FILE_SCORES,
+    suppression=None,
+) -> pd.DataFrame:
+    """Score the new or changed leads and merge them into output_file.
+
+    Leads on the suppression list (see utils/suppression.py) are neither
+    scored nor kept in the output. Leads the model gave no result for are
+    kept without a score and not committed, so the next run scores them again.
+    """
+    if suppression is not None:
+        leads = suppression.filter(leads)
+    if tracker is None:
+        tracker = DeltaTracker("intros", columns=PROFILE_COLUMNS)
+    if not os.path.exists(output_file):
+        tracker.reset()
+    with stage("delta", rows_in=len(leads)):
+        df = tracker.changed(leads).reset_index(drop=True)
+        rows(rows_out=len(df))
+    print(f"Leads to score: {len(df)}/{len(leads)}")
+
+    df = scored = score_leads(
+        df, client, chunk_size, model, checkpoint_file, checkpoint_file_scores
+    )
+
+    # Merge the newly scored leads into the previous output
+    with stage("merge", rows_in=len(df)):
+        if os.path.exists(output_file):
+            df = merge_delta(read_leads(output_file), df, key="EmailKey")
+            if suppression is not None:
+                df = suppression.filter(df)
+
+        # Save updated dataframe
+        df.to_csv(output_file, index=False)
+        rows(rows_out=len(df))
+
+    # The checkpoints only cover this delta; start fresh next run
+    failed = scored.loc[scored["personalized_intro_score"].isna(), "EmailKey"]
+    if len(failed):
+        print(f"No result for {len(failed)} leads; they are retried on the next run")
+    tracker.commit(leads[~leads["EmailKey"].isin(failed)])
+    tracker.save()
+    for path in (checkpoint_file, checkpoint_file_scores):
+        if os.path.exists(path):
+            os.remove(path)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Personalized intros and lead scores.")
+    parser.add_argument("--input", default=INPUT_FILE, help="Filtered leads CSV")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Scored leads CSV")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Leads per request")
+    parser.add_argument("--model", default=MODEL, help="Azure OpenAI deployment")
+    parser.add_argument(
+        "--where", help="Only score leads matching a lead_search.py query, e.g. 'country:de'"
     )
-if len(all_scores) < len(df):
-    all_scores.extend([0] * (len(df) - len(all_scores)))
-elif len(all_scores) > len(df):
-    raise ValueError(
-        f"Length of values ({len(all_scores)}) exceeds length of index ({len(df)})"
+    parser.add_argument(
+        "--count-tokens", action="store_true", help="Print the prompt tokens per chunk and exit"
     )
-# Add intros to dataframe
-df["personalized_intro"] = all_intros
-df["personalized_intro_score"] = all_scores
+    parser.add_argument(
+        "--suppression", default=DEFAULT_DB, help="Contacted/bounced/unsubscribed leads to skip"
+    )
+    args = parser.parse_args(argv)
+
+    leads = read_leads(args.input)
+    if args.where:
+        from lead_search import LeadIndex
+        from locations import load_cache, save_cache
+
+        locations = load_cache()
+        leads = leads[LeadIndex.build(leads, locations).mask(args.where)]
+        save_cache(locations)
+        print(f"Leads matching {args.where!r}: {len(leads)}")
+    if args.count_tokens:
+        report = prompt_report(leads, args.chunk_size, args.model)
+        print(report.to_string(index=False))
+        total, before = report["tokens"].sum(), report["json_tokens"].sum()
+        print(f"{total} prompt tokens for {len(leads)} leads ({before} as JSON records)")
+        return
+    score_new_leads(
+        leads,
+        make_client(),
+        args.output,
+        chunk_size=args.chunk_size,
+        model=args.model,
+        suppression=load_suppression(args.suppression),
+    )
+
 
-# Save updated dataframe
-df.to_csv("emails/all_competitors_with_intros.csv", index=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from cache_archive import CacheArchive, pack, read_response, reindex, unpack
+from go_cache import cache_entry_path, encode_response
+
+URL = "https://api.github.com/repos/apify/crawlee/stargazers?page=2&per_page=100"
+REPO = "apify/crawlee"
+
+
+def _write(cache_dir, url, body):
+    path = cache_entry_path(str(cache_dir), REPO, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(encode_response(200, {"Content-Type": "application/json"}, body))
+    return path
+
+
+def test_same_size_change_is_packed_again(tmp_path):
+    repo_dir = str(tmp_path / REPO)
+    path = _write(tmp_path, URL, b'{"followers": 7}')
+    assert pack(repo_dir) == (1, 0)
+    assert pack(repo_dir) == (0, 1)
+
+    _write(tmp_path, URL, b'{"followers": 8}')
+    assert pack(repo_dir, remove=True) == (1, 0)
+    assert not os.path.exists(path)
+    assert read_response(str(tmp_path), REPO, URL)[2] == b'{"followers": 8}'
+
+
+def test_remove_spares_files_changed_after_packing(tmp_path, monkeypatch):
+    repo_dir = str(tmp_path / REPO)
+    path = _write(tmp_path, URL, b'{"followers": 7}')
+    real_stat = os.stat
+
+    def stat(p, *args, **kwargs):
+        # The fetcher rewrites the entry between packing and removal
+        if p == path:
+            _write(tmp_path, URL, b'{"followers": 99}')
+        return real_stat(p, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", stat)
+    pack(repo_dir, remove=True)
+    monkeypatch.undo()
+    assert os.path.exists(path)
+    assert read_response(str(tmp_path), REPO, URL)[2] == b'{"followers": 99}'
+
+
+def test_packed_entries_are_found_by_go_name(tmp_path):
+    repo_dir = str(tmp_path / REPO)
+    _write(tmp_path, URL, b"[]")
+    pack(repo_dir, remove=True)
+    assert set(os.listdir(repo_dir)) == {"responses.pack", "responses.idx"}
+    with CacheArchive(repo_dir) as archive:
+        name = "https-api.github.comreposapifycrawleestargazerspage-2-per-page-100"
+        assert archive.names() == [name]
+        assert archive.get(URL)[0] == 200
+    assert read_response(str(tmp_path), REPO, URL + "&page=3") is None
+
+    assert unpack(repo_dir) == 1
+    assert read_response(str(tmp_path), REPO, URL)[2] == b"[]"
+
+
+def test_reindex_drops_a_torn_record(tmp_path):
+    repo_dir = str(tmp_path / REPO)
+    _write(tmp_path, URL, b"[1]")
+    pack(repo_dir, remove=True)
+    size = os.path.getsize(os.path.join(repo_dir, "responses.pack"))
+    with open(os.path.join(repo_dir, "responses.pack"), "ab") as f:
+        f.write(b"https-partial 100\n{")
+    assert reindex(repo_dir) == 1
+    assert os.path.getsize(os.path.join(repo_dir, "responses.pack")) == size
+    assert read_response(str(tmp_path), REPO, URL)[2] == b"[1]"
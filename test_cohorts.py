@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from cohorts import analyze_cohorts
+from star_index import StarIndex
+
+
+def _stargazer(login, created_at=None, email=None):
+    user = {"login": login, "followers": 10, "created_at": created_at, "email": email}
+    return {"user": user, "starred_at": "2025-01-02T00:00:00Z", "starred": ["a/b"]}
+
+
+def _index():
+    index = StarIndex()
+    index.append(
+        [
+            _stargazer("old", "2015-01-01T00:00:00Z"),
+            _stargazer("unknown"),
+            _stargazer("mailer", "2020-01-01T00:00:00Z", email="m@example.com"),
+        ],
+        source="x/y",
+    )
+    index.sources.append("x/y")
+    return index
+
+
+def test_age_skips_accounts_without_created_at():
+    stats, _ = analyze_cohorts(_index(), dimensions=["has_email"])
+    no_email = stats[stats["cohort"] == "has_email=no"].iloc[0]
+    expected = (np.datetime64("now", "s") - np.datetime64("2015-01-01")) / np.timedelta64(1, "D")
+    assert no_email["size"] == 2
+    assert abs(no_email["avg_age_days"] - expected) < 1
+
+
+def test_old_index_format_is_rebuilt(tmp_path, monkeypatch):
+    path = str(tmp_path / "star_index.npz")
+    _index().save(path)
+    data = dict(np.load(path))
+    del data["version"], data["created_at"]
+    np.savez(path, **data)
+
+    built = []
+    monkeypatch.setattr("star_index.list_cached_repos", lambda cache_dir: ["x/y"])
+    monkeypatch.setattr(
+        StarIndex, "build", classmethod(lambda cls, cache, repos: built.append(repos) or _index())
+    )
+    index = StarIndex.load(path, str(tmp_path))
+    assert built == [["x/y"]]
+    assert len(index.logins) == 3
+    assert int(np.load(path)["version"]) == 2
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "emails"))
+from create_data import filter_data
+from leads import LeadStore
+
+
+def _scraped(*rows):
+    return pd.DataFrame(
+        rows, columns=["Login", "Email", "Name", "Followers", "Following", "owner", "repo"]
+    )
+
+
+def test_one_row_per_person_across_emails(tmp_path):
+    output = str(tmp_path / "filtered.csv")
+    store = LeadStore()
+    df = filter_data(
+        _scraped(
+            ("ada", "ada@gmail.com", "Ada", 1, 0, "a", "one"),
+            ("ada", "ada@work.io", "Ada L", 1, 0, "b", "two"),
+            ("bob", "bob@gmail.com", "Bob", 1, 0, "a", "one"),
+        ),
+        output,
+        store=store,
+    )
+    assert sorted(df["Login"]) == ["ada", "bob"]
+    assert df.set_index("Login").loc["ada", "repos"] == "a/one;b/two"
+    assert "PersonId" not in pd.read_csv(output).columns
+
+
+def test_incremental_run_replaces_the_old_email_of_a_person(tmp_path):
+    output = str(tmp_path / "filtered.csv")
+    store = LeadStore()
+    first = _scraped(
+        ("ada", "ada@gmail.com", "Ada", 1, 0, "a", "one"),
+        ("bob", "bob@gmail.com", "Bob", 1, 0, "a", "one"),
+    )
+    filter_data(first, output, incremental=True, store=store)
+    delta = _scraped(("ada", "ada@newjob.io", "Ada", 1, 0, "c", "three"))
+    df = filter_data(delta, output, incremental=True, store=store)
+    assert sorted(df["Login"]) == ["ada", "bob"]
+    assert df.set_index("Login").loc["ada", "Email"] == "ada@newjob.io"
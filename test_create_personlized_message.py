@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "emails"))
+import create_personlized_message
+from create_personlized_message import count_tokens, score_new_leads, serialize_leads
+from delta import DeltaTracker
+
+
+class FakeClient:
+    """chat.completions.create answering for every login, after `failures` errors."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("server error")
+        rows = messages[1]["content"].splitlines()[2:]
+        answer = {row.split("\t")[0]: {"intro": "Hi", "score": 0.5} for row in rows}
+        message = SimpleNamespace(content=json.dumps(answer))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _leads(n):
+    return pd.DataFrame(
+        {
+            "Login": [f"user{i}" for i in range(n)],
+            "Email": [f"User{i}@Example.com" for i in range(n)],
+            "EmailKey": [f"user{i}@example.com" for i in range(n)],
+            "Name": [f"User {i}" for i in range(n)],
+            "Company": "",
+            "Location": "",
+            "Bio": "",
+        }
+    )
+
+
+def test_serialize_leads_drops_empty_columns_and_cuts_bios():
+    chunk = pd.DataFrame(
+        {
+            "Login": ["ada", "bob"],
+            "Name": ["Ada\tL", None],
+            "Company": ["", None],
+            "Bio": ["word " * 10, "short"],
+        }
+    )
+    lines = serialize_leads(chunk, bio_chars=12).splitlines()
+    assert lines[0] == "Login\tName\tBio"
+    assert lines[1] == "ada\tAda L\tword word…"
+    assert lines[2] == "bob\t\tshort"
+
+
+def test_failed_chunk_is_scored_again_next_run(tmp_path):
+    leads = _leads(4)
+    output = str(tmp_path / "scored.csv")
+    paths = [str(tmp_path / "intros.txt"), str(tmp_path / "scores.txt")]
+
+    client = FakeClient(failures=1)
+    tracker = DeltaTracker("intros", str(tmp_path), columns=["Login", "Email"])
+    first = score_new_leads(leads, client, output, tracker, 2, "m", *paths)
+    assert first["personalized_intro_score"].isna().sum() == 2
+
+    tracker = DeltaTracker("intros", str(tmp_path), columns=["Login", "Email"])
+    assert list(tracker.changed(leads)["Login"]) == ["user0", "user1"]
+    second = score_new_leads(leads, FakeClient(), output, tracker, 2, "m", *paths)
+    assert len(second) == 4
+    assert second["personalized_intro_score"].eq(0.5).all()
+
+
+def test_token_count_falls_back_when_tiktoken_cannot_load(monkeypatch):
+    def offline(name):
+        raise ConnectionError("cannot fetch o200k_base.tiktoken")
+
+    tiktoken = SimpleNamespace(encoding_for_model=offline, get_encoding=offline)
+    monkeypatch.setitem(sys.modules, "tiktoken", tiktoken)
+    create_personlized_message._encoding.cache_clear()
+    try:
+        assert count_tokens("x" * 10, "some-model") == 3
+        leads = _leads(2)
+        intros, scores = create_personlized_message.generate_personalized_intros(
+            leads, FakeClient(), "some-model"
+        )
+        assert scores == [0.5, 0.5]
+    finally:
+        create_personlized_message._encoding.cache_clear()
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+import github_client
+from enrich_daemon import IntroEnricher, JobQueue, enrich_stars
+
+
+def test_invalid_keys_are_rejected_per_item(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    job = queue.submit("stars", ["openai/codex", "noslash", 'evil"/x', "a/b c"])
+    assert job["queued"] == 1
+    assert sorted(job["rejected"]) == ["a/b c", 'evil"/x', "noslash"]
+    assert queue.claim("stars", 50) == [("openai/codex", None)]
+
+    job = queue.submit("quick_stats", ["octocat", "-bad", "x" * 40])
+    assert job["queued"] == 1 and len(job["rejected"]) == 2
+    job = queue.submit("intro", [{"Login": "octocat"}, {"Name": "no login"}])
+    assert job["queued"] == 1 and len(job["rejected"]) == 1
+
+
+def test_batch_sends_values_as_variables(monkeypatch):
+    sent = {}
+
+    def graphql(query, variables=None, **kwargs):
+        sent.update(query=query, variables=variables)
+        reply = {
+            "data": {"a0": {"stargazerCount": 5}, "a1": None},
+            "errors": [{"type": "NOT_FOUND", "path": ["a1"], "message": "Could not resolve"}],
+        }
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: reply)
+
+    monkeypatch.setattr(github_client, "github_graphql", graphql)
+    results, errors = enrich_stars(["o/r", "gone/repo"])
+    assert results == {"o/r": {"stars": 5}} and errors == {"gone/repo": "not found"}
+    assert sent["variables"] == {"owner0": "o", "name0": "r", "owner1": "gone", "name1": "repo"}
+    assert sent["query"].startswith("query($owner0: String!, $name0: String!,")
+    assert '"' not in sent["query"]
+
+
+def test_fallback_intros_are_not_cached():
+    def fail(**kwargs):
+        raise RuntimeError("server error")
+
+    enricher = IntroEnricher()
+    completions = SimpleNamespace(create=fail)
+    enricher.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    payloads = [json.dumps({"Login": "octocat", "Name": "Octo"})]
+    results, errors = enricher(["octocat#1"], payloads)
+    assert results == {}
+    assert errors == {"octocat#1": "no result from the model"}
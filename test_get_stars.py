@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+import get_stars
+
+
+def test_star_counts_are_refetched_after_max_age(tmp_path, monkeypatch):
+    cache = tmp_path / "cache" / "me" / "repo"
+    cache.mkdir(parents=True)
+    pd.DataFrame({"Repository": ["a/a", "b/b"], "Count": [5, 10]}).to_csv(
+        cache / "correlated_starred_repos.csv", index=False
+    )
+    output = tmp_path / "output"
+    output.mkdir()
+    pd.DataFrame(
+        {
+            "Repository": ["a/a", "b/b"],
+            "Count": [5, 10],
+            "Current_Stars": [50, 100],
+            "Score": [10.0, 10.0],
+            "Stars_Fetched": [time.time(), time.time() - 30 * 86400],
+        }
+    ).to_csv(output / "repo_analysis.csv", index=False)
+
+    fetched = []
+    monkeypatch.setattr(get_stars, "get_github_stars", lambda repo: fetched.append(repo) or 200)
+    monkeypatch.setattr(get_stars.time, "sleep", lambda seconds: None)
+    df = get_stars.fetch_star_counts("me/repo", str(tmp_path / "cache"), str(output))
+
+    assert fetched == ["b/b"]
+    stars = dict(zip(df["Repository"], df["Current_Stars"]))
+    assert stars == {"a/a": 50, "b/b": 200}
+
+    get_stars.fetch_star_counts("me/repo", str(tmp_path / "cache"), str(output), max_age=0)
+    assert fetched == ["b/b", "a/a", "b/b"]
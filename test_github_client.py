@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+import github_client
+from github_client import RATE_WINDOW, RESERVE, TokenPool, _token_id
+
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1_000_000.0
+        self.sleeps = []
+        monkeypatch.setattr(github_client.time, "time", lambda: self.now)
+        monkeypatch.setattr(github_client.time, "sleep", self.sleep)
+
+    def sleep(self, seconds):
+        assert len(self.sleeps) < 5, "acquire keeps waiting"
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_quota_spent_without_headers_comes_back(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    pool = TokenPool(["t"], state_file=str(tmp_path / "pool.json"), session=object())
+    for _ in range(github_client.TOKEN_LIMIT - RESERVE):
+        pool.acquire()
+    assert pool.acquire() == "t"
+    assert RATE_WINDOW - 2 <= sum(clock.sleeps) <= RATE_WINDOW + 2
+
+
+def test_stuck_state_without_reset_recovers(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    state_file = tmp_path / "pool.json"
+    spent = {"core": {"limit": 5000, "remaining": RESERVE, "reset": 0}}
+    state_file.write_text(json.dumps({_token_id("t"): spent}))
+    pool = TokenPool(["t"], state_file=str(state_file), session=object())
+    assert pool.acquire() == "t"
+    assert len(clock.sleeps) == 1
@@ -1,10 +1,13 @@
 import os
+import sys
 from typing import Dict, List, TypedDict
 
-import requests
 from dotenv import load_dotenv
 from tabulate import tabulate
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from github_client import github_graphql
+
 # Load environment variables
 load_dotenv()
 
@@ -30,11 +33,7 @@ class UserStats(TypedDict):
 
 def get_quick_stats(username: str) -> QuickStats:
     """Get only last year's contributions and followers count. Much faster than full stats."""
-    token = os.getenv("GITHUB_TOKEN")
-    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-
-    # GraphQL endpoint
-    url = "https://api.github.com/graphql"
+    headers = {"Accept": "application/json"}
 
     # Lightweight query for just contributions and followers
     query = """
@@ -55,9 +54,7 @@ def get_quick_stats(username: str) -> QuickStats:
     variables: Dict[str, str] = {"username": username}
 
     print(f"\nFetching quick stats for user: {username}", end="", flush=True)
-    response = requests.post(
-        url, headers=headers, json={"query": query, "variables": variables}
-    )
+    response = github_graphql(query, variables, headers=headers)
 
     if response.status_code == 200:
         data = response.json()
@@ -95,11 +92,7 @@ def display_quick_stats_table(stats: List[QuickStats]) -> None:
 
 
 def get_github_user_stats(username: str) -> UserStats:
-    token = os.getenv("GITHUB_TOKEN")
-    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-
-    # GraphQL endpoint
-    url = "https://api.github.com/graphql"
+    headers = {"Accept": "application/json"}
 
     # GraphQL query to get contribution data
     query = """
@@ -155,9 +148,7 @@ def get_github_user_stats(username: str) -> UserStats:
     variables: Dict[str, str] = {"username": username}
 
     print(f"\nFetching stats for user: {username}", end="", flush=True)
-    response = requests.post(
-        url, headers=headers, json={"query": query, "variables": variables}
-    )
+    response = github_graphql(query, variables, headers=headers)
 
     if response.status_code == 200:
         data = response.json()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from go_cache import base_name, cache_entry_name, decode_response, encode_response
+
+# File names sanitize.BaseName gives these URLs, printed by the Go code
+GO_NAMES = [
+    (
+        "https://api.github.com/repos/apify/crawlee/stargazers",
+        "https-api.github.comreposapifycrawleestargazers",
+    ),
+    (
+        "https://api.github.com/repos/apify/crawlee/stargazers?page=2&per_page=100",
+        "https-api.github.comreposapifycrawleestargazerspage-2-per-page-100",
+    ),
+    (
+        "https://api.github.com/repos/open_ai/codex-cli/stargazers?page=10",
+        "https-api.github.comreposopen-aicodex-clistargazerspage-10",
+    ),
+    (
+        "https://api.github.com/users/some_user/followers?per_page=100&page=3",
+        "https-api.github.comuserssome-userfollowersper-page-100-page-3",
+    ),
+    (
+        "https://api.github.com/repos/a/b/contributors?anon=1&",
+        "https-api.github.comreposabcontributorsanon-1-",
+    ),
+    (
+        "https://api.github.com/search/users?q=location:berlin+followers:>10",
+        "https-api.github.comsearchusersq-location-berlin-followers-10",
+    ),
+    (
+        "http://127.0.0.1:8781/repos/x--y/z.js/stargazers",
+        "http-127.0.0.1-8781reposx-yz.jsstargazers",
+    ),
+]
+
+
+@pytest.mark.parametrize("url, name", GO_NAMES)
+def test_base_name_matches_go(url, name):
+    assert base_name(url) == name
+
+
+def test_cache_entry_name_strips_the_token():
+    url = "https://api.github.com/repos/o/r/stargazers?page=2&access_token=secret"
+    assert cache_entry_name(url, "secret") == "https-api.github.comreposorstargazerspage-2-"
+
+
+def test_response_round_trip():
+    raw = encode_response(200, {"Link": '<https://x>; rel="next"'}, b'[{"a": 1}]')
+    assert decode_response(raw) == (
+        200,
+        {"Link": '<https://x>; rel="next"', "Content-Length": "10"},
+        b'[{"a": 1}]',
+    )
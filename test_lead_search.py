@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from lead_search import LeadIndex
+
+LEADS = pd.DataFrame(
+    {
+        "Name": ["Ada", "Bob", "Cy", "Di"],
+        "Company": ["Scrapers Inc", "Google", "", "Acme"],
+        "Location": ["Berlin", "München", "Paris", ""],
+        "Bio": ["web scraping and c++", "LLM tooling", "web automation", "scrapy fan"],
+    }
+)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LeadIndex.build(LEADS, locations={})
+
+
+@pytest.mark.parametrize(
+    "query, rows",
+    [
+        ("scrap*", [0, 3]),
+        ("web scraping", [0]),
+        ("web OR llm", [0, 1, 2]),
+        ("web AND NOT paris", [0]),
+        ("(berlin OR munich) scrap*", [0]),
+        ('"web automation"', [2]),
+        ("company:google", [1]),
+        ("bio:c++", [0]),
+        ("NOT (web OR scrapy)", [1]),
+    ],
+)
+def test_queries(index, query, rows):
+    assert index.search(query).tolist() == rows
+
+
+@pytest.mark.parametrize("query", ["", "web OR", "(web", "web )", "AND web"])
+def test_malformed_queries_are_rejected(index, query):
+    with pytest.raises(ValueError):
+        index.search(query)
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from leads import LeadStore
+
+
+def _rows(*rows):
+    return pd.DataFrame(rows, columns=["Login", "Email", "Name", "Followers", "owner", "repo"])
+
+
+def test_same_login_across_repos_is_one_person():
+    store = LeadStore()
+    result = store.upsert(
+        _rows(
+            ("Ada", "ada@gmail.com", "Ada", 10, "a", "one"),
+            ("ada", None, None, 12, "b", "two"),
+        )
+    )
+    assert result == {"rows": 2, "new": 1, "merged": 0}
+    assert len(store) == 1
+    assert store.people.loc[0, "Followers"] == 12
+    assert store.repo_lists().tolist() == ["a/one;b/two"]
+
+
+def test_shared_email_merges_stored_people():
+    store = LeadStore()
+    store.upsert(_rows(("ada", "ada@gmail.com", "Ada", 1, "a", "one")))
+    store.upsert(_rows(("lovelace", None, "Lovelace", 2, "b", "two")))
+    assert len(store) == 2
+
+    # The same address (gmail ignores dots and +tags) under the second login
+    result = store.upsert(_rows(("lovelace", "a.da+gh@gmail.com", None, 3, "c", "three")))
+    assert result == {"rows": 1, "new": 0, "merged": 1}
+    assert len(store) == 1
+    assert store.lookup(logins=["ada", "lovelace"]).tolist() == [0, 0]
+    assert store.lookup(emails=["ada@gmail.com"]).tolist() == [0]
+    assert store.repo_lists().tolist() == ["a/one;b/two;c/three"]
+
+
+def test_role_addresses_do_not_link_people():
+    store = LeadStore()
+    store.upsert(
+        _rows(
+            ("ada", "info@acme.io", None, 0, "a", "one"),
+            ("bob", "info@acme.io", None, 0, "a", "one"),
+        )
+    )
+    assert len(store) == 2
+
+
+def test_store_round_trip(tmp_path):
+    store = LeadStore()
+    store.upsert(_rows(("ada", "ada@gmail.com", "Ada", 5, "a", "one")))
+    path = str(tmp_path / "leads.npz")
+    store.save(path)
+    loaded = LeadStore.load(path)
+    assert loaded.repos == ["a/one"]
+    assert loaded.lookup(logins=["ADA"]).tolist() == [0]
+    assert loaded.starred_mask("a/one").tolist() == [True]
+
+
+def test_row_without_login_or_linking_email_is_its_own_person():
+    store = LeadStore()
+    result = store.upsert(
+        _rows(
+            (None, None, "Anon", 0, "a", "one"),
+            (None, "info@acme.io", "Acme", 0, "a", "one"),
+            ("ada", "ada@gmail.com", "Ada", 1, "a", "one"),
+        )
+    )
+    assert result == {"rows": 3, "new": 3, "merged": 0}
+    # Nothing can find the unlinked rows again, so they never merge
+    assert store.upsert(_rows((None, "info@acme.io", "Acme", 0, "b", "two")))["new"] == 1
+    assert len(store) == 4
+    assert store.lookup(emails=["info@acme.io"]).tolist() == [-1]
+    assert "email:info@acme.io" not in store.aliases
+
+
+def test_role_address_rows_keep_their_logins_apart_over_batches():
+    store = LeadStore()
+    store.upsert(_rows(("ada", "team@acme.io", None, 0, "a", "one")))
+    store.upsert(_rows(("bob", "team@acme.io", None, 0, "b", "two")))
+    assert store.lookup(logins=["ada", "bob"]).tolist() == [0, 1]
+    assert store.people["Email"].tolist() == ["team@acme.io", "team@acme.io"]
+
+
+def test_three_stored_people_collapse_into_the_smallest_id():
+    store = LeadStore()
+    store.upsert(
+        _rows(
+            ("zed", "zed@gmail.com", "Zed", 1, "z", "z"),
+            ("ada", "ada@gmail.com", "Ada", 1, "a", "one"),
+            ("bob", "bob@work.io", "Bob", 2, "b", "two"),
+            ("cy", "cy@gmail.com", "Cy", 3, "c", "three"),
+            ("dee", "dee@gmail.com", "Dee", 4, "d", "four"),
+        )
+    )
+    assert len(store) == 5
+    # One batch links ada, bob and cy: two rows under ada carry their emails
+    result = store.upsert(
+        _rows(
+            ("ada", "bob@work.io", None, 5, "e", "five"),
+            ("ada", "cy@gmail.com", None, 0, "e", "five"),
+        )
+    )
+    assert result == {"rows": 2, "new": 0, "merged": 2}
+    assert len(store) == 3
+    ids = store.lookup(logins=["zed", "ada", "bob", "cy", "dee"]).tolist()
+    assert ids == [0, 1, 1, 1, 2]
+    assert store.lookup(emails=["bob@work.io", "dee@gmail.com"]).tolist() == [1, 2]
+    assert store.people["Login"].tolist()[0] == "zed"
+    assert store.people.loc[2, "Login"] == "dee"
+    assert store.people.loc[1, "Followers"] == 5
+    assert store.repo_lists().tolist() == ["z/z", "a/one;b/two;c/three;e/five", "d/four"]
+    assert sorted(set(store.aliases.values())) == [0, 1, 2]
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from lookalike import LookalikeIndex
+
+
+def _leads(bios, start=0):
+    return pd.DataFrame(
+        {
+            "Login": [f"user{start + i}" for i in range(len(bios))],
+            "Bio": bios,
+            "Company": "",
+            "Location": "",
+            "repos": "a/b",
+        }
+    )
+
+
+def test_weights_stay_non_negative_across_upserts():
+    index = LookalikeIndex()
+    index.upsert(_leads(["scraping llm"] * 5 + ["gardening"] * 5), locations={})
+    assert (index.vectors.data >= 0).all()
+    index.upsert(_leads(["scraping llm"] * 3, start=10), locations={})
+    # An update replaces a lead instead of counting it twice
+    changed = _leads(["gardening"]).assign(Login="user0")
+    assert index.upsert(changed, locations={}) == {"new": 0, "updated": 1}
+    assert (index.vectors.data >= 0).all()
+    assert index.df.max() <= len(index)
+
+
+def test_shared_bio_words_rank_first():
+    bios = ["web scraping with llm agents"] * 3 + ["baking bread", "hiking", "chess openings"]
+    index = LookalikeIndex()
+    index.upsert(_leads(bios), locations={})
+    index.upsert(_leads(["scraping llm"], start=len(bios)), locations={})
+    keys, scores = index.similar(index.rows_of(["user6"]), k=6, exact=True)
+    assert set(keys[:3]) == {"user0", "user1", "user2"}
+    assert scores[2] > scores[3] and scores[0] > 0
@@ -0,0 +1,63 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+import github_client
+from github_client import GraphQLError
+from repo_topics import fetch_repo_meta
+
+REPO = {
+    "description": "A crawler",
+    "primaryLanguage": {"name": "Python"},
+    "repositoryTopics": {"nodes": [{"topic": {"name": "scraping"}}]},
+}
+
+
+def _reply(monkeypatch, reply):
+    def graphql(query, variables=None, **kwargs):
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: reply)
+
+    monkeypatch.setattr(github_client, "github_graphql", graphql)
+
+
+def test_failed_query_is_not_cached_as_missing(monkeypatch):
+    _reply(
+        monkeypatch,
+        {"data": None, "errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]},
+    )
+    cache = {}
+    with pytest.raises(GraphQLError, match="rate limit"):
+        fetch_repo_meta(["a/b", "c/d"], cache, jobs=1)
+    assert cache == {}
+
+
+def test_only_not_found_items_are_missing(monkeypatch):
+    _reply(
+        monkeypatch,
+        {
+            "data": {"a0": REPO, "a1": None},
+            "errors": [{"type": "NOT_FOUND", "path": ["a1"], "message": "Could not resolve"}],
+        },
+    )
+    cache = fetch_repo_meta(["a/b", "gone/repo"], {}, jobs=1)
+    assert cache["a/b"]["topics"] == ["scraping"] and "missing" not in cache["a/b"]
+    assert cache["gone/repo"]["missing"]
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        {"data": {"a0": REPO, "a1": None}},
+        {"data": {"a0": REPO, "a1": None}, "errors": [{"message": "timeout"}]},
+        {"data": {"a0": REPO, "a1": None}, "errors": [{"type": "FORBIDDEN", "path": ["a1"]}]},
+    ],
+)
+def test_unexplained_nulls_raise(monkeypatch, reply):
+    _reply(monkeypatch, reply)
+    with pytest.raises(GraphQLError):
+        github_client.github_graphql_batch(
+            "{alias}: repository(name: ${name}) {{ id }}", [{"name": "a"}, {"name": "b"}]
+        )
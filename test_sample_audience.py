@@ -0,0 +1,73 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from sample_audience import estimate_audience, plan_sample, stratified_estimate
+
+
+def _strata(*pages):
+    return pd.DataFrame(
+        {
+            "stratum": range(len(pages)),
+            "first_page": 0,
+            "last_page": 0,
+            "pages": pages,
+            "users": [p * 100 for p in pages],
+        }
+    )
+
+
+def test_plan_sample_draws_every_page_of_a_small_repo():
+    strata, pages = plan_sample(2000)
+    assert len(strata) == 10 and strata["pages"].tolist() == [2] * 10
+    assert sorted(pages["page"]) == list(range(1, 21))
+
+
+def test_fully_drawn_stratum_keeps_the_within_page_error():
+    # Both pages drawn, 2 of the 4 users on each fetched
+    sample = pd.DataFrame(
+        {"page": [1, 1, 2, 2], "stratum": 0, "listed": 4, "v": [0.0, 1.0, 1.0, 1.0]}
+    )
+    mean, se = stratified_estimate(sample[["v"]].to_numpy(), sample, _strata(2))
+    assert mean[0] == 0.75
+    # (1 - 2/4) * s2 / m per page, summed over the pages and divided by n^2
+    assert np.isclose(se[0], np.sqrt((0.5 * 0.5 / 2) / 4))
+
+
+def test_whole_pages_fully_drawn_have_no_error():
+    sample = pd.DataFrame({"page": [1, 1, 2, 2], "stratum": 0, "listed": 2, "v": [0, 1, 1, 1.0]})
+    _, se = stratified_estimate(sample[["v"]].to_numpy(), sample, _strata(2))
+    assert se[0] == 0
+
+
+def test_single_page_with_nothing_to_pool_is_nan():
+    sample = pd.DataFrame({"page": [3, 3], "stratum": 0, "listed": 100, "v": [0, 1.0]})
+    mean, se = stratified_estimate(sample[["v"]].to_numpy(), sample, _strata(5))
+    assert mean[0] == 0.5 and np.isnan(se[0])
+
+
+def test_strata_without_profiles_are_reported():
+    profile = {
+        "email": True,
+        "company": False,
+        "location": False,
+        "bio": False,
+        "followers": 5,
+        "starred_total": 1,
+        "starred": ["a/b"],
+    }
+    profiles = {f"u{i}": profile for i in range(4)}
+    sample = pd.DataFrame(
+        {
+            "login": ["u0", "u1", "u2", "u3"],
+            "page": [1, 1, 2, 2],
+            "stratum": 0,
+            "listed": 100,
+        }
+    )
+    summary, _ = estimate_audience("me/repo", 400, sample, _strata(2, 2), profiles)
+    assert summary["strata"] == 1 and summary["strata_missing"] == 1
+    assert summary["coverage"] == 0.5
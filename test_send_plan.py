@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from send_plan import _round_robin, write_plan
+
+
+def test_round_robin_fills_every_cap():
+    slots = _round_robin(np.array([3, 1, 2]))
+    assert len(slots) == 6
+    assert np.bincount(slots).tolist() == [3, 1, 2]
+
+
+def test_round_robin_spreads_a_mailbox_over_the_day():
+    slots = _round_robin(np.array([4, 2]))
+    assert slots.tolist() == [0, 1, 0, 0, 1, 0]
+
+
+def test_round_robin_skips_empty_mailboxes():
+    slots = _round_robin(np.array([0, 2, 0]))
+    assert slots.tolist() == [1, 1]
+    assert len(_round_robin(np.array([0, 0]))) == 0
+
+
+def test_write_plan_only_replaces_plan_files(tmp_path):
+    (tmp_path / "all.csv").write_text("Login\nada\n")
+    (tmp_path / "plan_old@example.com.csv").write_text("Login\n")
+    plan = pd.DataFrame({"mailbox": ["a@x.io", "b@x.io", "a@x.io"], "Login": ["p", "q", "r"]})
+    paths = write_plan(plan, str(tmp_path))
+    assert [os.path.basename(p) for p in paths] == ["plan_a@x.io.csv", "plan_b@x.io.csv"]
+    assert sorted(os.listdir(tmp_path)) == ["all.csv", "plan_a@x.io.csv", "plan_b@x.io.csv"]
+    assert pd.read_csv(paths[0])["Login"].tolist() == ["p", "r"]
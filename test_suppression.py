@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils"))
+from suppression import BloomFilter, SuppressionList, hash_keys
+
+
+def test_bloom_filter_has_no_false_negatives():
+    members = [f"email:user{i}@example.com" for i in range(5000)]
+    bloom = BloomFilter.sized(len(members), error_rate=0.01)
+    bloom.add(hash_keys(members))
+    assert bloom.contains(hash_keys(members), block=1000).all()
+
+    others = hash_keys([f"email:other{i}@example.com" for i in range(20000)])
+    assert bloom.contains(others).mean() < 0.02
+
+
+def test_bloom_filter_size_is_a_power_of_two():
+    bloom = BloomFilter.sized(3000)
+    bits = len(bloom.bits) * 8
+    assert bits & (bits - 1) == 0 and bloom.probes >= 1
+    assert not bloom.contains(hash_keys(["login:nobody"])).any()
+
+
+def test_suppression_list_is_exact_behind_the_filter(tmp_path):
+    path = str(tmp_path / "suppression.sqlite")
+    suppressed = SuppressionList(path)
+    suppressed.add(["email:a@example.com", "login:octocat"], "contacted")
+    found = suppressed.contains(["email:a@example.com", "login:octocat", "login:other"])
+    assert found.tolist() == [True, True, False]
+    suppressed.close()
+
+    reopened = SuppressionList(path)
+    assert reopened.contains(["login:octocat"], kinds=["bounced"]).tolist() == [False]
+    assert np.asarray(reopened.contains(["login:octocat"])).all()
+    reopened.close()
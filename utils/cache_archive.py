@@ -0,0 +1,310 @@
+# Packed archive of the Go fetcher's response cache.
+#
+# putCache writes one file per URL into stargazer_cache/<owner>/<repo>/, so a
+# big crawl leaves hundreds of thousands of small files that make listing,
+# copying, backing up and scanning the cache slow. `pack` appends a repo's
+# entries to one file, responses.pack, and their offsets to responses.idx;
+# both are only ever appended to, so packing again after another fetch adds
+# just the new and changed entries. Every record in the pack starts with a "<name>
+# <length>" line, so the index can be rebuilt from the pack alone (`reindex`).
+# CacheArchive memory-maps the pack and returns any entry by URL with one
+# dict lookup and a slice. The Go fetcher only reads loose files: `unpack`
+# writes the entries back before a fetch (the pipeline does this itself).
+#
+# Usage:
+#   python utils/cache_archive.py pack --all --remove
+#   python utils/cache_archive.py get --repo=apify/crawlee "https://api.github.com/repos/apify/crawlee/stargazers?page=2"
+#   python utils/cache_archive.py unpack --repo=apify/crawlee
+#   python utils/cache_archive.py stats
+import argparse
+import mmap
+import os
+import re
+import time
+
+from go_cache import cache_entry_name, decode_response
+from metrics import count, stage
+
+PACK_FILE = "responses.pack"
+INDEX_FILE = "responses.idx"
+# Entry names are sanitized URLs; saved_state, CSVs and JSON files stay loose
+ENTRY_RE = re.compile(r"^https?-[A-Za-z0-9.-]+$")
+
+
+def entry_names(repo_dir: str) -> list:
+    """Loose cache entries in repo_dir."""
+    if not os.path.isdir(repo_dir):
+        return []
+    return sorted(
+        entry.name
+        for entry in os.scandir(repo_dir)
+        if entry.is_file() and ENTRY_RE.match(entry.name)
+    )
+
+
+class CacheArchive:
+    """Random access by URL to the packed responses of one repo."""
+
+    def __init__(self, repo_dir: str):
+        self.repo_dir = repo_dir
+        self.pack_path = os.path.join(repo_dir, PACK_FILE)
+        self.index_path = os.path.join(repo_dir, INDEX_FILE)
+        self.index = {}
+        self._file = None
+        self._map = None
+        self.refresh()
+
+    def refresh(self):
+        """Load the index and map the pack again, to see entries appended since."""
+        self.close()
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    name, offset, length = line.split()
+                    # A name packed again later replaces the older record
+                    self.index[name] = (int(offset), int(length))
+        if os.path.exists(self.pack_path) and os.path.getsize(self.pack_path):
+            self._file = open(self.pack_path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def names(self) -> list:
+        return list(self.index)
+
+    def raw(self, name: str) -> bytes:
+        """The cached response stored as name, as Go wrote it."""
+        offset, length = self.index[name]
+        return self._map[offset : offset + length]
+
+    def get(self, url: str, token: str = ""):
+        """(status, headers, body) cached for url, or None."""
+        name = cache_entry_name(url, token)
+        if name not in self.index:
+            return None
+        return decode_response(self.raw(name))
+
+
+# Packing
+
+
+def pack(repo_dir: str, remove: bool = False) -> tuple:
+    """Append the loose entries of repo_dir to its archive; returns (packed, known).
+
+    An entry whose bytes are already the latest packed record of its name is
+    not appended again. With remove a loose file goes once its bytes are in
+    the archive on disk, unless it changed since it was read.
+    """
+    pack_path = os.path.join(repo_dir, PACK_FILE)
+    names = entry_names(repo_dir)
+    packed, lines = [], []
+    # name -> (mtime, size) of the loose files whose bytes are in the archive
+    archived = {}
+    with CacheArchive(repo_dir) as archive, open(pack_path, "ab") as data:
+        offset = data.seek(0, os.SEEK_END)
+        for name in names:
+            path = os.path.join(repo_dir, name)
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                raw = f.read()
+            archived[name] = (stat.st_mtime_ns, stat.st_size)
+            if name in archive and archive.raw(name) == raw:
+                continue
+            header = f"{name} {len(raw)}\n".encode()
+            data.write(header + raw + b"\n")
+            lines.append(f"{name} {offset + len(header)} {len(raw)}\n")
+            offset += len(header) + len(raw) + 1
+            packed.append(name)
+        data.flush()
+        os.fsync(data.fileno())
+    # The index is written after the data, so a crash in between loses
+    # nothing that reindex() cannot find again
+    with open(os.path.join(repo_dir, INDEX_FILE), "a") as index:
+        index.write("".join(lines))
+        index.flush()
+        os.fsync(index.fileno())
+    if remove:
+        for name, (mtime, size) in archived.items():
+            path = os.path.join(repo_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # The fetcher may have rewritten it meanwhile; that version stays
+            if (stat.st_mtime_ns, stat.st_size) == (mtime, size):
+                os.remove(path)
+    count("cache_entries_packed", len(packed))
+    return len(packed), len(names) - len(packed)
+
+
+def reindex(repo_dir: str) -> int:
+    """Rebuild responses.idx from the record headers in the pack.
+
+    A record cut short by a crash is dropped from the end of the pack.
+    """
+    pack_path = os.path.join(repo_dir, PACK_FILE)
+    lines = []
+    end = 0
+    with open(pack_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                break
+            name, length = header.decode().split()
+            offset = end + len(header)
+            if offset + int(length) + 1 > size:
+                break
+            lines.append(f"{name} {offset} {length}\n")
+            end = f.seek(offset + int(length) + 1)
+    if end < size:
+        with open(pack_path, "r+b") as f:
+            f.truncate(end)
+    tmp = os.path.join(repo_dir, f"{INDEX_FILE}.tmp")
+    with open(tmp, "w") as f:
+        f.write("".join(lines))
+    os.replace(tmp, os.path.join(repo_dir, INDEX_FILE))
+    return len(lines)
+
+
+def compact(repo_dir: str) -> int:
+    """Rewrite the archive without the records that were packed again later."""
+    pack_path = os.path.join(repo_dir, PACK_FILE)
+    index_path = os.path.join(repo_dir, INDEX_FILE)
+    lines = []
+    offset = 0
+    with CacheArchive(repo_dir) as archive, open(f"{pack_path}.tmp", "wb") as data:
+        for name in archive.names():
+            raw = archive.raw(name)
+            header = f"{name} {len(raw)}\n".encode()
+            data.write(header + raw + b"\n")
+            lines.append(f"{name} {offset + len(header)} {len(raw)}\n")
+            offset += len(header) + len(raw) + 1
+    with open(f"{index_path}.tmp", "w") as f:
+        f.write("".join(lines))
+    os.replace(f"{pack_path}.tmp", pack_path)
+    os.replace(f"{index_path}.tmp", index_path)
+    return len(lines)
+
+
+def unpack(repo_dir: str, overwrite: bool = False) -> int:
+    """Write the packed entries back as the files the Go fetcher reads."""
+    written = 0
+    with CacheArchive(repo_dir) as archive:
+        for name in archive.names():
+            path = os.path.join(repo_dir, name)
+            if not overwrite and os.path.exists(path):
+                continue
+            with open(path, "wb") as f:
+                f.write(archive.raw(name))
+            written += 1
+    count("cache_entries_unpacked", written)
+    return written
+
+
+def has_archive(repo_dir: str) -> bool:
+    return os.path.exists(os.path.join(repo_dir, INDEX_FILE))
+
+
+def read_response(cache_dir: str, repo: str, url: str, token: str = ""):
+    """(status, headers, body) cached for url, loose or packed; None if missing."""
+    repo_dir = os.path.join(cache_dir, repo)
+    path = os.path.join(repo_dir, cache_entry_name(url, token))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return decode_response(f.read())
+    if not has_archive(repo_dir):
+        return None
+    with CacheArchive(repo_dir) as archive:
+        return archive.get(url, token)
+
+
+def _repos(args) -> list:
+    from saved_state import list_cached_repos
+
+    if args.repo:
+        return args.repo
+    if args.all:
+        root = args.cache_dir
+        repos = {
+            f"{owner}/{name}"
+            for owner in os.listdir(root)
+            if os.path.isdir(os.path.join(root, owner))
+            for name in os.listdir(os.path.join(root, owner))
+            if os.path.isdir(os.path.join(root, owner, name))
+        }
+        return sorted(repos | set(list_cached_repos(root)))
+    raise SystemExit("give --repo or --all")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the Go response cache into archives.")
+    parser.add_argument("--cache-dir", default="stargazer_cache", help="Cache directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help in [
+        ("pack", "Append loose entries to the repo archive"),
+        ("unpack", "Write the packed entries back as files for the Go fetcher"),
+        ("compact", "Drop superseded records from the archive"),
+        ("reindex", "Rebuild the index from the pack"),
+        ("stats", "Loose and packed entries per repo"),
+    ]:
+        command = commands.add_parser(name, help=help)
+        command.add_argument("--repo", action="append", default=[], help="owner/repo")
+        command.add_argument("--all", action="store_true", help="Every repo in the cache")
+        if name == "pack":
+            command.add_argument("--remove", action="store_true", help="Delete the packed files")
+        if name == "unpack":
+            command.add_argument("--overwrite", action="store_true", help="Replace loose files")
+    get = commands.add_parser("get", help="Print a cached response body")
+    get.add_argument("--repo", required=True, help="owner/repo")
+    get.add_argument("url")
+    args = parser.parse_args(argv)
+
+    if args.command == "get":
+        response = read_response(args.cache_dir, args.repo, args.url)
+        if response is None:
+            raise SystemExit(f"{args.url} is not cached for {args.repo}")
+        print(response[2].decode("utf-8", "replace"))
+        return
+
+    for repo in _repos(args):
+        repo_dir = os.path.join(args.cache_dir, repo)
+        start = time.perf_counter()
+        if args.command == "pack":
+            with stage(f"pack/{repo}"):
+                packed, known = pack(repo_dir, args.remove)
+            print(f"{repo}: packed {packed} entries ({known} already packed)", end="")
+        elif args.command == "unpack":
+            print(f"{repo}: unpacked {unpack(repo_dir, args.overwrite)} entries", end="")
+        elif args.command == "compact":
+            print(f"{repo}: {compact(repo_dir)} entries after compaction", end="")
+        elif args.command == "reindex":
+            print(f"{repo}: indexed {reindex(repo_dir)} records", end="")
+        else:
+            with CacheArchive(repo_dir) as archive:
+                packed = len(archive)
+            size = os.path.getsize(archive.pack_path) if has_archive(repo_dir) else 0
+            loose = len(entry_names(repo_dir))
+            print(f"{repo}: {loose} loose, {packed} packed ({size / 1e6:.1f} MB)", end="")
+        print(f" in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
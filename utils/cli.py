@@ -0,0 +1,119 @@
+# One entry point for the Python utilities: ./stargazers-py <command> [args]
+#
+# Only argparse and the standard library are imported up front; every command
+# imports its own dependencies when it runs, so `stargazers-py --help` and the
+# light commands start in milliseconds instead of loading pandas, matplotlib,
+# seaborn, networkx and openai first. benchmarks/bench_import.py guards this.
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS = os.path.join(ROOT, "utils")
+EMAILS = os.path.join(ROOT, "emails")
+
+
+def _fetch_stars(argv):
+    from get_stars import main
+
+    main(["--no-plot"] + argv)
+
+
+def _combine_emails(argv):
+    sys.path.insert(0, EMAILS)
+    from create_data import main
+
+    main(argv)
+
+
+def _score_leads(argv):
+    sys.path.insert(0, EMAILS)
+    from create_personlized_message import main
+
+    main(argv)
+
+
+def _plot(argv):
+    parser = argparse.ArgumentParser(
+        prog="stargazers-py plot", description="Plot repo scores and competitor stats."
+    )
+    parser.add_argument("--repo", default="gregpr07/browser-use", help="owner/repo")
+    parser.add_argument("--cache", default="stargazer_cache", help="Cache directory")
+    parser.add_argument("--output", default="output", help="Folder with repo_analysis.csv")
+    parser.add_argument(
+        "--no-competitors", action="store_true", help="Skip the analyze output plots"
+    )
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from competitor_plotting import load_analysis, plot_competitor
+    from get_stars import plot_repo_analysis
+
+    plot_repo_analysis(pd.read_csv(f"{args.output}/repo_analysis.csv"), args.output)
+    if not args.no_competitors:
+        plot_competitor(load_analysis(args.cache, args.repo))
+
+
+def _module(name: str):
+    """Run the main() of a utils module; it parses sys.argv itself."""
+
+    def run(argv):
+        __import__(name).main()
+
+    return run
+
+
+# name -> (help, handler)
+COMMANDS = {
+    "fetch-stars": ("Star counts and scores of correlated repos", _fetch_stars),
+    "combine-emails": ("Combine, clean and dedupe the scraped email CSVs", _combine_emails),
+    "score-leads": ("Personalized intros and scores with Azure OpenAI", _score_leads),
+    "plot": ("Repo score and competitor plots", _plot),
+    "repo-tags": ("Fetch repo topics into output/repo-tags-all.json", _module("repo_topics")),
+    "topics": ("Repository tag network and category plots", _module("visulize_topics")),
+    "pipeline": ("Run the whole outreach pipeline", _module("pipeline")),
+    "leads": ("Cross-repo lead identity store", _module("leads")),
+    "query": ("SQL over the cached CSV/Parquet files", _module("query")),
+    "search": ("Keyword and location search over the leads", _module("lead_search")),
+    "locations": ("Normalize free-text locations", _module("locations")),
+    "lookalike": ("Leads most similar to a seed set", _module("lookalike")),
+    "influence": ("Rank stargazers by follower-graph PageRank", _module("follow_graph")),
+    "sample": ("Estimate a repo's audience from a stargazer sample", _module("sample_audience")),
+    "suppress": ("Contacted, bounced and unsubscribed leads", _module("suppression")),
+    "schedule": ("Per-mailbox send plan of the scored leads", _module("send_plan")),
+    "lead-schema": ("Memory of a lead CSV with the compact dtypes", _module("lead_schema")),
+    "cache": ("Pack the Go response cache into one archive per repo", _module("cache_archive")),
+    "star-index": ("Stargazer x repo index queries", _module("star_index")),
+    "cohorts": ("Per-cohort stargazer analysis", _module("cohorts")),
+    "star-trends": ("Star velocity and spikes across repos", _module("star_trends")),
+    "enrich": ("Enrichment daemon with a job queue", _module("enrich_daemon")),
+    "tokens": ("Remaining GitHub quota per pooled token", _module("github_client")),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        prog="stargazers-py",
+        description="Stargazer analytics and outreach utilities.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n"
+        + "\n".join(f"  {name:<16}{help}" for name, (help, _) in COMMANDS.items())
+        + "\n\nRun `stargazers-py <command> --help` for the options of a command.",
+    )
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command")
+    # Everything after the command belongs to the command
+    args = parser.parse_args(argv[:1])
+    rest = argv[1:]
+
+    sys.path.insert(0, UTILS)
+    from metrics import get_metrics
+
+    # Reports and argparse usage are named after the command, not this file
+    get_metrics().run = args.command.replace("-", "_")
+    sys.argv = [f"stargazers-py {args.command}"] + rest
+    COMMANDS[args.command][1](rest)
+
+
+if __name__ == "__main__":
+    main()
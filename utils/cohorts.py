@@ -0,0 +1,217 @@
+# Correlated-repo rankings and stargazer attribute stats per cohort.
+#
+# Cohorts are cut by star-date window, follower bucket, has-email and
+# company-present. All cohorts are computed in one grouped pass: a sparse
+# stargazer x cohort membership matrix is multiplied against the star index
+# and the profile attributes.
+#
+# Usage:
+#   python utils/star_index.py index
+#   python utils/cohorts.py --window=Q --top=20
+#   python utils/cohorts.py --cross --dimensions followers has_email
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from metrics import rows, stage
+from star_index import DEFAULT_INDEX, StarIndex
+
+DIMENSIONS = ["window", "followers", "has_email", "has_company"]
+DEFAULT_FOLLOWER_BINS = [0, 10, 100, 1000]
+
+# Profile columns reported as a share of the cohort rather than an average
+RATE_COLUMNS = ["has_email", "has_company"]
+
+
+def _bucket_labels(bins: list) -> list:
+    labels = [f"{lo}-{hi - 1}" for lo, hi in zip(bins, bins[1:])]
+    labels.append(f"{bins[-1]}+")
+    return labels
+
+
+def cohort_labels(
+    profiles: pd.DataFrame, window="Q", follower_bins=DEFAULT_FOLLOWER_BINS
+) -> pd.DataFrame:
+    """Label every stargazer with its value for each cohort dimension."""
+    periods = profiles["starred_at"].dt.to_period(window)
+    followers = pd.cut(
+        profiles["followers"],
+        bins=[*follower_bins, np.inf],
+        right=False,
+        labels=_bucket_labels(follower_bins),
+    )
+    return pd.DataFrame(
+        {
+            "window": periods.astype(str).where(periods.notna(), "unknown"),
+            "followers": followers.astype(str),
+            "has_email": np.where(profiles["has_email"], "yes", "no"),
+            "has_company": np.where(profiles["has_company"], "yes", "no"),
+        },
+        index=profiles.index,
+    )
+
+
+def membership(labels: pd.DataFrame, dimensions: list, cross: bool):
+    """Sparse stargazer x cohort matrix plus a frame describing each cohort.
+
+    Without cross every dimension value is its own cohort (a stargazer
+    belongs to one cohort per dimension) and an "all" cohort is added.
+    With cross the cohorts are the observed combinations of all dimensions.
+    """
+    n = len(labels)
+    if cross:
+        grouped = labels.groupby(dimensions, sort=True, observed=True)
+        codes = grouped.ngroup().to_numpy()
+        keys = grouped.size().index.to_frame(index=False)
+        cohorts = pd.DataFrame(
+            {
+                "cohort": keys.apply(
+                    lambda r: " & ".join(f"{d}={r[d]}" for d in dimensions), axis=1
+                ),
+                "dimension": " & ".join(dimensions),
+            }
+        )
+        cohorts = pd.concat([cohorts, keys], axis=1)
+        rows, cols = np.arange(n), codes
+    else:
+        names = [("all", "all", "all")]
+        rows, cols = [np.arange(n)], [np.zeros(n, dtype=np.int64)]
+        for dim in dimensions:
+            codes, uniques = pd.factorize(labels[dim], sort=True)
+            rows.append(np.arange(n))
+            cols.append(codes + len(names))
+            names.extend((f"{dim}={u}", dim, u) for u in uniques)
+        cohorts = pd.DataFrame(names, columns=["cohort", "dimension", "value"])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(n, len(cohorts))
+    )
+    return matrix, cohorts
+
+
+def analyze_cohorts(
+    index: StarIndex,
+    dimensions=DIMENSIONS,
+    cross=False,
+    window="Q",
+    follower_bins=DEFAULT_FOLLOWER_BINS,
+    top=20,
+    exclude=None,
+):
+    """Return (cohort stats, correlated repos per cohort) DataFrames."""
+    profiles = index.profiles
+    labels = cohort_labels(profiles, window, follower_bins)
+    members, cohorts = membership(labels, list(dimensions), cross)
+    members_t = members.T.tocsr()
+
+    # Attribute stats: one product for all cohorts and columns
+    attrs = profiles[["followers", "following", "public_repos", "commits"]].astype(
+        "float64"
+    )
+    now = np.datetime64("now", "s")
+    attrs["age_days"] = (now - profiles["created_at"].to_numpy()) / np.timedelta64(1, "D")
+    for column in RATE_COLUMNS:
+        attrs[column] = profiles[column].astype("float64")
+    sizes = np.asarray(members.sum(axis=0)).ravel()
+    # Missing values (accounts without created_at) are left out of the mean
+    values = attrs.to_numpy()
+    known = ~np.isnan(values)
+    sums = members_t @ np.where(known, values, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / (members_t @ known.astype("float64"))
+
+    stats = cohorts.copy()
+    stats["size"] = sizes
+    for i, column in enumerate(attrs.columns):
+        name = f"{column}_rate" if column in RATE_COLUMNS else f"avg_{column}"
+        stats[name] = np.round(means[:, i], 2)
+
+    # Correlated repos: cohort x repo star counts in one sparse product
+    counts = (members_t @ index.matrix.astype(np.int64)).tocsr()
+    if exclude is None:
+        exclude = index.sources
+    excluded = [index.repo_ids[r] for r in exclude if r in index.repo_ids]
+    if excluded:
+        counts.data[np.isin(counts.indices, excluded)] = 0
+        counts.eliminate_zeros()
+
+    total = len(profiles)
+    global_share = index.repo_counts() / max(total, 1)
+    frames = []
+    for i in range(counts.shape[0]):
+        start, end = counts.indptr[i], counts.indptr[i + 1]
+        if start == end or sizes[i] == 0:
+            continue
+        cols, values = counts.indices[start:end], counts.data[start:end]
+        order = np.argsort(-values, kind="stable")[:top]
+        cols, values = cols[order], values[order]
+        share = values / sizes[i]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "cohort": cohorts["cohort"].iat[i],
+                    "Rank": np.arange(1, len(cols) + 1),
+                    "Repository": [index.repos[j] for j in cols],
+                    "Count": values,
+                    "Share": np.round(share, 4),
+                    "Lift": np.round(share / global_share[cols], 2),
+                }
+            )
+        )
+    correlated = (
+        pd.concat(frames, ignore_index=True)
+        if frames
+        else pd.DataFrame(columns=["cohort", "Rank", "Repository", "Count", "Share", "Lift"])
+    )
+    return stats, correlated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-cohort stargazer analysis.")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index from star_index.py")
+    parser.add_argument(
+        "--dimensions", nargs="+", default=DIMENSIONS, choices=DIMENSIONS
+    )
+    parser.add_argument("--cross", action="store_true", help="Cross all dimensions")
+    parser.add_argument("--window", default="Q", help="Star-date window (pandas period)")
+    parser.add_argument(
+        "--follower-bins",
+        default=",".join(map(str, DEFAULT_FOLLOWER_BINS)),
+        help="Lower bounds of follower buckets",
+    )
+    parser.add_argument("--top", type=int, default=20, help="Repos per cohort")
+    parser.add_argument("--output", default="output", help="Output folder")
+    args = parser.parse_args()
+
+    with stage("load"):
+        index = StarIndex.load(args.index)
+    start = time.perf_counter()
+    with stage("cohorts", rows_in=index.shape[0]):
+        stats, correlated = analyze_cohorts(
+            index,
+            dimensions=args.dimensions,
+            cross=args.cross,
+            window=args.window,
+            follower_bins=[int(b) for b in args.follower_bins.split(",")],
+            top=args.top,
+        )
+        rows(rows_out=len(stats))
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.output, exist_ok=True)
+    stats.to_csv(f"{args.output}/cohort_stats.csv", index=False)
+    correlated.to_csv(f"{args.output}/cohort_correlated_repos.csv", index=False)
+    print(stats.to_string(index=False))
+    print(
+        f"\n{len(stats)} cohorts over {index.shape[0]:,} stargazers in {elapsed:.2f}s;"
+        f" wrote {args.output}/cohort_stats.csv and cohort_correlated_repos.csv"
+    )
+
+
+if __name__ == "__main__":
+    main()
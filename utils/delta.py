@@ -0,0 +1,70 @@
+# Incremental processing for daily runs.
+#
+# Each pipeline stage keeps a set of row hashes per input source. On the next
+# run only rows whose hash is new (a new stargazer, or a changed profile) are
+# handed to the stage, and its results are merged into the existing outputs.
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics import count
+
+DEFAULT_STATE_DIR = ".delta"
+
+
+def row_hashes(df: pd.DataFrame, columns=None) -> np.ndarray:
+    """64-bit hash of every row (over the given columns)."""
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    # Nullable integers (lead_schema) hash like the int64/float64 columns
+    # read_csv gives them, so state saved before stays valid
+    ints = [
+        c
+        for c, t in df.dtypes.items()
+        if isinstance(t, pd.api.extensions.ExtensionDtype) and t.kind in "iu"
+    ]
+    if ints:
+        df = df.astype({c: "float64" if df[c].hasnans else "int64" for c in ints})
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def merge_delta(existing: pd.DataFrame, delta: pd.DataFrame, key) -> pd.DataFrame:
+    """Replace rows of existing that share a key with delta and append the rest."""
+    key = [key] if isinstance(key, str) else list(key)
+    stale = existing.set_index(key).index.isin(delta.set_index(key).index)
+    return pd.concat([existing[~stale], delta], ignore_index=True)
+
+
+class DeltaTracker:
+    """Row hashes a pipeline stage has already processed, per source."""
+
+    def __init__(self, stage: str, state_dir: str = DEFAULT_STATE_DIR, columns=None):
+        self.path = os.path.join(state_dir, f"{stage}.npz")
+        self.columns = columns
+        self.seen = {}
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self.seen = {name: data[name] for name in data.files}
+
+    def changed(self, df: pd.DataFrame, source: str = "default") -> pd.DataFrame:
+        """Rows of df that are new or differ from the committed ones."""
+        seen = self.seen.get(source)
+        if seen is None or len(df) == 0:
+            return df
+        changed = df[~np.isin(row_hashes(df, self.columns), seen)]
+        count("delta_unchanged_rows", len(df) - len(changed))
+        return changed
+
+    def commit(self, df: pd.DataFrame, source: str = "default"):
+        """Mark the rows of df as processed (persisted by save)."""
+        hashes = row_hashes(df, self.columns)
+        previous = self.seen.get(source, np.array([], dtype=np.uint64))
+        self.seen[source] = np.union1d(previous, hashes)
+
+    def reset(self):
+        self.seen = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        np.savez(self.path, **self.seen)
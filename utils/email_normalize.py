@@ -0,0 +1,135 @@
+# Validate, canonicalize and classify scraped emails.
+#
+# Everything runs on whole pandas columns with precompiled patterns, so it
+# scales to millions of rows. The canonical key lowercases the address,
+# drops +tags and gmail dots, so "Jane.Doe+gh@GMail.com" and
+# "janedoe@googlemail.com" dedupe to one lead.
+import re
+
+import numpy as np
+import pandas as pd
+
+EMAIL_RE = re.compile(
+    r"(?P<local>[a-z0-9!#$%&'*+/=?^_`{|}~.-]+)@(?P<domain>[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,})"
+)
+NOREPLY_LOCAL_RE = re.compile(r"^(?:no-?reply|do-?not-?reply|noreply\d*)$")
+
+NOREPLY_DOMAINS = ("users.noreply.github.com", "noreply.github.com")
+DOTLESS_DOMAINS = {"gmail.com"}
+DOMAIN_ALIASES = {"googlemail.com": "gmail.com"}
+FREE_DOMAINS = {
+    "gmail.com",
+    "outlook.com",
+    "hotmail.com",
+    "live.com",
+    "yahoo.com",
+    "icloud.com",
+    "me.com",
+    "protonmail.com",
+    "proton.me",
+    "qq.com",
+    "163.com",
+    "126.com",
+    "foxmail.com",
+    "gmx.de",
+    "gmx.net",
+    "web.de",
+    "yandex.ru",
+    "mail.ru",
+    "naver.com",
+}
+ROLE_LOCALS = {
+    "admin",
+    "contact",
+    "dev",
+    "hello",
+    "hi",
+    "info",
+    "jobs",
+    "mail",
+    "office",
+    "sales",
+    "security",
+    "support",
+    "team",
+}
+
+PROFILE_FIELDS = ["Name", "Company", "Location", "Bio"]
+
+
+def normalize_emails(emails: pd.Series) -> pd.DataFrame:
+    """Canonical key, domain and type for every email.
+
+    EmailType is one of "personal", "work", "role", "noreply" or "invalid";
+    EmailKey is empty for invalid addresses.
+    """
+    cleaned = emails.astype("string").str.strip().str.lower()
+
+    # The same person shows up once per starred competitor, so normalize each
+    # distinct address once and broadcast back; missing values map to "".
+    codes, uniques = pd.factorize(cleaned)
+    uniques = pd.Series(np.append(uniques.astype(object), ""), dtype="string")
+    codes = np.where(codes < 0, len(uniques) - 1, codes)
+    normalized = _normalize_unique(uniques).take(codes)
+    normalized.index = emails.index
+    return normalized
+
+
+def _normalize_unique(emails: pd.Series) -> pd.DataFrame:
+    valid = emails.str.fullmatch(EMAIL_RE).fillna(False).to_numpy()
+    parts = emails.str.rpartition("@")
+    local = parts[0].str.partition("+")[0]
+    domain = parts[2].replace(DOMAIN_ALIASES)
+    dotless = domain.isin(DOTLESS_DOMAINS).to_numpy()
+    local = local.where(~dotless, local.str.replace(".", "", regex=False))
+
+    noreply = (
+        domain.str.endswith(NOREPLY_DOMAINS).to_numpy()
+        | local.str.match(NOREPLY_LOCAL_RE).to_numpy()
+    )
+    email_type = np.select(
+        [
+            ~valid,
+            noreply,
+            local.isin(ROLE_LOCALS).to_numpy(),
+            domain.isin(FREE_DOMAINS).to_numpy(),
+        ],
+        ["invalid", "noreply", "role", "personal"],
+        default="work",
+    )
+    return pd.DataFrame(
+        {
+            "Email": emails.to_numpy(),
+            "EmailKey": np.where(valid, (local + "@" + domain).to_numpy(), ""),
+            "EmailDomain": np.where(valid, domain.to_numpy(), ""),
+            "EmailType": email_type,
+        }
+    )
+
+
+def profile_richness(df: pd.DataFrame) -> pd.Series:
+    """Number of non-empty profile fields per row."""
+    fields = [c for c in PROFILE_FIELDS if c in df.columns]
+    filled = df[fields].notna() & df[fields].astype("string").ne("")
+    return filled.sum(axis=1)
+
+
+def dedupe_leads(
+    df: pd.DataFrame, keep_types=("personal", "work", "role"), key: str = "EmailKey"
+) -> pd.DataFrame:
+    """Drop unusable emails and keep the richest profile per key (canonical email)."""
+    normalized = normalize_emails(df["Email"])
+    df = df.assign(
+        Email=normalized["Email"],
+        EmailKey=normalized["EmailKey"],
+        EmailType=normalized["EmailType"],
+    )
+    df = df[df["EmailType"].isin(keep_types)]
+
+    # Richest profile first, most followers as tie-break
+    order = pd.DataFrame({"richness": profile_richness(df)}, index=df.index)
+    if "Followers" in df.columns:
+        order["followers"] = pd.to_numeric(df["Followers"], errors="coerce").fillna(0)
+    ranked = order.sort_values(list(order.columns), ascending=False, kind="stable")
+    df = df.loc[ranked.index]
+    return df.drop_duplicates(subset=[key]).sort_index()
@@ -0,0 +1,533 @@
+# Long-running lead enrichment service with an SQLite job queue.
+#
+# Clients submit jobs (lists of repos or logins) over a Unix socket or local
+# HTTP port and get a job id back at once. Every item becomes a task keyed by
+# (kind, key) that is shared by all jobs asking for it, so in-flight work is
+# never duplicated and fresh results are served from the queue database
+# without new requests. One worker thread per kind drains queued tasks across
+# all jobs in batches: aliased GraphQL queries for star counts and quick
+# stats, one LLM request per chunk of profiles for intros. The GitHub
+# session, token pool and OpenAI client stay warm for the life of the daemon.
+#
+# Usage:
+#   python utils/enrich_daemon.py serve --socket=/tmp/stargazers-enrich.sock
+#   python utils/enrich_daemon.py submit stars openai/codex apify/crawlee --wait
+#   python utils/enrich_daemon.py submit intro --csv=emails/all_competitors_filtered.csv
+#   python utils/enrich_daemon.py status 12
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import re
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import count
+
+EMAILS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "emails")
+DEFAULT_DB = os.path.join(".delta", "enrich.sqlite")
+DEFAULT_SOCKET = os.getenv("STARGAZERS_ENRICH_SOCKET", "/tmp/stargazers-enrich.sock")
+
+# Results younger than this are served without refetching
+DEFAULT_TTL = 24 * 3600
+
+# Items per batched request
+BATCH_SIZE = {"stars": 50, "quick_stats": 20, "intro": 100}
+KINDS = tuple(BATCH_SIZE)
+
+# GitHub's charsets for logins (also repo owners) and repo names
+LOGIN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9-]{0,38}")
+REPO_NAME_RE = re.compile(r"[A-Za-z0-9._-]{1,100}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_queued ON tasks (kind, status);
+CREATE TABLE IF NOT EXISTS job_tasks (
+    job_id INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_tasks_job ON job_tasks (job_id);
+"""
+
+
+def task_key(kind: str, item) -> tuple:
+    """(item name, task key, payload) of a submitted item.
+
+    Intro items are profiles; the key includes a hash of the profile so a
+    changed bio is scored again while an unchanged one is served from cache.
+    Raises ValueError for an item that cannot be a GitHub repo or login.
+    """
+    if kind == "stars":
+        owner, _, name = str(item).partition("/")
+        if not (
+            LOGIN_RE.fullmatch(owner) and REPO_NAME_RE.fullmatch(name) and name not in (".", "..")
+        ):
+            raise ValueError(f"invalid repo {item!r}, expected owner/name")
+    elif kind == "quick_stats" and not LOGIN_RE.fullmatch(str(item)):
+        raise ValueError(f"invalid login {item!r}")
+    elif kind == "intro":
+        login = item.get("Login") if isinstance(item, dict) else None
+        if not isinstance(login, str) or not LOGIN_RE.fullmatch(login):
+            raise ValueError(f"invalid Login {login!r} in intro profile")
+    if kind != "intro":
+        return str(item), str(item), None
+    payload = json.dumps(item, sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode()).hexdigest()[:12]
+    return item["Login"], f"{item['Login']}#{digest}", payload
+
+
+class JobQueue:
+    """Jobs and deduplicated tasks in SQLite (one connection per thread)."""
+
+    def __init__(self, path: str = DEFAULT_DB, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = self.db
+        db.executescript(SCHEMA)
+        # Tasks a crashed daemon was working on are queued again
+        db.execute("UPDATE tasks SET status = 'queued' WHERE status = 'running'")
+        db.commit()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "db"):
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return self._local.db
+
+    def submit(self, kind: str, items: list) -> dict:
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r}; use one of {', '.join(KINDS)}")
+        now = time.time()
+        queued = cached = 0
+        # Bad items are refused one by one instead of failing a whole batch
+        # (of several jobs) at GitHub later
+        rejected = {}
+        with self._lock:
+            db = self.db
+            job_id = db.execute(
+                "INSERT INTO jobs (kind, created) VALUES (?, ?)", (kind, now)
+            ).lastrowid
+            links = []
+            for item in items:
+                try:
+                    name, key, payload = task_key(kind, item)
+                except ValueError as e:
+                    rejected[json.dumps(item) if isinstance(item, dict) else str(item)] = str(e)
+                    continue
+                links.append((job_id, name, kind, key))
+                row = db.execute(
+                    "SELECT status, updated FROM tasks WHERE kind = ? AND key = ?", (kind, key)
+                ).fetchone()
+                if row is None:
+                    db.execute(
+                        "INSERT INTO tasks (kind, key, payload, status, updated)"
+                        " VALUES (?, ?, ?, 'queued', ?)",
+                        (kind, key, payload, now),
+                    )
+                    queued += 1
+                elif row[0] == "done" and now - row[1] > self.ttl or row[0] == "failed":
+                    db.execute(
+                        "UPDATE tasks SET status = 'queued', payload = ?, updated = ?"
+                        " WHERE kind = ? AND key = ?",
+                        (payload, now, kind, key),
+                    )
+                    queued += 1
+                elif row[0] == "done":
+                    cached += 1
+                # queued or running: another job already asked for it
+            db.executemany("INSERT INTO job_tasks VALUES (?, ?, ?, ?)", links)
+            db.commit()
+        count(f"enrich_{kind}_cached", cached)
+        if queued:
+            with self.wakeup:
+                self.wakeup.notify_all()
+        if rejected:
+            count(f"enrich_{kind}_rejected", len(rejected))
+        return {
+            "id": job_id,
+            "items": len(items),
+            "queued": queued,
+            "cached": cached,
+            "rejected": rejected,
+        }
+
+    def claim(self, kind: str, limit: int) -> list:
+        """Mark up to limit queued tasks of kind as running; returns (key, payload)."""
+        with self._lock:
+            db = self.db
+            rows = db.execute(
+                "SELECT key, payload FROM tasks WHERE kind = ? AND status = 'queued'"
+                " ORDER BY updated LIMIT ?",
+                (kind, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE tasks SET status = 'running' WHERE kind = ? AND key = ?",
+                [(kind, key) for key, _ in rows],
+            )
+            db.commit()
+        return rows
+
+    def finish(self, kind: str, results: dict, errors: dict = None):
+        """Store results (key -> JSON-able) and errors (key -> message)."""
+        now = time.time()
+        with self._lock:
+            db = self.db
+            db.executemany(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, updated = ?"
+                " WHERE kind = ? AND key = ?",
+                [(json.dumps(r), now, kind, key) for key, r in results.items()],
+            )
+            db.executemany(
+                "UPDATE tasks SET status = 'failed', error = ?, updated = ?"
+                " WHERE kind = ? AND key = ?",
+                [(e, now, kind, key) for key, e in (errors or {}).items()],
+            )
+            db.commit()
+        with self.wakeup:
+            self.wakeup.notify_all()
+
+    def job(self, job_id: int) -> dict:
+        rows = self.db.execute(
+            "SELECT jt.item, t.status, t.result, t.error FROM job_tasks jt"
+            " JOIN tasks t ON t.kind = jt.kind AND t.key = jt.key WHERE jt.job_id = ?",
+            (job_id,),
+        ).fetchall()
+        kind = self.db.execute("SELECT kind FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if kind is None:
+            raise KeyError(job_id)
+        statuses = [status for _, status, _, _ in rows]
+        pending = sum(s in ("queued", "running") for s in statuses)
+        return {
+            "id": job_id,
+            "kind": kind[0],
+            "status": "running" if pending else "done",
+            "pending": pending,
+            "failed": statuses.count("failed"),
+            "results": {
+                item: json.loads(result) if result else {"error": error}
+                for item, status, result, error in rows
+                if status in ("done", "failed")
+            },
+        }
+
+    def wait(self, job_id: int, timeout: float) -> dict:
+        deadline = time.time() + timeout
+        while True:
+            job = self.job(job_id)
+            remaining = deadline - time.time()
+            if job["status"] == "done" or remaining <= 0:
+                return job
+            with self.wakeup:
+                self.wakeup.wait(min(remaining, 1.0))
+
+
+# Batched enrichment
+
+
+def enrich_stars(keys: list) -> tuple:
+    from github_client import github_graphql_batch
+
+    names = [dict(zip(("owner", "name"), key.split("/", 1))) for key in keys]
+    data = github_graphql_batch(
+        "{alias}: repository(owner: ${owner}, name: ${name}) {{ stargazerCount }}", names
+    )
+    results, errors = {}, {}
+    for key, repo in zip(keys, data):
+        if repo:
+            results[key] = {"stars": repo["stargazerCount"]}
+        else:
+            errors[key] = "not found"
+    return results, errors
+
+
+def enrich_quick_stats(keys: list) -> tuple:
+    from github_client import github_graphql_batch
+
+    data = github_graphql_batch(
+        "{alias}: user(login: ${login}) {{ followers {{ totalCount }}"
+        " contributionsCollection {{ contributionCalendar {{ totalContributions }} }} }}",
+        [{"login": key} for key in keys],
+    )
+    results, errors = {}, {}
+    for key, user in zip(keys, data):
+        if not user:
+            errors[key] = "not found"
+            continue
+        results[key] = {
+            "username": key,
+            "contributions_last_year": user["contributionsCollection"]["contributionCalendar"][
+                "totalContributions"
+            ],
+            "followers": user["followers"]["totalCount"],
+        }
+    return results, errors
+
+
+class IntroEnricher:
+    """LLM intros with one client kept for the life of the daemon."""
+
+    def __init__(self):
+        self.client = None
+
+    def __call__(self, keys: list, payloads: list) -> tuple:
+        sys.path.insert(0, EMAILS)
+        import pandas as pd
+        from create_personlized_message import generate_personalized_intros, make_client
+
+        if self.client is None:
+            self.client = make_client()
+        chunk = pd.DataFrame([json.loads(p) for p in payloads])
+        intros, scores = generate_personalized_intros(chunk, self.client)
+        # Fallback intros are not cached; the profiles fail and are retried
+        # when they are submitted again
+        results, errors = {}, {}
+        for key, intro, score in zip(keys, intros, scores):
+            if score is None:
+                errors[key] = "no result from the model"
+            else:
+                results[key] = {"intro": intro, "score": score}
+        return results, errors
+
+
+class Worker(threading.Thread):
+    """Drains the queued tasks of one kind in batches."""
+
+    def __init__(self, queue: JobQueue, kind: str, handler, stop: threading.Event):
+        super().__init__(name=f"enrich-{kind}", daemon=True)
+        self.queue, self.kind, self.handler, self.stop = queue, kind, handler, stop
+
+    def run(self):
+        while not self.stop.is_set():
+            batch = self.queue.claim(self.kind, BATCH_SIZE[self.kind])
+            if not batch:
+                with self.queue.wakeup:
+                    self.queue.wakeup.wait(1.0)
+                continue
+            keys = [key for key, _ in batch]
+            count(f"enrich_{self.kind}_batches")
+            count(f"enrich_{self.kind}_tasks", len(keys))
+            try:
+                if self.kind == "intro":
+                    results, errors = self.handler(keys, [p for _, p in batch])
+                else:
+                    results, errors = self.handler(keys)
+            except Exception as e:
+                results, errors = {}, {key: str(e) for key in keys}
+                print(f"[{self.kind}] batch of {len(keys)} failed: {e}", file=sys.stderr)
+            self.queue.finish(self.kind, results, errors)
+
+
+# API
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    queue = None
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"]:
+            return self._send(200, {"ok": True})
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+            try:
+                if "wait" in params:
+                    job = self.queue.wait(int(parts[1]), float(params["wait"]))
+                else:
+                    job = self.queue.job(int(parts[1]))
+            except KeyError:
+                return self._send(404, {"error": "no such job"})
+            return self._send(200, job)
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            job = self.queue.submit(request["kind"], request["items"])
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, {"error": str(e)})
+        self._send(202, job)
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def serve(db: str = DEFAULT_DB, socket_path: str = DEFAULT_SOCKET, port: int = None, ttl=DEFAULT_TTL):
+    queue = JobQueue(db, ttl)
+    stop = threading.Event()
+    handlers = {
+        "stars": enrich_stars,
+        "quick_stats": enrich_quick_stats,
+        "intro": IntroEnricher(),
+    }
+    for kind, handler in handlers.items():
+        Worker(queue, kind, handler, stop).start()
+
+    handler = type("BoundHandler", (Handler,), {"queue": queue})
+    if port is not None:
+        server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        print(f"Enrichment daemon on http://127.0.0.1:{server.server_port} (queue {db})")
+    else:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        print(f"Enrichment daemon on {socket_path} (queue {db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+# Client
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = 60):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class EnrichClient:
+    """Submits jobs to a running daemon over one kept-alive connection."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, port: int = None, timeout: float = 600):
+        if port is not None:
+            self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+        else:
+            self.connection = _UnixConnection(socket_path, timeout)
+
+    def _request(self, method: str, path: str, payload=None) -> dict:
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        data = json.loads(response.read())
+        if response.status >= 400:
+            raise RuntimeError(data.get("error", response.reason))
+        return data
+
+    def submit(self, kind: str, items: list) -> dict:
+        return self._request("POST", "/jobs", {"kind": kind, "items": items})
+
+    def job(self, job_id: int, wait: float = None) -> dict:
+        suffix = f"?wait={wait}" if wait is not None else ""
+        return self._request("GET", f"/jobs/{job_id}{suffix}")
+
+    def enrich(self, kind: str, items: list, timeout: float = 600) -> dict:
+        """Submit and wait; returns item -> result (or error)."""
+        job = self.submit(kind, items)
+        rejected = {item: {"error": error} for item, error in job.get("rejected", {}).items()}
+        deadline = time.time() + timeout
+        while True:
+            state = self.job(job["id"], wait=min(30, max(deadline - time.time(), 0)))
+            if state["status"] == "done" or time.time() >= deadline:
+                return {**rejected, **state["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead enrichment daemon and client.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--port", type=int, help="Listen on / talk to 127.0.0.1:PORT instead")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("serve", help="Run the daemon")
+    run.add_argument("--db", default=DEFAULT_DB, help="SQLite queue")
+    run.add_argument("--ttl", type=float, default=DEFAULT_TTL / 3600, help="Result cache hours")
+
+    submit = sub.add_parser("submit", help="Submit a job")
+    submit.add_argument("kind", choices=KINDS)
+    submit.add_argument("items", nargs="*", help="Repos (stars) or logins (quick_stats)")
+    submit.add_argument("--csv", help="Leads CSV for intro jobs")
+    submit.add_argument("--wait", action="store_true", help="Wait and print the results")
+
+    status = sub.add_parser("status", help="Show a job")
+    status.add_argument("job", type=int)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.db, args.socket, args.port, args.ttl * 3600)
+        return
+
+    client = EnrichClient(args.socket, args.port)
+    if args.command == "status":
+        print(json.dumps(client.job(args.job), indent=2))
+        return
+
+    items = args.items
+    if args.csv:
+        import pandas as pd
+
+        leads = pd.read_csv(args.csv)
+        columns = [c for c in ["Login", "Name", "Company", "Location", "Bio", "repo"] if c in leads]
+        items = json.loads(leads[columns].to_json(orient="records"))
+    if args.wait:
+        print(json.dumps(client.enrich(args.kind, items), indent=2))
+    else:
+        print(json.dumps(client.submit(args.kind, items)))
+
+
+if __name__ == "__main__":
+    main()
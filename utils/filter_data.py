@@ -1,15 +1,14 @@
 import pandas as pd
 
+from email_normalize import dedupe_leads
+
 
 def clean_committers_data(input_file, output_file):
     # Read the CSV file
     df = pd.read_csv(input_file)
 
-    # Remove rows where Email is empty or null
-    df_clean = df.dropna(subset=["Email"])
-
-    # Remove rows where Email is an empty string
-    df_clean = df_clean[df_clean["Email"] != ""]
+    # Remove rows with missing, invalid or noreply emails and duplicate people
+    df_clean = dedupe_leads(df)
 
     # Keep only Login and Email columns
     df_clean = df_clean[["Login", "Email"]]
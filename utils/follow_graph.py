@@ -0,0 +1,313 @@
+# Influence ranking of stargazers from the follower graph.
+#
+# The Go fetcher stores every stargazer's follower_list in saved_state. Here
+# the lists of all scraped repos become one graph (an edge per follower ->
+# followed), held as edge arrays and cached in stargazer_cache/follow_graph.npz.
+# Only repos whose saved_state changed are parsed again: their old edges are
+# dropped and the new ones appended. PageRank (or eigenvector centrality) is a
+# power iteration of sparse matrix-vector products, so millions of edges take
+# seconds. influence is PageRank times the number of people, i.e. 1.0 is
+# average; people who are followed by other well-followed stargazers rank
+# high even with a modest follower count.
+#
+# Usage:
+#   python utils/follow_graph.py
+#   python utils/follow_graph.py --leads=emails/all_competitors_filtered.csv --output=emails/by_influence.csv
+#   python utils/follow_graph.py --method=eigenvector --stargazers-only --top=50
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import count, rows, stage
+from saved_state import list_cached_repos, load_state, state_path
+
+DEFAULT_GRAPH = "stargazer_cache/follow_graph.npz"
+DEFAULT_OUTPUT = "output/influence.csv"
+
+
+class FollowGraph:
+    """Follower -> followed edges of the stargazers of every cached repo."""
+
+    def __init__(self, logins=None, edges=None, stars=None, sources=None, matrix=None):
+        self.logins = list(logins or [])
+        self.login_ids = {login: i for i, login in enumerate(self.logins)}
+        # (follower, followed, repo) of each edge, and (stargazer, repo)
+        self.edges = edges if edges is not None else np.zeros((0, 3), dtype=np.int32)
+        self.stars = stars if stars is not None else np.zeros((0, 2), dtype=np.int32)
+        # repo -> [mtime, size] of the saved_state the edges came from
+        self.sources = dict(sources or {})
+        self.repos = list(self.sources)
+        self._matrix = matrix
+
+    def __len__(self):
+        return len(self.logins)
+
+    # Building
+
+    def update(self, cache_dir: str, repos=None) -> list:
+        """Reparse the repos whose saved_state changed; returns them."""
+        changed = []
+        for repo in repos or list_cached_repos(cache_dir):
+            stat = os.stat(state_path(cache_dir, repo))
+            if self.sources.get(repo) == [stat.st_mtime, stat.st_size]:
+                continue
+            stargazers, _ = load_state(cache_dir, repo)
+            self.replace_repo(repo, stargazers)
+            self.sources[repo] = [stat.st_mtime, stat.st_size]
+            changed.append(repo)
+        count("follow_graph_repos_parsed", len(changed))
+        return changed
+
+    def replace_repo(self, repo: str, stargazers: list):
+        """Replace the edges and stargazers that came from repo."""
+        if repo not in self.repos:
+            self.repos.append(repo)
+        repo_id = self.repos.index(repo)
+        followed, followers = [], []
+        for s in stargazers:
+            login = (s.get("user") or {}).get("login")
+            if not login:
+                continue
+            followed.append(login)
+            followers.append([f["login"] for f in s.get("follower_list") or [] if f.get("login")])
+        lengths = np.fromiter((len(f) for f in followers), np.int64, len(followers))
+        followed_ids = self._ids(followed)
+        follower_ids = self._ids([login for f in followers for login in f])
+
+        edges = np.column_stack(
+            [
+                follower_ids,
+                np.repeat(followed_ids, lengths),
+                np.full(len(follower_ids), repo_id),
+            ]
+        ).astype(np.int32)
+        stars = np.column_stack([followed_ids, np.full(len(followed_ids), repo_id)])
+        self.edges = np.vstack([self.edges[self.edges[:, 2] != repo_id], edges])
+        self.stars = np.vstack([self.stars[self.stars[:, 1] != repo_id], stars.astype(np.int32)])
+        self._matrix = None
+
+    def _ids(self, logins: list) -> np.ndarray:
+        """Node id of each login, adding the new ones."""
+        codes, uniques = pd.factorize(pd.Series(logins, dtype=object))
+        ids = np.empty(len(uniques), dtype=np.int64)
+        for i, login in enumerate(uniques):
+            node = self.login_ids.get(login)
+            if node is None:
+                node = self.login_ids[login] = len(self.logins)
+                self.logins.append(login)
+            ids[i] = node
+        return ids[codes]
+
+    # Ranking
+
+    def stargazer_mask(self) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.stars[:, 0]] = True
+        return mask
+
+    def matrix(self):
+        """CSR adjacency, A[i, j] = 1 if i follows j (duplicates merged)."""
+        from scipy import sparse
+
+        if self._matrix is None:
+            n = len(self)
+            matrix = sparse.csr_matrix(
+                (np.ones(len(self.edges), dtype=np.float64), (self.edges[:, 0], self.edges[:, 1])),
+                shape=(n, n),
+            )
+            matrix.sum_duplicates()
+            matrix.data[:] = 1
+            self._matrix = matrix
+        return self._matrix
+
+    def pagerank(
+        self, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 100, mask=None
+    ) -> np.ndarray:
+        """PageRank of every node (sums to 1; 0 outside mask).
+
+        Following someone passes a share of your rank to them. Rank of
+        people who follow nobody in the graph is spread evenly.
+        """
+        from scipy import sparse
+
+        matrix = self._restricted(mask)
+        n = matrix.shape[0]
+        if n == 0:
+            return np.zeros(0)
+        out_degree = np.asarray(matrix.sum(axis=1)).ravel()
+        dangling = out_degree == 0
+        inverse = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+        # transition[j, i] = 1 / out_degree[i] for an edge i -> j
+        transition = (sparse.diags(inverse) @ matrix).T.tocsr()
+        rank = np.full(n, 1.0 / n)
+        for iteration in range(1, max_iter + 1):
+            spread = (damping * rank[dangling].sum() + 1 - damping) / n
+            new = damping * (transition @ rank) + spread
+            error = np.abs(new - rank).sum()
+            rank = new
+            if error < n * tol:
+                break
+        count("pagerank_iterations", iteration)
+        return self._unrestricted(rank, mask)
+
+    def eigenvector(self, tol: float = 1e-10, max_iter: int = 200, mask=None) -> np.ndarray:
+        """Eigenvector centrality over incoming edges (sums to 1)."""
+        matrix = self._restricted(mask)
+        n = matrix.shape[0]
+        if n == 0:
+            return np.zeros(0)
+        incoming = matrix.T.tocsr()
+        x = np.full(n, 1.0 / n)
+        for iteration in range(1, max_iter + 1):
+            # A + I has the same eigenvectors and always converges
+            new = incoming @ x + x
+            new /= new.sum()
+            error = np.abs(new - x).sum()
+            x = new
+            if error < n * tol:
+                break
+        count("eigenvector_iterations", iteration)
+        return self._unrestricted(x, mask)
+
+    def _restricted(self, mask):
+        matrix = self.matrix()
+        if mask is None:
+            return matrix
+        return matrix[mask][:, mask]
+
+    def _unrestricted(self, values: np.ndarray, mask) -> np.ndarray:
+        if mask is None:
+            return values
+        full = np.zeros(len(self))
+        full[mask] = values
+        return full
+
+    def ranking(self, method: str = "pagerank", stargazers_only: bool = False, **kwargs):
+        """Stargazers with influence, followers in the graph and repos, best first."""
+        stargazers = self.stargazer_mask()
+        mask = stargazers if stargazers_only else None
+        if method == "pagerank":
+            scores = self.pagerank(mask=mask, **kwargs)
+        else:
+            scores = self.eigenvector(mask=mask, **kwargs)
+        n = int(stargazers.sum()) if stargazers_only else len(self)
+        followers = np.asarray(self._restricted(mask).sum(axis=0)).ravel()
+        followers = self._unrestricted(followers, mask)
+        # Repos of each stargazer: stars sorted by person and split per person
+        stars = self.stars[np.argsort(self.stars[:, 0], kind="stable")]
+        ids, starts = np.unique(stars[:, 0], return_index=True)
+        names = np.asarray(self.repos, dtype=object)[stars[:, 1]]
+        repos = [";".join(group) for group in np.split(names, starts[1:])] if len(ids) else []
+        frame = pd.DataFrame(
+            {
+                "Login": np.asarray(self.logins, dtype=object)[ids],
+                "influence": scores[ids] * n,
+                "followers_in_graph": followers[ids].astype(np.int64),
+                "repos": repos,
+            }
+        )
+        return frame.sort_values("influence", ascending=False, kind="stable", ignore_index=True)
+
+    # Persistence
+
+    def save(self, path: str = DEFAULT_GRAPH):
+        """Edges and the adjacency matrix, so a rerun needs neither rebuilt."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        matrix = self.matrix()
+        np.savez(
+            path,
+            logins=np.array(self.logins, dtype=str),
+            edges=self.edges,
+            stars=self.stars,
+            repos=np.array(self.repos, dtype=str),
+            sources=np.array([self.sources[repo] for repo in self.repos], dtype=np.float64),
+            indptr=matrix.indptr,
+            indices=matrix.indices,
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_GRAPH):
+        from scipy import sparse
+
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            sources = {
+                repo: [mtime, int(size)]
+                for repo, (mtime, size) in zip(data["repos"].tolist(), data["sources"].tolist())
+            }
+            n = len(data["logins"])
+            indices = data["indices"]
+            matrix = sparse.csr_matrix(
+                (np.ones(len(indices)), indices, data["indptr"]), shape=(n, n)
+            )
+            return cls(
+                logins=data["logins"].tolist(),
+                edges=data["edges"],
+                stars=data["stars"],
+                sources=sources,
+                matrix=matrix,
+            )
+
+
+def rank_leads(leads: pd.DataFrame, ranking: pd.DataFrame) -> pd.DataFrame:
+    """leads with an influence column, most influential first."""
+    influence = ranking.set_index(ranking["Login"].str.lower())["influence"]
+    keys = leads["Login"].astype(object).str.lower()
+    ranked = leads.assign(influence=keys.map(influence).fillna(0.0).to_numpy())
+    return ranked.sort_values("influence", ascending=False, kind="stable")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank stargazers by follower-graph influence.")
+    parser.add_argument("--cache-dir", default="stargazer_cache", help="Cache directory")
+    parser.add_argument("--graph", default=DEFAULT_GRAPH, help="Cached follower graph")
+    parser.add_argument("--rebuild", action="store_true", help="Parse every saved_state again")
+    parser.add_argument("--method", choices=["pagerank", "eigenvector"], default="pagerank")
+    parser.add_argument("--damping", type=float, default=0.85, help="PageRank damping")
+    parser.add_argument(
+        "--stargazers-only", action="store_true", help="Ignore followers who starred nothing"
+    )
+    parser.add_argument("--leads", help="Lead CSV to sort by influence (adds a column)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Ranked CSV")
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    args = parser.parse_args(argv)
+
+    graph = FollowGraph() if args.rebuild else FollowGraph.load(args.graph)
+    with stage("update"):
+        changed = graph.update(args.cache_dir)
+        rows(rows_out=len(graph.edges))
+    if changed:
+        graph.save(args.graph)
+    print(
+        f"{len(graph)} people, {len(graph.edges)} follow edges"
+        f" ({len(changed)} of {len(graph.repos)} repos reparsed)"
+    )
+    if not len(graph.edges):
+        sys.exit("No follower lists in the cached saved_state files")
+
+    start = time.perf_counter()
+    with stage("rank", rows_in=len(graph.edges)):
+        kwargs = {"damping": args.damping} if args.method == "pagerank" else {}
+        ranking = graph.ranking(args.method, args.stargazers_only, **kwargs)
+    print(f"{args.method} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if args.leads:
+        from lead_schema import read_leads
+
+        ranked = rank_leads(read_leads(args.leads), ranking)
+    else:
+        ranked = ranking
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    ranked.to_csv(args.output, index=False)
+    shown = [c for c in ["Login", "influence", "followers_in_graph", "Email", "repos"] if c in ranked]
+    print(ranked[shown].head(args.top).to_string(index=False))
+    print(f"Wrote {len(ranked)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,19 @@
-# %%
-# %% Imports and Setup
+# Current star counts of the repos our stargazers also starred, and a score:
+# the share (%) of each repo's stargazers that starred us too.
+#
+# Heavy libraries are imported where they are used, so fetching (e.g. from
+# `stargazers-py fetch-stars`) never loads matplotlib or seaborn.
+import argparse
 import os
 import time
 from pathlib import Path
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import requests
-import seaborn as sns
-from dotenv import load_dotenv
+from github_client import API_URL, github_get
+from metrics import count, stage
 
-# %%
-# Either set this in your environment or replace with your token
-# load from .env file
-load_dotenv()
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+DEFAULT_REPO = "gregpr07/browser-use"
+# Star counts older than this are fetched again
+MAX_AGE_HOURS = 24 * 7
 
 
 def get_github_stars(repo):
@@ -23,14 +21,10 @@ def get_github_stars(repo):
         "Accept": "application/vnd.github.v3+json",
     }
 
-    # Only add token if it exists
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-
-    url = f"https://api.github.com/repos/{repo}"
+    url = f"{API_URL}/repos/{repo}"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = github_get(url, headers=headers)
 
         if response.status_code == 200:
             return response.json()["stargazers_count"]
@@ -57,146 +51,203 @@ def get_github_stars(repo):
     time.sleep(2)  # 2 second delay between requests
 
 
-# %%
-df = pd.read_csv("stargazer_cache/gregpr07/browser-use/correlated_starred_repos.csv")
-# exlude browser-use
-df = df[df["Repository"] != "gregpr07/browser-use"]
-print(f"Analyzing {len(df)} repos")
-# Get current stars for each repo
-# %%
-stars_list = []
-for repo in df["Repository"]:
-    stars = get_github_stars(repo)
-
-    print(repo, stars)
-    stars_list.append(stars if stars else 0)
-    time.sleep(1)  # Respect GitHub API rate limits
-
-
-# %%
-# Add stars and calculate score
-df["Current_Stars"] = stars_list
-df["Score"] = (df["Count"] / df["Current_Stars"] * 100).round(2)
-
-# Sort by score
-df_sorted = df.sort_values("Score", ascending=False)
-
-# Save to CSV
-
-output_folder = "output"
-Path(output_folder).mkdir(exist_ok=True)
-output_file = f"{output_folder}/repo_analysis.csv"
-df_sorted.to_csv(output_file, index=False)
-
-
-# %% Visualization
-# Set the style
-plt.style.use("seaborn-v0_8-darkgrid")
-
-sns.set_palette("husl")
-
-# Create figure with higher DPI and better size ratio
-fig = plt.figure(figsize=(20, 16), dpi=300)
-
-# Scatter plot with enhanced styling
-ax1 = plt.subplot(2, 1, 1)
-scatter = plt.scatter(
-    df_sorted["Current_Stars"],
-    df_sorted["Count"],
-    c=df_sorted["Score"],
-    cmap="viridis",
-    alpha=0.7,
-    s=100,
-    edgecolor="white",
-    linewidth=0.5,
-)
-
-# Add colorbar with better formatting
-cbar = plt.colorbar(scatter)
-cbar.set_label(
-    "Score how much (%) of their users starred us", fontsize=18, fontweight="bold"
-)
-
-# Enhance axes and title
-plt.xlabel("Repository Stars", fontsize=18, fontweight="bold")
-plt.ylabel("Users who starred both", fontsize=18, fontweight="bold")
-plt.title(
-    "Repository Analysis: Stars vs Related Count",
-    fontsize=18,
-    fontweight="bold",
-    pad=20,
-)
-
-# Set scales and grid
-plt.xscale("log")
-plt.xticks([3e3, 5e3, 1e4, 25e3, 50e3, 1e5], ["3k", "5k", "10k", "25k", "50k", "100k"])
-plt.grid(True, alpha=0.3)
-
-# Add annotations for top 5 repositories
-top_5 = df_sorted.head(10)
-for _, repo in top_5.iterrows():
-    plt.annotate(
-        repo["Repository"].split("/")[-1],
-        (repo["Current_Stars"], repo["Count"]),
-        xytext=(5, 5),
-        textcoords="offset points",
-        fontsize=14,
-        bbox=dict(facecolor="white", edgecolor="none", alpha=0.7),
+def fetch_star_counts(
+    repo: str = DEFAULT_REPO,
+    cache_dir: str = "stargazer_cache",
+    output_folder: str = "output",
+    max_age: float = MAX_AGE_HOURS * 3600,
+):
+    """Score the correlated repos of repo and write output/repo_analysis.csv.
+
+    Star counts from the previous output are reused when they were fetched
+    less than max_age seconds ago (None: always reused, 0: all fetched again).
+    """
+    import pandas as pd
+
+    df = pd.read_csv(f"{cache_dir}/{repo}/correlated_starred_repos.csv")
+    # exclude the repo itself
+    df = df[df["Repository"] != repo]
+    print(f"Analyzing {len(df)} repos")
+
+    output_file = f"{output_folder}/repo_analysis.csv"
+    known_stars, fetched = {}, {}
+    now = time.time()
+    if os.path.exists(output_file):
+        previous = pd.read_csv(output_file)
+        previous = previous[previous["Current_Stars"] > 0]
+        # Outputs written before Stars_Fetched existed count as stale
+        if "Stars_Fetched" not in previous.columns:
+            previous = previous.assign(Stars_Fetched=0.0)
+        if max_age is not None:
+            previous = previous[now - previous["Stars_Fetched"] < max_age]
+        known_stars = dict(zip(previous["Repository"], previous["Current_Stars"]))
+        fetched = dict(zip(previous["Repository"], previous["Stars_Fetched"]))
+    new_repos = [r for r in df["Repository"] if r not in known_stars]
+    print(f"Fetching stars for {len(new_repos)} new or stale repos")
+    count("star_cache_hits", len(df) - len(new_repos))
+
+    with stage("fetch_stars", rows_in=len(new_repos)):
+        for other in new_repos:
+            stars = get_github_stars(other)
+
+            print(other, stars)
+            known_stars[other] = stars if stars else 0
+            fetched[other] = time.time()
+            time.sleep(1)  # Respect GitHub API rate limits
+
+    # Add stars and calculate score
+    df["Current_Stars"] = df["Repository"].map(known_stars)
+    df["Stars_Fetched"] = df["Repository"].map(fetched)
+    df["Score"] = (df["Count"] / df["Current_Stars"] * 100).round(2)
+    df_sorted = df.sort_values("Score", ascending=False)
+
+    Path(output_folder).mkdir(exist_ok=True)
+    df_sorted.to_csv(output_file, index=False)
+    return df_sorted
+
+
+def plot_repo_analysis(df_sorted, output_folder: str = "output"):
+    """Scatter of stars vs shared stargazers and the top 20 repos by score."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Set the style
+    plt.style.use("seaborn-v0_8-darkgrid")
+
+    sns.set_palette("husl")
+
+    # Create figure with higher DPI and better size ratio
+    fig = plt.figure(figsize=(20, 16), dpi=300)
+
+    # Scatter plot with enhanced styling
+    ax1 = plt.subplot(2, 1, 1)
+    scatter = plt.scatter(
+        df_sorted["Current_Stars"],
+        df_sorted["Count"],
+        c=df_sorted["Score"],
+        cmap="viridis",
+        alpha=0.7,
+        s=100,
+        edgecolor="white",
+        linewidth=0.5,
     )
 
-# %% Bar Plot
+    # Add colorbar with better formatting
+    cbar = plt.colorbar(scatter)
+    cbar.set_label(
+        "Score how much (%) of their users starred us", fontsize=18, fontweight="bold"
+    )
 
-# Increase the figure size for better readability
-fig, ax2 = plt.subplots(figsize=(24, 18))
-top_20 = df_sorted.head(20)
+    # Enhance axes and title
+    plt.xlabel("Repository Stars", fontsize=18, fontweight="bold")
+    plt.ylabel("Users who starred both", fontsize=18, fontweight="bold")
+    plt.title(
+        "Repository Analysis: Stars vs Related Count",
+        fontsize=18,
+        fontweight="bold",
+        pad=20,
+    )
 
-# Create barplot with custom colors
-bars = sns.barplot(
-    data=top_20, x="Score", y="Repository", palette="viridis", alpha=0.8, ax=ax2
-)
+    # Set scales and grid
+    plt.xscale("log")
+    plt.xticks([3e3, 5e3, 1e4, 25e3, 50e3, 1e5], ["3k", "5k", "10k", "25k", "50k", "100k"])
+    plt.grid(True, alpha=0.3)
+
+    # Add annotations for top 5 repositories
+    top_5 = df_sorted.head(10)
+    for _, repo in top_5.iterrows():
+        plt.annotate(
+            repo["Repository"].split("/")[-1],
+            (repo["Current_Stars"], repo["Count"]),
+            xytext=(5, 5),
+            textcoords="offset points",
+            fontsize=14,
+            bbox=dict(facecolor="white", edgecolor="none", alpha=0.7),
+        )
+
+    # Bar plot
+
+    # Increase the figure size for better readability
+    fig, ax2 = plt.subplots(figsize=(24, 18))
+    top_20 = df_sorted.head(20)
+
+    # Create barplot with custom colors
+    bars = sns.barplot(
+        data=top_20, x="Score", y="Repository", palette="viridis", alpha=0.8, ax=ax2
+    )
 
-# Enhance bar plot
-plt.title("Top 20 Repositories by Score", fontsize=18, fontweight="bold", pad=20)
-plt.xlabel(
-    "Score how much (%) of their users starred us", fontsize=16, fontweight="bold"
-)
-plt.ylabel("Repository", fontsize=16, fontweight="bold")
+    # Enhance bar plot
+    plt.title("Top 20 Repositories by Score", fontsize=18, fontweight="bold", pad=20)
+    plt.xlabel(
+        "Score how much (%) of their users starred us", fontsize=16, fontweight="bold"
+    )
+    plt.ylabel("Repository", fontsize=16, fontweight="bold")
+
+    # Add value labels on bars with number of correlated users and total stars
+    for i, (v, count, stars) in enumerate(
+        zip(top_20["Score"], top_20["Count"], top_20["Current_Stars"])
+    ):
+        ax2.text(
+            v + 0.1,
+            i,
+            f"{v:.1f}% ({count} / {stars})",
+            va="center",
+            fontsize=20,
+            fontweight="bold",
+        )
+
+    # Clean up repository names
+    ax2.set_yticklabels([repo.split("/")[-1] for repo in top_20["Repository"]], fontsize=20)
+
+    # Adjust layout and save
+    plt.tight_layout(pad=3.0)
+    plt.savefig(
+        f"{output_folder}/repo_analysis.png",
+        bbox_inches="tight",
+        facecolor="white",
+        edgecolor="none",
+    )
 
-# Add value labels on bars with number of correlated users and total stars
-for i, (v, count, stars) in enumerate(
-    zip(top_20["Score"], top_20["Count"], top_20["Current_Stars"])
-):
-    ax2.text(
-        v + 0.1,
-        i,
-        f"{v:.1f}% ({count} / {stars})",
-        va="center",
-        fontsize=20,
-        fontweight="bold",
+
+def print_summary(df):
+    print("\n" + "=" * 50)
+    print("Summary Statistics".center(50))
+    print("=" * 50 + "\n")
+
+    print(f"Total repositories analyzed: {len(df):,}")
+    print(f"Average correlation score: {df['Score'].mean():.2f}%")
+    print(f"Median correlation score: {df['Score'].median():.2f}%")
+    print(f"Standard deviation: {df['Score'].std():.2f}%")
+
+    print("\n" + "=" * 50)
+    print("Top 10 Repositories".center(50))
+    print("=" * 50)
+    print(df.head(10)[["Repository", "Count", "Current_Stars", "Score"]].to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Star counts and scores of correlated repos.")
+    parser.add_argument("--repo", default=DEFAULT_REPO, help="owner/repo that was analyzed")
+    parser.add_argument("--cache", default="stargazer_cache", help="Cache directory")
+    parser.add_argument("--output", default="output", help="Output folder")
+    parser.add_argument("--no-plot", action="store_true", help="Only fetch and score")
+    parser.add_argument(
+        "--max-age", type=float, default=MAX_AGE_HOURS, help="Refetch stars after this many hours"
     )
+    args = parser.parse_args(argv)
+
+    # Either set GITHUB_TOKEN (or a comma separated GITHUB_TOKENS pool) in your
+    # environment or load it from .env file
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    df_sorted = fetch_star_counts(args.repo, args.cache, args.output, args.max_age * 3600)
+    if not args.no_plot:
+        with stage("plot"):
+            plot_repo_analysis(df_sorted, args.output)
+    print_summary(df_sorted)
+
 
-# Clean up repository names
-ax2.set_yticklabels([repo.split("/")[-1] for repo in top_20["Repository"]], fontsize=20)
-
-# Adjust layout and save
-plt.tight_layout(pad=3.0)
-plt.savefig(
-    f"{output_folder}/repo_analysis.png",
-    bbox_inches="tight",
-    facecolor="white",
-    edgecolor="none",
-)
-
-# %% Summary Statistics
-print("\n" + "=" * 50)
-print("Summary Statistics".center(50))
-print("=" * 50 + "\n")
-
-print(f"Total repositories analyzed: {len(df):,}")
-print(f"Average correlation score: {df['Score'].mean():.2f}%")
-print(f"Median correlation score: {df['Score'].median():.2f}%")
-print(f"Standard deviation: {df['Score'].std():.2f}%")
-
-print("\n" + "=" * 50)
-print("Top 10 Repositories".center(50))
-# %%
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+# Shared GitHub client with a host-wide token pool.
+#
+# Tokens come from GITHUB_TOKENS (comma separated) and GITHUB_TOKEN. Every
+# process on the host shares one JSON state file, guarded by a file lock,
+# that tracks the REST ("core") and GraphQL quota of each token. Before a
+# request a process takes one unit of quota from the token with the most
+# left; after the request the GitHub rate-limit headers are written back.
+# Long-running consumers such as the Go fetcher lease a whole token so the
+# Python clients steer around it.
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util import Retry, make_headers
+
+from metrics import count
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+DEFAULT_STATE_FILE = os.path.join(tempfile.gettempdir(), "stargazers_token_pool.json")
+
+# Point at a mock server for offline runs (see benchmarks/mock_servers.py)
+API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# Record every response into, or replay every response from, a directory
+RECORD_DIR = os.getenv("STARGAZERS_RECORD_DIR")
+REPLAY_DIR = os.getenv("STARGAZERS_REPLAY_DIR")
+
+# Hourly quota of an authenticated token and of anonymous access
+TOKEN_LIMIT = 5000
+ANONYMOUS_LIMIT = 60
+
+# Keep a few requests per token for interactive use
+RESERVE = 10
+
+# GitHub's rate-limit window; assumed when no X-RateLimit-Reset was seen
+RATE_WINDOW = 3600
+
+BUCKETS = ("core", "graphql")
+
+# Connection pool size; match it to the number of concurrent requests
+POOL_SIZE = int(os.getenv("STARGAZERS_HTTP_POOL", "16"))
+TIMEOUT = (5, 30)  # connect, read seconds
+RETRIES = 3
+USER_AGENT = "Stargazers Python Client"
+
+
+def tokens_from_env() -> list:
+    tokens = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",")]
+    tokens.append(os.getenv("GITHUB_TOKEN", ""))
+    return list(dict.fromkeys(t for t in tokens if t))
+
+
+class _Session(requests.Session):
+    """requests.Session with a default timeout."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Records responses to, or replays them from, one JSON file per request.
+
+    The file name is a hash of method, URL and body, so the Authorization
+    header (and which pooled token was used) does not matter on replay.
+    """
+
+    def __init__(self, directory: str, replay: bool, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.replay = replay
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, request) -> str:
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode()
+        key = hashlib.sha1(f"{request.method} {request.url} ".encode() + body)
+        return os.path.join(self.directory, key.hexdigest() + ".json")
+
+    def send(self, request, **kwargs):
+        path = self._path(request)
+        if self.replay:
+            if not os.path.exists(path):
+                raise requests.ConnectionError(f"no recorded response for {request.url}")
+            with open(path, "r") as f:
+                recorded = json.load(f)
+            response = requests.Response()
+            response.status_code = recorded["status"]
+            response.headers = CaseInsensitiveDict(recorded["headers"])
+            response._content = base64.b64decode(recorded["body"])
+            response.url = request.url
+            response.request = request
+            count("github_replayed")
+            return response
+
+        response = super().send(request, **kwargs)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "method": request.method,
+                    "url": request.url,
+                    "status": response.status_code,
+                    # The body is stored decoded, so drop the encoding header
+                    "headers": {
+                        k: v
+                        for k, v in response.headers.items()
+                        if k.lower() not in ("content-encoding", "transfer-encoding")
+                    },
+                    "body": base64.b64encode(response.content).decode(),
+                },
+                f,
+            )
+        return response
+
+
+def make_session(pool_size: int = POOL_SIZE, retries: int = RETRIES, timeout=TIMEOUT, http2=None):
+    """Keep-alive session with compression, timeouts and retries.
+
+    With http2 (or STARGAZERS_HTTP2=1) and httpx[http2] installed an
+    httpx.Client speaking HTTP/2 is returned instead; it multiplexes all
+    requests over one connection per host.
+    """
+    # make_headers advertises br (and zstd) when the decoders are installed
+    headers = make_headers(accept_encoding=True, user_agent=USER_AGENT)
+
+    if http2 is None:
+        http2 = os.getenv("STARGAZERS_HTTP2") == "1"
+    if http2 and not (REPLAY_DIR or RECORD_DIR):
+        try:
+            import h2  # noqa: F401
+            import httpx
+        except ImportError:
+            pass
+        else:
+            # The client ignores its own limits when given a transport
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            return httpx.Client(
+                http2=True,
+                headers=headers,
+                timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+                transport=httpx.HTTPTransport(http2=True, retries=retries, limits=limits),
+            )
+
+    session = _Session(timeout)
+    session.headers.update(headers)
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        # GraphQL queries are read-only, so POST is safe to retry too
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter_args = dict(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    if REPLAY_DIR or RECORD_DIR:
+        adapter = ReplayAdapter(REPLAY_DIR or RECORD_DIR, bool(REPLAY_DIR), **adapter_args)
+    else:
+        adapter = HTTPAdapter(**adapter_args)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+
+
+def get_session():
+    """Process-wide session shared by every GitHub call."""
+    global _session
+    if _session is None:
+        _session = make_session()
+    return _session
+
+
+def _token_id(token: str) -> str:
+    # Only a fingerprint of the token ends up in the shared state file
+    if not token:
+        return "anonymous"
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TokenPool:
+    """Hands out GitHub tokens so concurrent jobs share quota fairly."""
+
+    def __init__(self, tokens=None, state_file: str = DEFAULT_STATE_FILE, session=None):
+        tokens = tokens_from_env() if tokens is None else list(tokens)
+        self.session = session or get_session()
+        # No token at all still works, at the anonymous rate limit
+        self.tokens = {_token_id(t): t for t in (tokens or [""])}
+        self.state_file = state_file
+        self.lock_file = state_file + ".lock"
+
+    # State handling
+
+    @contextmanager
+    def _state(self):
+        """Locked read-modify-write of the shared state."""
+        with open(self.lock_file, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = {}
+                if os.path.exists(self.state_file):
+                    with open(self.state_file, "r") as f:
+                        try:
+                            state = json.load(f)
+                        except ValueError:
+                            state = {}
+                yield state
+                tmp = self.state_file + f".{os.getpid()}"
+                with open(tmp, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp, self.state_file)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _bucket(self, state: dict, token_id: str, bucket: str) -> dict:
+        entry = state.setdefault(token_id, {})
+        limit = TOKEN_LIMIT if token_id != "anonymous" else ANONYMOUS_LIMIT
+        quota = entry.setdefault(bucket, {"limit": limit, "remaining": limit, "reset": 0})
+        now = time.time()
+        # A new rate-limit window has started
+        if quota["reset"] and quota["reset"] <= now:
+            quota.update(remaining=quota["limit"], reset=0)
+        # Quota spent without rate-limit headers (GHE with limits off, proxies,
+        # failed requests) comes back after a window, so acquire never waits
+        # on an unknown reset
+        if not quota["reset"] and quota["remaining"] < quota["limit"]:
+            quota["reset"] = now + RATE_WINDOW
+        return quota
+
+    def _leased(self, state: dict, token_id: str) -> bool:
+        lease = state.get(token_id, {}).get("lease")
+        if not lease:
+            return False
+        if lease["until"] < time.time() or not _pid_alive(lease["pid"]):
+            state[token_id].pop("lease", None)
+            return False
+        return lease["pid"] != os.getpid()
+
+    # Public API
+
+    def acquire(self, bucket: str = "core", cost: int = 1) -> str:
+        """Take quota from the token with the most left, waiting if all are spent."""
+        while True:
+            with self._state() as state:
+                candidates = []
+                for token_id in self.tokens:
+                    quota = self._bucket(state, token_id, bucket)
+                    leased = self._leased(state, token_id)
+                    candidates.append((leased, -quota["remaining"], token_id, quota))
+                candidates.sort(key=lambda c: c[:3])
+                for _, _, token_id, quota in candidates:
+                    if quota["remaining"] - cost >= RESERVE:
+                        quota["remaining"] -= cost
+                        quota["reset"] = quota["reset"] or time.time() + RATE_WINDOW
+                        return self.tokens[token_id]
+                wait = min(q["reset"] for *_, q in candidates) - time.time()
+            wait = max(wait, 1.0)
+            print(f"All tokens exhausted for {bucket}; waiting {wait:.0f} seconds")
+            count("rate_limit_waits")
+            count("rate_limit_wait_seconds", round(wait + 1, 1))
+            time.sleep(wait + 1)
+
+    def record(self, token: str, response: requests.Response, bucket: str = "core"):
+        """Store the authoritative quota from GitHub's rate-limit headers."""
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        bucket = headers.get("X-RateLimit-Resource", bucket)
+        with self._state() as state:
+            quota = self._bucket(state, _token_id(token), bucket)
+            quota["limit"] = int(headers.get("X-RateLimit-Limit", quota["limit"]))
+            quota["remaining"] = int(headers["X-RateLimit-Remaining"])
+            quota["reset"] = int(headers.get("X-RateLimit-Reset", 0))
+
+    @contextmanager
+    def lease(self, bucket: str = "core", seconds: int = 24 * 3600):
+        """Reserve the best token for a long job (e.g. the Go fetcher)."""
+        token = self.acquire(bucket)
+        token_id = _token_id(token)
+        with self._state() as state:
+            state.setdefault(token_id, {})["lease"] = {
+                "pid": os.getpid(),
+                "until": time.time() + seconds,
+            }
+        try:
+            yield token
+        finally:
+            with self._state() as state:
+                state.get(token_id, {}).pop("lease", None)
+            # The leaseholder spent quota we did not see
+            self.refresh(token)
+
+    def refresh(self, token: str):
+        """Re-read the quota of a token from /rate_limit (which is free)."""
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        try:
+            response = self.session.get(
+                f"{API_URL}/rate_limit", headers=headers
+            )
+            resources = response.json()["resources"]
+        except Exception:
+            return
+        with self._state() as state:
+            for bucket in BUCKETS:
+                if bucket in resources:
+                    quota = self._bucket(state, _token_id(token), bucket)
+                    quota.update(
+                        {k: int(resources[bucket][k]) for k in ("limit", "remaining", "reset")}
+                    )
+
+    def status(self) -> dict:
+        """Remaining quota per token fingerprint and bucket."""
+        with self._state() as state:
+            return {
+                token_id: {b: dict(self._bucket(state, token_id, b)) for b in BUCKETS}
+                for token_id in self.tokens
+            }
+
+    def request(self, method: str, url: str, bucket: str = "core", cost: int = 1, **kwargs):
+        """Request with a pooled token; retries once per token on 403/429."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        response = None
+        for _ in range(len(self.tokens) + 1):
+            token = self.acquire(bucket, cost)
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            self.record(token, response, bucket)
+            count(f"github_{bucket}_requests")
+            # urllib3 keeps the retries it made for this response
+            retries = getattr(getattr(response, "raw", None), "retries", None)
+            if retries is not None and retries.history:
+                count("github_retries", len(retries.history))
+            exhausted = response.headers.get("X-RateLimit-Remaining") == "0"
+            if response.status_code not in (403, 429) or not exhausted:
+                return response
+            count("github_rate_limited")
+        return response
+
+
+_pool = None
+
+
+def get_pool() -> TokenPool:
+    """Process-wide pool built from the environment."""
+    global _pool
+    if _pool is None:
+        _pool = TokenPool()
+    return _pool
+
+
+def github_get(url: str, pool: TokenPool = None, **kwargs) -> requests.Response:
+    return (pool or get_pool()).request("GET", url, bucket="core", **kwargs)
+
+
+def github_graphql(
+    query: str, variables: dict = None, pool: TokenPool = None, **kwargs
+) -> requests.Response:
+    return (pool or get_pool()).request(
+        "POST",
+        f"{API_URL}/graphql",
+        bucket="graphql",
+        json={"query": query, "variables": variables or {}},
+        **kwargs,
+    )
+
+
+class GraphQLError(RuntimeError):
+    """A GraphQL query GitHub did not answer (only partly or not at all)."""
+
+
+def github_graphql_batch(template: str, items: list, **kwargs) -> list:
+    """Run template once per item as aliased fields of one GraphQL query.
+
+    template is a field with an {alias} placeholder and a $variable per key
+    of the items, e.g. "{alias}: repository(owner: ${owner}, name: ${name})
+    {{ stargazerCount }}" (literal braces doubled). The values are sent as
+    String! variables, never spliced into the query. Returns the data per
+    item, None where GitHub reported the item NOT_FOUND (deleted or renamed
+    repos, unknown users). Any other error (rate limits, timeouts, query
+    complexity) raises GraphQLError, so callers never mistake it for a
+    missing item.
+    """
+    if not items:
+        return []
+    fields, declarations, variables = [], [], {}
+    for i, item in enumerate(items):
+        names = {key: f"{key}{i}" for key in item}
+        fields.append(template.format(alias=f"a{i}", **names))
+        declarations.extend(f"${name}: String!" for name in names.values())
+        variables.update({names[key]: value for key, value in item.items()})
+    query = f"query({', '.join(declarations)}) {{\n" + "\n".join(fields) + "\n}"
+    response = github_graphql(query, variables, **kwargs)
+    response.raise_for_status()
+    reply = response.json()
+    data = reply.get("data")
+    missing = set()
+    for error in reply.get("errors") or []:
+        path = error.get("path") or []
+        if data is None or not path or error.get("type") != "NOT_FOUND":
+            raise GraphQLError(error.get("message") or json.dumps(error))
+        missing.add(path[0])
+    if data is None:
+        raise GraphQLError("GraphQL reply without data")
+    results = [data.get(f"a{i}") for i in range(len(items))]
+    unexplained = sum(r is None and f"a{i}" not in missing for i, r in enumerate(results))
+    if unexplained:
+        raise GraphQLError(f"no data and no error for {unexplained} of {len(items)} items")
+    return results
+
+
+def main():
+    """Print the remaining quota per token."""
+    for token_id, buckets in get_pool().status().items():
+        line = ", ".join(
+            f"{b}: {q['remaining']}/{q['limit']}" for b, q in buckets.items()
+        )
+        print(f"{token_id}: {line}")
+
+
+if __name__ == "__main__":
+    main()
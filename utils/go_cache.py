@@ -0,0 +1,80 @@
+# Read and write entries of the Go fetcher's response cache.
+#
+# putCache in fetch/cache.go dumps each http.Response (status line, headers,
+# body) into stargazer_cache/<owner>/<repo>/<sanitized URL>. These helpers use
+# the same layout so Python tools can read, generate and repack the cache.
+import os
+import re
+
+_SEPARATORS = re.compile(r"[ &_=+:]")
+_ILLEGAL = re.compile(r"[^A-Za-z0-9.-]")
+_DASHES = re.compile(r"-+")
+
+
+def base_name(url: str) -> str:
+    """Port of sanitize.BaseName used by cacheEntryFilename.
+
+    Joining characters become "-", everything but ASCII letters, digits, "-"
+    and "." is dropped (so "/" and "?" vanish) and runs of "-" collapse.
+    """
+    name = _SEPARATORS.sub("-", url.strip(" "))
+    name = _ILLEGAL.sub("", name)
+    return _DASHES.sub("-", name)
+
+
+def cache_entry_name(url: str, token: str = "") -> str:
+    """File name of a URL's cache entry, with any access token stripped."""
+    return base_name(url.replace(f"access_token={token}", "", 1))
+
+
+def cache_entry_path(cache_dir: str, repo: str, url: str, token: str = "") -> str:
+    return os.path.join(cache_dir, repo, cache_entry_name(url, token))
+
+
+def encode_response(status: int, headers: dict, body: bytes, reason: str = "OK") -> bytes:
+    """Serialize a response the way Go's http.Response.Write does."""
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    headers = {k: v for k, v in headers.items() if k.lower() != "transfer-encoding"}
+    headers["Content-Length"] = str(len(body))
+    lines.extend(f"{k}: {v}" for k, v in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def decode_response(raw: bytes):
+    """Parse a cached response into (status, headers, body)."""
+    head, _, rest = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip()] = value.strip()
+    if headers.get("Transfer-Encoding", "").lower() == "chunked":
+        body = _dechunk(rest)
+    else:
+        length = headers.get("Content-Length")
+        body = rest[: int(length)] if length is not None else rest
+    return status, headers, body
+
+
+def _dechunk(data: bytes) -> bytes:
+    body, pos = [], 0
+    while True:
+        end = data.index(b"\r\n", pos)
+        size = int(data[pos:end].split(b";", 1)[0], 16)
+        if size == 0:
+            return b"".join(body)
+        start = end + 2
+        body.append(data[start : start + size])
+        pos = start + size + 2
+
+
+def write_entry(path: str, status: int, headers: dict, body: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(encode_response(status, headers, body))
+
+
+def read_entry(path: str):
+    with open(path, "rb") as f:
+        return decode_response(f.read())
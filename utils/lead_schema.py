@@ -0,0 +1,156 @@
+# Compact dtypes for the lead tables (scraped *_emails.csv, all.csv and the
+# filtered/scored leads).
+#
+# Left to itself read_csv gives every profile column object dtype and turns
+# Followers/Following into float64 as soon as one value is missing. Here the
+# repeated strings (repo, owner, Company, Location, EmailType, ...) become
+# categoricals, counts become nullable integers and the free text becomes
+# Arrow-backed strings when pyarrow is installed. Categorical columns also
+# make groupby/dedupe cheaper, and text cleaning only has to touch each
+# distinct value once. Without pyarrow the free text keeps the dtype read_csv
+# gives it; pandas' Python-backed "string" dtype is no smaller than object.
+#
+# Usage:
+#   python utils/lead_schema.py emails/all.csv
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    STRING = "string[pyarrow]"
+except ImportError:
+    STRING = None
+
+TEXT_COLUMNS = ["Login", "Email", "EmailKey", "Name", "Bio", "personalized_intro", "repos"]
+CATEGORY_COLUMNS = ["repo", "owner", "Company", "Location", "EmailType", "EmailDomain"]
+COUNT_COLUMNS = {"Followers": "Int32", "Following": "Int32"}
+FLOAT_COLUMNS = {"personalized_intro_score": "float32"}
+
+
+def read_dtypes(columns=None) -> dict:
+    """dtype= for read_csv.
+
+    Frames of separately read files with different categories concatenate
+    to object columns, so run compact() again after pd.concat.
+    """
+    dtypes = {c: STRING for c in TEXT_COLUMNS if STRING}
+    dtypes.update({c: "category" for c in CATEGORY_COLUMNS})
+    dtypes.update(COUNT_COLUMNS)
+    dtypes.update(FLOAT_COLUMNS)
+    if columns is not None:
+        dtypes = {c: t for c, t in dtypes.items() if c in columns}
+    return dtypes
+
+
+def read_leads(path: str, **kwargs) -> pd.DataFrame:
+    """read_csv with the compact lead schema."""
+    header = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, dtype=read_dtypes(header), **kwargs)
+    return compact(df)
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """df with the lead schema applied to the columns it has."""
+    dtypes = {}
+    for column in df.columns:
+        if column in CATEGORY_COLUMNS:
+            dtypes[column] = "category"
+        elif column in TEXT_COLUMNS and STRING:
+            dtypes[column] = STRING
+        elif column in COUNT_COLUMNS:
+            # Counts read as float64 (NaN) or strings: to numbers first
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                df = df.assign(**{column: pd.to_numeric(df[column], errors="coerce")})
+            dtypes[column] = COUNT_COLUMNS[column]
+        elif column in FLOAT_COLUMNS:
+            dtypes[column] = FLOAT_COLUMNS[column]
+    return df.astype(dtypes)
+
+
+def clean_column(values: pd.Series, pattern: str = r"\s+", repl: str = " ") -> pd.Series:
+    """Collapse whitespace runs and strip a text column.
+
+    Categoricals are cleaned once per category; other columns are returned
+    unchanged.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if not pd.api.types.is_string_dtype(categories.dtype):
+            return values
+        cleaned = categories.str.replace(pattern, repl, regex=True).str.strip()
+        if cleaned.duplicated().any():  # two categories became one
+            cleaned = values.astype(object).str.replace(pattern, repl, regex=True).str.strip()
+            return cleaned.astype("category")
+        return values.cat.rename_categories(cleaned)
+    if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+        try:
+            cleaned = values.str.replace(pattern, repl, regex=True).str.strip()
+        except AttributeError:  # no strings at all
+            return values
+        # Non-str values of mixed object columns come back as NaN
+        return cleaned.where(cleaned.notna(), values)
+    return values
+
+
+def memory_report(df: pd.DataFrame, baseline: pd.DataFrame = None) -> pd.DataFrame:
+    """Deep memory per column in MB (and the baseline's, with the ratio)."""
+    report = pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str),
+            "MB": df.memory_usage(deep=True, index=False) / 2**20,
+        }
+    )
+    if baseline is not None:
+        report.insert(0, "baseline dtype", baseline.dtypes.astype(str).reindex(report.index))
+        baseline_mb = baseline.memory_usage(deep=True, index=False) / 2**20
+        report.insert(1, "baseline MB", baseline_mb.reindex(report.index))
+        report["ratio"] = report["baseline MB"] / report["MB"]
+    total = report.select_dtypes("number").sum()
+    if baseline is not None:
+        total["ratio"] = total["baseline MB"] / total["MB"]
+    report.loc["total"] = total
+    return report.round(2)
+
+
+def _timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory of a lead CSV with and without the schema."
+    )
+    parser.add_argument("path", help="Lead CSV, e.g. emails/all.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    baseline = pd.read_csv(args.path)
+    baseline_read = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    df = read_leads(args.path)
+    compact_read = (time.perf_counter() - start) * 1000
+
+    print(memory_report(df, baseline).to_string(na_rep=""))
+    print(f"\n{'operation':<24}{'object ms':>12}{'schema ms':>12}")
+    print(f"{'read_csv':<24}{baseline_read:>12.0f}{compact_read:>12.0f}")
+    key = [c for c in ["Login", "repo"] if c in df.columns]
+    group = [c for c in ["repo", "Company", "Location"] if c in df.columns]
+    operations = {
+        "drop_duplicates": lambda d: d.drop_duplicates(subset=key or None),
+        "groupby count": lambda d: d.groupby(group, observed=True).size() if group else None,
+    }
+    for name, operation in operations.items():
+        times = [
+            np.median([_timed(lambda: operation(d)) for _ in range(3)]) for d in (baseline, df)
+        ]
+        print(f"{name:<24}{times[0]:>12.0f}{times[1]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
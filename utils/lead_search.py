@@ -0,0 +1,357 @@
+# Keyword and location search over the lead profiles, before any LLM call.
+#
+# An inverted index over Name, Company, Location and Bio of a lead CSV
+# (emails/all.csv by default). Each field keeps its sorted terms and, per
+# term, the rows that contain it (CSR arrays), so a term is a binary search,
+# a prefix (`scrap*`) is a range of the term list, and AND/OR/NOT are
+# operations on boolean row masks: milliseconds for a million leads. Locations
+# are also normalized with the gazetteer in locations.py, so "München" is
+# found by `munich`, `city:munich` and `country:germany`. The index is saved
+# next to the CSV and rebuilt when the CSV changes.
+#
+# Query syntax: words are ANDed; OR, NOT and parentheses (AND binds tighter
+# than OR); `scrap*` is a prefix; "two words" must both be in one field;
+# field:word searches name, company, location, bio, city or country only.
+#
+# Usage:
+#   python utils/lead_search.py '(berlin OR munich) AND scrap*'
+#   python utils/lead_search.py 'country:de bio:llm NOT company:google' --output=emails/de_llm.csv
+#   python utils/lead_search.py --csv=emails/all_competitors_filtered.csv '"web automation"'
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from locations import (
+    CITY_ALIASES,
+    COUNTRY_ALIASES,
+    COUNTRY_INFO,
+    DEFAULT_CACHE,
+    MIN_WORD_LENGTH,
+    load_cache,
+    normalize_locations,
+    resolve_city,
+    resolve_country,
+    save_cache,
+)
+from metrics import rows, stage
+
+DEFAULT_CSV = "emails/all.csv"
+TEXT_FIELDS = {"name": "Name", "company": "Company", "location": "Location", "bio": "Bio"}
+# Normalized location fields hold one term per row: the city name and the
+# lowercase country code
+LOCATION_FIELDS = ("city", "country")
+FIELDS = (*TEXT_FIELDS, *LOCATION_FIELDS)
+TOKEN_RE = r"[^\W_]+(?:[+#]+)?"  # c++ and c# stay words
+MAX_TOKEN_LENGTH = 32
+QUERY_RE = re.compile(r'\s*(\(|\)|(?:\w+:)?"[^"]*"|[^\s()]+)')
+OPERATORS = ("AND", "OR", "NOT")
+
+
+def default_index_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".index.npz"
+
+
+def _fold(values: pd.Series) -> pd.Series:
+    """Lowercase without accents, like locations.fold for a whole column."""
+    return (
+        values.astype("string")
+        .str.normalize("NFKD")
+        .str.replace(r"[\u0300-\u036f]", "", regex=True)
+        .str.lower()
+    )
+
+
+def tokenize(values: pd.Series) -> pd.Series:
+    """(row position -> token) pairs of a text column, one per occurrence.
+
+    Each distinct value is tokenized once (Company and Location repeat a
+    lot) and its tokens are repeated for the rows that hold it.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    tokens = _fold(pd.Series(uniques)).str.findall(TOKEN_RE).explode().dropna()
+    tokens = tokens[tokens.str.len() <= MAX_TOKEN_LENGTH]
+    counts = np.bincount(tokens.index.to_numpy(dtype=np.int64), minlength=len(uniques))
+    starts = np.cumsum(counts) - counts
+    rows = np.flatnonzero(codes >= 0)
+    per_row = counts[codes[rows]]
+    ends = np.cumsum(per_row)
+    within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - per_row, per_row)
+    taken = np.repeat(starts[codes[rows]], per_row) + within
+    return pd.Series(tokens.to_numpy()[taken], index=np.repeat(rows, per_row), dtype=object)
+
+
+class Postings:
+    """Sorted terms of one field and the sorted rows of each term."""
+
+    def __init__(self, terms: np.ndarray, indptr: np.ndarray, docs: np.ndarray):
+        self.terms = terms
+        self.indptr = indptr
+        self.docs = docs
+
+    @classmethod
+    def build(cls, tokens: pd.Series, n_docs: int):
+        """From (row position -> term) pairs; duplicates are dropped."""
+        codes, uniques = pd.factorize(tokens.to_numpy())
+        # Hashing first and sorting only the distinct terms is much faster
+        # than sorting every occurrence by its string
+        order = np.argsort(np.asarray(uniques, dtype=str), kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        keys = np.unique(rank[codes] * max(n_docs, 1) + tokens.index.to_numpy(dtype=np.int64))
+        term_ids, docs = np.divmod(keys, max(n_docs, 1))
+        indptr = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(order)), out=indptr[1:])
+        terms = np.asarray(uniques, dtype=str)[order]
+        return cls(terms, indptr, docs.astype(np.int32))
+
+    def range(self, lo: str, hi: str = None) -> np.ndarray:
+        """Rows of the terms in [lo, hi]; only lo for an exact term."""
+        start = np.searchsorted(self.terms, lo, side="left")
+        stop = np.searchsorted(self.terms, lo if hi is None else hi, side="right")
+        return self.docs[self.indptr[start] : self.indptr[stop]]
+
+    def term(self, term: str) -> np.ndarray:
+        return self.range(term)
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        return self.range(prefix, prefix + "\U0010ffff")
+
+
+class LeadIndex:
+    """Per-field postings over the rows of one lead CSV."""
+
+    def __init__(self, fields: dict, n_docs: int, source: tuple = None):
+        self.fields = fields
+        self.n_docs = n_docs
+        # (path, mtime, size) of the CSV the index was built from
+        self.source = source
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, locations: dict = None, source: tuple = None):
+        """Index df's profile columns; locations is the normalized location cache."""
+        n_docs = len(df)
+        fields = {}
+        empty = pd.Series(dtype=object)
+        for field, column in TEXT_FIELDS.items():
+            tokens = tokenize(df[column]) if column in df.columns else empty
+            fields[field] = tokens
+        if "Location" in df.columns:
+            normalized = normalize_locations(df["Location"], locations).reset_index(drop=True)
+            city = normalized["city"].str.lower()
+            country = normalized["country"].str.lower()
+            fields["city"] = city[city != ""]
+            fields["country"] = country[country != ""]
+            # location:germany finds "München" too
+            country_names = {code: name for code, (name, _) in COUNTRY_INFO.items()}
+            names = normalized["city"] + " " + normalized["country"].map(country_names).fillna("")
+            fields["location"] = pd.concat([fields["location"], tokenize(names)])
+        else:
+            fields["city"] = fields["country"] = empty
+        return cls(
+            {field: Postings.build(tokens, n_docs) for field, tokens in fields.items()},
+            n_docs,
+            source,
+        )
+
+    # Querying
+
+    def mask(self, query: str) -> np.ndarray:
+        """Boolean row mask of the rows matching query."""
+        return _Parser(self, query).parse()
+
+    def search(self, query: str) -> np.ndarray:
+        """Row positions matching query, in file order."""
+        return np.flatnonzero(self.mask(query))
+
+    def term_mask(self, text: str, field: str = None, prefix: bool = False) -> np.ndarray:
+        """Rows with text (all of its words) in field, or in any text field."""
+        mask = np.zeros(self.n_docs, dtype=bool)
+        if field in LOCATION_FIELDS:
+            resolve = resolve_city if field == "city" else resolve_country
+            term = (resolve(text) or text).lower()
+            postings = self.fields[field]
+            mask[postings.prefix(term) if prefix else postings.term(term)] = True
+            return mask
+        words = tokenize(pd.Series([text])).tolist()
+        if not words:
+            return mask
+        if field in (None, "location") and not prefix:
+            # Other spellings of a place: "münchen" finds "Munich, Germany".
+            # Short aliases ("la", "uk") only when asked for as a location
+            key = " ".join(words)
+            if field or len(key) >= MIN_WORD_LENGTH:
+                city, country = CITY_ALIASES.get(key), COUNTRY_ALIASES.get(key)
+                if city:
+                    mask[self.fields["city"].term(city.lower())] = True
+                if country:
+                    mask[self.fields["country"].term(country.lower())] = True
+        for name in [field] if field else TEXT_FIELDS:
+            postings = self.fields[name]
+            in_field = None
+            for i, word in enumerate(words):
+                last = i == len(words) - 1
+                docs = postings.prefix(word) if prefix and last else postings.term(word)
+                word_mask = np.zeros(self.n_docs, dtype=bool)
+                word_mask[docs] = True
+                in_field = word_mask if in_field is None else in_field & word_mask
+            mask |= in_field
+        return mask
+
+    # Persistence
+
+    def save(self, path: str):
+        arrays = {"n_docs": np.array(self.n_docs)}
+        if self.source:
+            arrays["source"] = np.array([str(v) for v in self.source])
+        for field, postings in self.fields.items():
+            arrays[f"{field}_terms"] = postings.terms
+            arrays[f"{field}_indptr"] = postings.indptr
+            arrays[f"{field}_docs"] = postings.docs
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            fields = {
+                field: Postings(
+                    data[f"{field}_terms"], data[f"{field}_indptr"], data[f"{field}_docs"]
+                )
+                for field in FIELDS
+            }
+            source = tuple(data["source"].tolist()) if "source" in data else None
+            return cls(fields, int(data["n_docs"]), source)
+
+
+def _source(csv_path: str) -> tuple:
+    stat = os.stat(csv_path)
+    return (os.path.abspath(csv_path), str(stat.st_mtime), str(stat.st_size))
+
+
+def open_index(
+    csv_path: str = DEFAULT_CSV, path: str = None, locations_path: str = DEFAULT_CACHE
+) -> LeadIndex:
+    """The saved index of csv_path, rebuilt first if the CSV changed."""
+    path = path or default_index_path(csv_path)
+    if os.path.exists(path):
+        index = LeadIndex.load(path)
+        if index.source == _source(csv_path):
+            return index
+    with stage("index"):
+        df = pd.read_csv(csv_path, usecols=lambda c: c in TEXT_FIELDS.values())
+        locations = load_cache(locations_path)
+        index = LeadIndex.build(df, locations, _source(csv_path))
+        save_cache(locations, locations_path)
+        rows(rows_in=len(df))
+    index.save(path)
+    return index
+
+
+class _Parser:
+    """Recursive descent over the query, evaluating straight to row masks.
+
+    or_expr := and_expr (OR and_expr)*
+    and_expr := not_expr ([AND] not_expr)*
+    not_expr := NOT not_expr | "(" or_expr ")" | term
+    """
+
+    def __init__(self, index: LeadIndex, query: str):
+        self.index = index
+        self.tokens = QUERY_RE.findall(query)
+        self.pos = 0
+
+    def parse(self) -> np.ndarray:
+        if not self.tokens:
+            raise ValueError("Empty query")
+        mask = self._or()
+        if self.pos < len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.pos]!r} in query")
+        return mask
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("Query ends too early")
+        self.pos += 1
+        return token
+
+    def _or(self) -> np.ndarray:
+        mask = self._and()
+        while self._peek() == "OR":
+            self.pos += 1
+            mask = mask | self._and()
+        return mask
+
+    def _and(self) -> np.ndarray:
+        mask = self._not()
+        while self._peek() not in (None, ")", "OR"):
+            if self._peek() == "AND":
+                self.pos += 1
+            mask = mask & self._not()
+        return mask
+
+    def _not(self) -> np.ndarray:
+        token = self._next()
+        if token == "NOT":
+            return ~self._not()
+        if token == "(":
+            mask = self._or()
+            if self._next() != ")":
+                raise ValueError("Missing ) in query")
+            return mask
+        if token in OPERATORS or token == ")":
+            raise ValueError(f"Unexpected {token!r} in query")
+        return self._term(token)
+
+    def _term(self, token: str) -> np.ndarray:
+        field = None
+        name, sep, rest = token.partition(":")
+        if sep and name.lower() in FIELDS and rest:
+            field, token = name.lower(), rest
+        prefix = token.endswith("*") and not token.startswith('"')
+        text = token.strip('"').rstrip("*")
+        return self.index.term_mask(text, field, prefix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keyword and location search over leads.")
+    parser.add_argument("query", help="e.g. '(berlin OR munich) AND scrap*'")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Lead CSV to search")
+    parser.add_argument("--index", help="Index file (default: next to the CSV)")
+    parser.add_argument("--locations", default=DEFAULT_CACHE, help="Normalized locations cache")
+    parser.add_argument("--output", help="Write the matching rows to this CSV")
+    parser.add_argument("--limit", type=int, default=20, help="Matches to print")
+    args = parser.parse_args(argv)
+
+    index = open_index(args.csv, args.index, args.locations)
+    start = time.perf_counter()
+    try:
+        matches = index.search(args.query)
+    except ValueError as e:
+        sys.exit(str(e))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{len(matches)}/{index.n_docs} leads in {elapsed:.1f} ms", file=sys.stderr)
+
+    if args.output or args.limit:
+        from lead_schema import read_leads
+
+        columns = ["Login", "Email", *TEXT_FIELDS.values()]
+        df = read_leads(args.csv).iloc[matches]
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"Wrote {len(df)} leads to {args.output}", file=sys.stderr)
+        else:
+            shown = [c for c in columns if c in df.columns]
+            print(df[shown].head(args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
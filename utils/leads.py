@@ -0,0 +1,353 @@
+# Cross-repo lead identity store: one row per person, not per starred repo.
+#
+# The same person shows up in the *_emails.csv of every competitor they
+# starred. Rows are linked into one person when they share a login or a
+# personal/work email (canonical key from email_normalize), profiles are
+# merged field by field, and the repos each person starred are kept as a
+# bitmask (one bit per repo, packed into uint64 words). Upserts are whole-
+# batch: the batch and the people it touches are grouped with a connected-
+# components pass, so adding a repo's CSV costs O(rows) and never rescans
+# the people it does not touch.
+#
+# Usage:
+#   python utils/leads.py build --data-dir=email_reachout
+#   python utils/leads.py show jane-doe
+#   python utils/leads.py export --output=emails/leads.csv
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from email_normalize import normalize_emails, profile_richness
+from metrics import count, rows, stage
+
+DEFAULT_STORE = "emails/leads.npz"
+
+TEXT_COLUMNS = ["Login", "Email", "EmailKey", "EmailType", "Name", "Company", "Location", "Bio"]
+COUNT_COLUMNS = ["Followers", "Following"]
+# Emails that identify a single person; role addresses (info@, team@) do not
+LINKING_EMAIL_TYPES = ("personal", "work")
+
+
+class LeadStore:
+    """People with merged profiles, aliases (login/email -> person) and repo bits."""
+
+    def __init__(self, people=None, repos=None, bits=None, aliases=None):
+        if people is None:
+            people = pd.DataFrame(
+                {c: pd.Series(dtype=object) for c in TEXT_COLUMNS}
+                | {c: pd.Series(dtype="int64") for c in COUNT_COLUMNS}
+            )
+        self.people = people.reset_index(drop=True)
+        self.repos = list(repos or [])
+        self.repo_ids = {repo: j for j, repo in enumerate(self.repos)}
+        if bits is None:
+            bits = np.zeros((len(self.people), _words(len(self.repos))), dtype=np.uint64)
+        self.bits = bits
+        # "login:<login>" / "email:<canonical email>" -> person id
+        self.aliases = dict(aliases or {})
+
+    def __len__(self):
+        return len(self.people)
+
+    # Upserts
+
+    def upsert(self, df: pd.DataFrame, repo_column: str = "repo") -> dict:
+        """Merge rows (Login, Email, profile fields, owner/repo) into the store.
+
+        Returns counts of rows, new people and people merged together because
+        the batch linked them (same email under two logins, say). Person ids
+        stay stable except when people are merged.
+        """
+        df = df.reset_index(drop=True)
+        n, m = len(self.people), len(df)
+        if m == 0:
+            return {"rows": 0, "new": 0, "merged": 0}
+
+        batch = _batch_profiles(df)
+        repos = _repo_names(df, repo_column)
+
+        # Key nodes: every login and linking email key in the batch
+        login_keys = "login:" + batch["Login"].str.lower()
+        linking = batch["EmailType"].isin(LINKING_EMAIL_TYPES).to_numpy()
+        email_keys = "email:" + batch["EmailKey"][linking]
+        row_of_key = np.concatenate(
+            [np.flatnonzero(login_keys.notna().to_numpy()), np.flatnonzero(linking)]
+        )
+        keys = pd.concat([login_keys.dropna(), email_keys], ignore_index=True)
+        codes, unique_keys = pd.factorize(keys)
+        unique_keys = unique_keys.to_numpy(dtype=object)
+        found = np.fromiter(
+            (self.aliases.get(k, -1) for k in unique_keys), np.int64, len(unique_keys)
+        )
+        known = found >= 0
+        old = np.unique(found[known])
+        p = len(old)
+
+        from scipy import sparse
+        from scipy.sparse.csgraph import connected_components
+
+        # Graph over the people the batch touches [0, p), batch rows
+        # [p, p + m) and keys after that; components are people
+        src = np.concatenate([p + row_of_key, p + m + np.flatnonzero(known)])
+        dst = np.concatenate([p + m + codes, np.searchsorted(old, found[known])])
+        size = p + m + len(unique_keys)
+        graph = sparse.coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(size, size))
+        _, labels = connected_components(graph, directed=False)
+
+        # Merge old and new rows of every component: richest profile first,
+        # batch rows before stored ones so changed fields win
+        self._add_repos(repos.dropna().unique())
+        batch_bits = np.zeros((m, self.bits.shape[1]), dtype=np.uint64)
+        cols = repos.map(self.repo_ids)
+        has_repo = cols.notna().to_numpy()
+        cols = cols[has_repo].to_numpy(dtype=np.int64)
+        np.bitwise_or.at(
+            batch_bits,
+            (np.flatnonzero(has_repo), cols // 64),
+            np.left_shift(np.uint64(1), (cols % 64).astype(np.uint64)),
+        )
+        group = pd.concat([batch, self.people.iloc[old]], ignore_index=True)
+        group_bits = np.vstack([batch_bits, self.bits[old]])
+        group["_label"] = np.concatenate([labels[p : p + m], labels[:p]])
+        group["_richness"] = profile_richness(group)
+        group["_new"] = np.r_[np.ones(m, dtype=bool), np.zeros(p, dtype=bool)]
+        order = group.sort_values(
+            ["_label", "_richness", "_new"], ascending=[True, False, False], kind="stable"
+        ).index.to_numpy()
+        group = group.loc[order]
+        by_label = group.groupby("_label", sort=True)
+        merged = by_label[TEXT_COLUMNS].first()
+        for column in COUNT_COLUMNS:
+            merged[column] = by_label[column].max().fillna(0).astype("int64")
+        starts = np.flatnonzero(np.r_[True, np.diff(group["_label"].to_numpy()) != 0])
+        merged_bits = np.bitwise_or.reduceat(group_bits[order], starts, axis=0)
+
+        # A component keeps the smallest id of its stored people; components
+        # without stored people are new people
+        survivor = pd.Series(old).groupby(labels[:p]).min()
+        new_labels = merged.index[~merged.index.isin(survivor.index)]
+        id_of_label = pd.concat(
+            [survivor, pd.Series(np.arange(n, n + len(new_labels)), index=new_labels)]
+        )
+        ids = id_of_label[merged.index].to_numpy()
+        existing = ids < n
+        merged = merged.reset_index(drop=True)
+        for column in merged.columns:
+            self.people.loc[ids[existing], column] = merged.loc[existing, column].to_numpy()
+        self.bits[ids[existing]] = merged_bits[existing]
+        self.people = pd.concat([self.people, merged[~existing]], ignore_index=True)
+        self.bits = np.vstack([self.bits, merged_bits[~existing]])
+        self.aliases.update(zip(unique_keys, id_of_label[labels[p + m :]].tolist()))
+
+        dead = np.setdiff1d(old, survivor.to_numpy())
+        if len(dead):
+            forward = np.arange(len(self.people))
+            forward[dead] = id_of_label[labels[np.searchsorted(old, dead)]].to_numpy()
+            self._drop_people(dead, forward)
+        count("leads_new_people", len(new_labels))
+        count("leads_merged_people", len(dead))
+        return {"rows": m, "new": len(new_labels), "merged": len(dead)}
+
+    def _drop_people(self, dead: np.ndarray, forward: np.ndarray):
+        """Remove merged-away people; forward maps every old id to its survivor."""
+        keep = np.ones(len(self.people), dtype=bool)
+        keep[dead] = False
+        new_index = np.cumsum(keep) - 1
+        remap = new_index[forward]
+        self.people = self.people[keep].reset_index(drop=True)
+        self.bits = self.bits[keep]
+        self.aliases = {key: int(remap[person]) for key, person in self.aliases.items()}
+
+    def _add_repos(self, repos):
+        for repo in repos:
+            if repo not in self.repo_ids:
+                self.repo_ids[repo] = len(self.repos)
+                self.repos.append(repo)
+        words = _words(len(self.repos))
+        if words > self.bits.shape[1]:
+            pad = np.zeros((len(self.bits), words - self.bits.shape[1]), dtype=np.uint64)
+            self.bits = np.hstack([self.bits, pad])
+
+    # Lookups
+
+    def lookup(self, logins=None, emails=None) -> np.ndarray:
+        """Person id per login (or, where missing, email); -1 if unknown."""
+        ids = None
+        if logins is not None:
+            keys = "login:" + pd.Series(logins, dtype="string").str.lower()
+            ids = self._alias_people_of(keys)
+        if emails is not None:
+            normalized = normalize_emails(pd.Series(emails))
+            keys = ("email:" + normalized["EmailKey"]).where(normalized["EmailKey"] != "")
+            by_email = self._alias_people_of(keys)
+            ids = by_email if ids is None else np.where(ids >= 0, ids, by_email)
+        return ids if ids is not None else np.array([], dtype=np.int64)
+
+    def _alias_people_of(self, keys: pd.Series) -> np.ndarray:
+        keys = keys.fillna("").tolist()
+        return np.fromiter((self.aliases.get(k, -1) for k in keys), np.int64, len(keys))
+
+    def repo_matrix(self, ids=None) -> np.ndarray:
+        """Boolean people x repos matrix (rows for ids, or everyone)."""
+        bits = self.bits if ids is None else self.bits[ids]
+        unpacked = np.unpackbits(
+            bits.astype("<u8").view(np.uint8), axis=1, bitorder="little"
+        )
+        return unpacked[:, : len(self.repos)].astype(bool)
+
+    def starred_mask(self, repo: str) -> np.ndarray:
+        col = self.repo_ids.get(repo)
+        if col is None:
+            return np.zeros(len(self.people), dtype=bool)
+        return (self.bits[:, col // 64] >> np.uint64(col % 64)) & np.uint64(1) == 1
+
+    def repo_lists(self, ids=None, sep: str = ";") -> pd.Series:
+        """Starred repos of each person, joined by sep."""
+        matrix = self.repo_matrix(ids)
+        people, cols = np.nonzero(matrix)
+        names = pd.Series(np.asarray(self.repos, dtype=object)[cols])
+        joined = names.groupby(people).agg(sep.join)
+        return joined.reindex(np.arange(len(matrix)), fill_value="").reset_index(drop=True)
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per person with repos and repo_count."""
+        matrix = self.repo_matrix()
+        return self.people.assign(
+            repos=self.repo_lists().to_numpy(), repo_count=matrix.sum(axis=1)
+        )
+
+    # Persistence
+
+    def save(self, path: str = DEFAULT_STORE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {
+            "repos": np.array(self.repos, dtype=str),
+            "bits": self.bits,
+            "alias_keys": np.array(list(self.aliases), dtype=str),
+            "alias_people": np.fromiter(self.aliases.values(), np.int64, len(self.aliases)),
+        }
+        for column in TEXT_COLUMNS:
+            arrays[column] = self.people[column].fillna("").to_numpy(dtype=str)
+        for column in COUNT_COLUMNS:
+            arrays[column] = self.people[column].to_numpy(dtype=np.int64)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_STORE):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            people = pd.DataFrame(
+                {c: pd.Series(data[c], dtype=object).replace("", None) for c in TEXT_COLUMNS}
+                | {c: data[c] for c in COUNT_COLUMNS}
+            )
+            return cls(
+                people=people,
+                repos=data["repos"].tolist(),
+                bits=data["bits"].astype(np.uint64),
+                aliases=zip(data["alias_keys"].tolist(), data["alias_people"].tolist()),
+            )
+
+
+def _words(repos: int) -> int:
+    return max(1, -(-repos // 64))
+
+
+def _batch_profiles(df: pd.DataFrame) -> pd.DataFrame:
+    """The store's columns of df, with normalized emails and empty strings as NA."""
+    batch = pd.DataFrame(index=df.index)
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            values = df[column].astype(object)
+            batch[column] = values.where(values.notna() & (values != ""), None)
+        else:
+            batch[column] = None
+    emails = df["Email"] if "Email" in df.columns else pd.Series("", index=df.index)
+    normalized = normalize_emails(emails)
+    # Unusable addresses are dropped so Email, EmailKey and EmailType of a
+    # merged person always come from the same row
+    invalid = (normalized["EmailKey"] == "").to_numpy()
+    batch["Email"] = batch["Email"].mask(invalid, None)
+    batch["EmailKey"] = normalized["EmailKey"].astype(object).mask(invalid, None)
+    batch["EmailType"] = normalized["EmailType"].astype(object).mask(invalid, None)
+    for column in COUNT_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series(0, index=df.index)
+        batch[column] = pd.to_numeric(values, errors="coerce").fillna(0).astype("int64")
+    return batch
+
+
+def _repo_names(df: pd.DataFrame, repo_column: str) -> pd.Series:
+    """owner/repo per row (create_data keeps owner and repo in two columns)."""
+    if repo_column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+    repos = df[repo_column].astype("string")
+    if "owner" in df.columns:
+        repos = df["owner"].astype("string") + "/" + repos
+    return repos
+
+
+def read_email_csvs(data_dir: str) -> pd.DataFrame:
+    """All *_emails.csv files of data_dir with owner and repo columns."""
+    frames = []
+    for filename in sorted(os.listdir(data_dir)):
+        if filename.endswith("_emails.csv"):
+            owner, repo = filename.replace("_emails.csv", "").split("_", 1)
+            df = pd.read_csv(os.path.join(data_dir, filename))
+            frames.append(df.assign(owner=owner, repo=repo))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-repo lead identity store.")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="Store file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Upsert every *_emails.csv of a folder")
+    build.add_argument("--data-dir", default="email_reachout")
+    build.add_argument("--rebuild", action="store_true", help="Start from an empty store")
+
+    show = sub.add_parser("show", help="Merged profile and repos of a login or email")
+    show.add_argument("who", nargs="+")
+
+    export = sub.add_parser("export", help="One row per person as CSV")
+    export.add_argument("--output", default="emails/leads.csv")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        store = LeadStore() if args.rebuild else LeadStore.load(args.store)
+        with stage("read"):
+            df = read_email_csvs(args.data_dir)
+            rows(rows_out=len(df))
+        with stage("upsert", rows_in=len(df)):
+            result = store.upsert(df)
+            rows(rows_out=len(store))
+        store.save(args.store)
+        print(
+            f"{result['rows']} rows -> {len(store)} people ({result['new']} new,"
+            f" {result['merged']} merged) x {len(store.repos)} repos in {args.store}"
+        )
+        return
+
+    store = LeadStore.load(args.store)
+    if not len(store):
+        sys.exit(f"No leads in {args.store}; run `build` first")
+    if args.command == "show":
+        emails = [w if "@" in w else "" for w in args.who]
+        ids = store.lookup(logins=args.who, emails=emails)
+        frame = store.to_frame()
+        for who, person in zip(args.who, ids):
+            if person < 0:
+                print(f"{who}: not found")
+            else:
+                print(frame.iloc[person].to_string(), end="\n\n")
+    else:
+        frame = store.to_frame()
+        frame.to_csv(args.output, index=False, lineterminator="\n")
+        print(f"Wrote {len(frame)} people to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
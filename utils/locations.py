@@ -0,0 +1,494 @@
+# Free-text GitHub locations normalized to city, country and time zone.
+#
+# A small gazetteer of the cities, countries and US states that show up in
+# stargazer profiles, with their common spellings ("München", "NYC",
+# "SF Bay Area", "Deutschland"). A location is split into its comma/slash
+# separated parts, each part (or run of words in it) is looked up, and the
+# city decides the country unless the location names another one ("Paris,
+# Texas"). Results are cached per distinct location string in
+# emails/locations.json; edit an entry there to fix a wrong match, it is
+# never recomputed.
+#
+# Usage:
+#   python utils/locations.py "Munich, Bavaria" "SF Bay Area" "Deutschland"
+#   python utils/locations.py --csv=emails/all.csv   # most common locations
+import argparse
+import json
+import os
+import re
+import unicodedata
+
+DEFAULT_CACHE = "emails/locations.json"
+
+# name|country|time zone|other spellings
+CITIES = """
+San Francisco|US|America/Los_Angeles|sf,sfo,san francisco bay area,sf bay area,bay area,silicon valley
+San Jose|US|America/Los_Angeles|
+Palo Alto|US|America/Los_Angeles|
+Mountain View|US|America/Los_Angeles|
+Menlo Park|US|America/Los_Angeles|
+Sunnyvale|US|America/Los_Angeles|
+Oakland|US|America/Los_Angeles|
+Berkeley|US|America/Los_Angeles|
+Los Angeles|US|America/Los_Angeles|la,l.a.
+San Diego|US|America/Los_Angeles|
+Seattle|US|America/Los_Angeles|
+Portland|US|America/Los_Angeles|
+Las Vegas|US|America/Los_Angeles|
+Denver|US|America/Denver|
+Boulder|US|America/Denver|
+Salt Lake City|US|America/Denver|slc
+Phoenix|US|America/Phoenix|
+Austin|US|America/Chicago|
+Dallas|US|America/Chicago|
+Houston|US|America/Chicago|
+Chicago|US|America/Chicago|
+Minneapolis|US|America/Chicago|
+New York|US|America/New_York|nyc,new york city,manhattan,brooklyn,ny city
+Boston|US|America/New_York|
+Cambridge|US|America/New_York|
+Washington|US|America/New_York|washington dc,washington d.c.,dc
+Philadelphia|US|America/New_York|
+Pittsburgh|US|America/New_York|
+Atlanta|US|America/New_York|
+Miami|US|America/New_York|
+Raleigh|US|America/New_York|
+Toronto|CA|America/Toronto|
+Montreal|CA|America/Toronto|montréal
+Ottawa|CA|America/Toronto|
+Waterloo|CA|America/Toronto|
+Vancouver|CA|America/Vancouver|
+Calgary|CA|America/Edmonton|
+Mexico City|MX|America/Mexico_City|ciudad de mexico,cdmx
+Guadalajara|MX|America/Mexico_City|
+Sao Paulo|BR|America/Sao_Paulo|são paulo
+Rio de Janeiro|BR|America/Sao_Paulo|rio
+Buenos Aires|AR|America/Argentina/Buenos_Aires|
+Santiago|CL|America/Santiago|
+Bogota|CO|America/Bogota|bogotá
+Medellin|CO|America/Bogota|medellín
+Lima|PE|America/Lima|
+London|GB|Europe/London|
+Manchester|GB|Europe/London|
+Edinburgh|GB|Europe/London|
+Oxford|GB|Europe/London|
+Bristol|GB|Europe/London|
+Dublin|IE|Europe/Dublin|
+Berlin|DE|Europe/Berlin|
+Munich|DE|Europe/Berlin|munchen,muenchen,münchen
+Hamburg|DE|Europe/Berlin|
+Frankfurt|DE|Europe/Berlin|frankfurt am main
+Cologne|DE|Europe/Berlin|koln,koeln,köln
+Stuttgart|DE|Europe/Berlin|
+Dusseldorf|DE|Europe/Berlin|duesseldorf,düsseldorf
+Leipzig|DE|Europe/Berlin|
+Karlsruhe|DE|Europe/Berlin|
+Paris|FR|Europe/Paris|
+Lyon|FR|Europe/Paris|
+Toulouse|FR|Europe/Paris|
+Amsterdam|NL|Europe/Amsterdam|
+Rotterdam|NL|Europe/Amsterdam|
+Utrecht|NL|Europe/Amsterdam|
+Eindhoven|NL|Europe/Amsterdam|
+Delft|NL|Europe/Amsterdam|
+Brussels|BE|Europe/Brussels|bruxelles,brussel
+Antwerp|BE|Europe/Brussels|antwerpen
+Luxembourg|LU|Europe/Luxembourg|
+Zurich|CH|Europe/Zurich|zürich,zuerich
+Geneva|CH|Europe/Zurich|geneve,genève,genf
+Lausanne|CH|Europe/Zurich|
+Basel|CH|Europe/Zurich|
+Vienna|AT|Europe/Vienna|wien
+Prague|CZ|Europe/Prague|praha
+Warsaw|PL|Europe/Warsaw|warszawa
+Krakow|PL|Europe/Warsaw|kraków,cracow
+Wroclaw|PL|Europe/Warsaw|wrocław
+Budapest|HU|Europe/Budapest|
+Bucharest|RO|Europe/Bucharest|bucuresti,bucurești
+Sofia|BG|Europe/Sofia|
+Belgrade|RS|Europe/Belgrade|beograd
+Zagreb|HR|Europe/Zagreb|
+Athens|GR|Europe/Athens|
+Istanbul|TR|Europe/Istanbul|
+Ankara|TR|Europe/Istanbul|
+Madrid|ES|Europe/Madrid|
+Barcelona|ES|Europe/Madrid|
+Valencia|ES|Europe/Madrid|
+Lisbon|PT|Europe/Lisbon|lisboa
+Porto|PT|Europe/Lisbon|
+Milan|IT|Europe/Rome|milano
+Rome|IT|Europe/Rome|roma
+Turin|IT|Europe/Rome|torino
+Copenhagen|DK|Europe/Copenhagen|kobenhavn,københavn
+Stockholm|SE|Europe/Stockholm|
+Gothenburg|SE|Europe/Stockholm|goteborg,göteborg
+Oslo|NO|Europe/Oslo|
+Helsinki|FI|Europe/Helsinki|
+Tallinn|EE|Europe/Tallinn|
+Riga|LV|Europe/Riga|
+Vilnius|LT|Europe/Vilnius|
+Kyiv|UA|Europe/Kyiv|kiev
+Lviv|UA|Europe/Kyiv|
+Kharkiv|UA|Europe/Kyiv|kharkov
+Minsk|BY|Europe/Minsk|
+Moscow|RU|Europe/Moscow|moskva
+Saint Petersburg|RU|Europe/Moscow|st petersburg,st. petersburg,spb
+Novosibirsk|RU|Asia/Novosibirsk|
+Tel Aviv|IL|Asia/Jerusalem|tel aviv-yafo,tlv
+Jerusalem|IL|Asia/Jerusalem|
+Dubai|AE|Asia/Dubai|
+Abu Dhabi|AE|Asia/Dubai|
+Riyadh|SA|Asia/Riyadh|
+Cairo|EG|Africa/Cairo|
+Lagos|NG|Africa/Lagos|
+Nairobi|KE|Africa/Nairobi|
+Cape Town|ZA|Africa/Johannesburg|
+Johannesburg|ZA|Africa/Johannesburg|
+Tehran|IR|Asia/Tehran|
+Karachi|PK|Asia/Karachi|
+Lahore|PK|Asia/Karachi|
+Islamabad|PK|Asia/Karachi|
+Bangalore|IN|Asia/Kolkata|bengaluru,blr
+Mumbai|IN|Asia/Kolkata|bombay
+Delhi|IN|Asia/Kolkata|new delhi,ncr,delhi ncr
+Gurgaon|IN|Asia/Kolkata|gurugram
+Noida|IN|Asia/Kolkata|
+Hyderabad|IN|Asia/Kolkata|
+Chennai|IN|Asia/Kolkata|madras
+Pune|IN|Asia/Kolkata|
+Kolkata|IN|Asia/Kolkata|calcutta
+Ahmedabad|IN|Asia/Kolkata|
+Dhaka|BD|Asia/Dhaka|
+Colombo|LK|Asia/Colombo|
+Kathmandu|NP|Asia/Kathmandu|
+Singapore|SG|Asia/Singapore|
+Kuala Lumpur|MY|Asia/Kuala_Lumpur|kl
+Jakarta|ID|Asia/Jakarta|
+Bangkok|TH|Asia/Bangkok|
+Ho Chi Minh City|VN|Asia/Ho_Chi_Minh|ho chi minh,saigon,hcmc
+Hanoi|VN|Asia/Ho_Chi_Minh|ha noi
+Manila|PH|Asia/Manila|
+Hong Kong|HK|Asia/Hong_Kong|hongkong
+Taipei|TW|Asia/Taipei|
+Beijing|CN|Asia/Shanghai|peking
+Shanghai|CN|Asia/Shanghai|
+Shenzhen|CN|Asia/Shanghai|
+Guangzhou|CN|Asia/Shanghai|canton
+Hangzhou|CN|Asia/Shanghai|
+Chengdu|CN|Asia/Shanghai|
+Wuhan|CN|Asia/Shanghai|
+Nanjing|CN|Asia/Shanghai|
+Xi'an|CN|Asia/Shanghai|xian
+Seoul|KR|Asia/Seoul|
+Busan|KR|Asia/Seoul|
+Tokyo|JP|Asia/Tokyo|
+Osaka|JP|Asia/Tokyo|
+Kyoto|JP|Asia/Tokyo|
+Sydney|AU|Australia/Sydney|
+Melbourne|AU|Australia/Melbourne|
+Brisbane|AU|Australia/Brisbane|
+Perth|AU|Australia/Perth|
+Auckland|NZ|Pacific/Auckland|
+Wellington|NZ|Pacific/Auckland|
+"""
+
+# code|name|time zone|other spellings
+COUNTRIES = """
+US|United States|America/New_York|usa,u.s.,u.s.a.,united states of america,america
+CA|Canada|America/Toronto|
+MX|Mexico|America/Mexico_City|méxico
+BR|Brazil|America/Sao_Paulo|brasil
+AR|Argentina|America/Argentina/Buenos_Aires|
+CL|Chile|America/Santiago|
+CO|Colombia|America/Bogota|
+PE|Peru|America/Lima|perú
+GB|United Kingdom|Europe/London|uk,u.k.,england,scotland,wales,great britain,britain
+IE|Ireland|Europe/Dublin|
+DE|Germany|Europe/Berlin|deutschland
+FR|France|Europe/Paris|
+NL|Netherlands|Europe/Amsterdam|the netherlands,holland,nederland
+BE|Belgium|Europe/Brussels|belgique,belgie
+LU|Luxembourg|Europe/Luxembourg|
+CH|Switzerland|Europe/Zurich|schweiz,suisse
+AT|Austria|Europe/Vienna|osterreich,österreich
+CZ|Czechia|Europe/Prague|czech republic
+PL|Poland|Europe/Warsaw|polska
+HU|Hungary|Europe/Budapest|
+RO|Romania|Europe/Bucharest|
+BG|Bulgaria|Europe/Sofia|
+RS|Serbia|Europe/Belgrade|
+HR|Croatia|Europe/Zagreb|
+GR|Greece|Europe/Athens|
+TR|Turkey|Europe/Istanbul|turkiye,türkiye
+ES|Spain|Europe/Madrid|espana,españa
+PT|Portugal|Europe/Lisbon|
+IT|Italy|Europe/Rome|italia
+DK|Denmark|Europe/Copenhagen|danmark
+SE|Sweden|Europe/Stockholm|sverige
+NO|Norway|Europe/Oslo|norge
+FI|Finland|Europe/Helsinki|suomi
+EE|Estonia|Europe/Tallinn|
+LV|Latvia|Europe/Riga|
+LT|Lithuania|Europe/Vilnius|
+UA|Ukraine|Europe/Kyiv|
+BY|Belarus|Europe/Minsk|
+RU|Russia|Europe/Moscow|russian federation
+IL|Israel|Asia/Jerusalem|
+AE|United Arab Emirates|Asia/Dubai|uae
+SA|Saudi Arabia|Asia/Riyadh|ksa
+EG|Egypt|Africa/Cairo|
+NG|Nigeria|Africa/Lagos|
+KE|Kenya|Africa/Nairobi|
+ZA|South Africa|Africa/Johannesburg|
+IR|Iran|Asia/Tehran|
+PK|Pakistan|Asia/Karachi|
+IN|India|Asia/Kolkata|bharat
+BD|Bangladesh|Asia/Dhaka|
+LK|Sri Lanka|Asia/Colombo|
+NP|Nepal|Asia/Kathmandu|
+SG|Singapore|Asia/Singapore|
+MY|Malaysia|Asia/Kuala_Lumpur|
+ID|Indonesia|Asia/Jakarta|
+TH|Thailand|Asia/Bangkok|
+VN|Vietnam|Asia/Ho_Chi_Minh|viet nam
+PH|Philippines|Asia/Manila|
+HK|Hong Kong|Asia/Hong_Kong|
+TW|Taiwan|Asia/Taipei|
+CN|China|Asia/Shanghai|prc,people's republic of china,中国
+KR|South Korea|Asia/Seoul|korea,republic of korea
+JP|Japan|Asia/Tokyo|日本
+AU|Australia|Australia/Sydney|
+NZ|New Zealand|Pacific/Auckland|
+"""
+
+# code|name|time zone
+US_STATES = """
+AL|Alabama|America/Chicago
+AK|Alaska|America/Anchorage
+AZ|Arizona|America/Phoenix
+AR|Arkansas|America/Chicago
+CA|California|America/Los_Angeles
+CO|Colorado|America/Denver
+CT|Connecticut|America/New_York
+DE|Delaware|America/New_York
+DC|District of Columbia|America/New_York
+FL|Florida|America/New_York
+GA|Georgia|America/New_York
+HI|Hawaii|Pacific/Honolulu
+ID|Idaho|America/Boise
+IL|Illinois|America/Chicago
+IN|Indiana|America/Indiana/Indianapolis
+IA|Iowa|America/Chicago
+KS|Kansas|America/Chicago
+KY|Kentucky|America/New_York
+LA|Louisiana|America/Chicago
+ME|Maine|America/New_York
+MD|Maryland|America/New_York
+MA|Massachusetts|America/New_York
+MI|Michigan|America/Detroit
+MN|Minnesota|America/Chicago
+MS|Mississippi|America/Chicago
+MO|Missouri|America/Chicago
+MT|Montana|America/Denver
+NE|Nebraska|America/Chicago
+NV|Nevada|America/Los_Angeles
+NH|New Hampshire|America/New_York
+NJ|New Jersey|America/New_York
+NM|New Mexico|America/Denver
+NY|New York State|America/New_York
+NC|North Carolina|America/New_York
+ND|North Dakota|America/Chicago
+OH|Ohio|America/New_York
+OK|Oklahoma|America/Chicago
+OR|Oregon|America/Los_Angeles
+PA|Pennsylvania|America/New_York
+RI|Rhode Island|America/New_York
+SC|South Carolina|America/New_York
+SD|South Dakota|America/Chicago
+TN|Tennessee|America/Chicago
+TX|Texas|America/Chicago
+UT|Utah|America/Denver
+VT|Vermont|America/New_York
+VA|Virginia|America/New_York
+WA|Washington State|America/Los_Angeles
+WV|West Virginia|America/New_York
+WI|Wisconsin|America/Chicago
+WY|Wyoming|America/Denver
+"""
+
+WORD_RE = re.compile(r"[^\W_]+(?:[+#]+|'[^\W_]+)?")
+PART_RE = re.compile(r"[,/|;()·•]+|\s[-–—]\s")
+# Lookups of single words shorter than this only count as a whole part
+# ("LA", "UK"), not inside longer text ("la" in "Vila Nova")
+MIN_WORD_LENGTH = 4
+
+
+def fold(text: str) -> str:
+    """Lowercase without accents: "München" -> "munchen"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _key(text: str) -> str:
+    return " ".join(WORD_RE.findall(fold(text)))
+
+
+def _table(text: str) -> list:
+    return [line.split("|") for line in text.strip().splitlines()]
+
+
+def _aliases(entries) -> dict:
+    aliases = {}
+    for value, spellings in entries:
+        for spelling in spellings:
+            aliases.setdefault(_key(spelling), value)
+    return aliases
+
+
+CITY_INFO = {name: (country, tz) for name, country, tz, _ in _table(CITIES)}
+COUNTRY_INFO = {code: (name, tz) for code, name, tz, _ in _table(COUNTRIES)}
+STATE_INFO = {code: (name, tz) for code, name, tz in _table(US_STATES)}
+CITY_ALIASES = _aliases(
+    (name, [name, *filter(None, other.split(","))]) for name, _, _, other in _table(CITIES)
+)
+COUNTRY_ALIASES = _aliases(
+    (code, [name, *filter(None, other.split(","))]) for code, name, _, other in _table(COUNTRIES)
+)
+# "New York State" and "Washington State" are also found by their short name;
+# the city of the same name comes first
+STATE_ALIASES = _aliases(
+    (code, [name, name.removesuffix(" State")]) for code, name, _ in _table(US_STATES)
+)
+
+
+def _lookup(words: list, whole: bool):
+    """(kind, value) of the first gazetteer entry in words, longest run first."""
+    tables = (("city", CITY_ALIASES), ("country", COUNTRY_ALIASES), ("state", STATE_ALIASES))
+    for n in range(min(len(words), 4), 0, -1):
+        for i in range(len(words) - n + 1):
+            phrase = " ".join(words[i : i + n])
+            if n == 1 and not whole and len(phrase) < MIN_WORD_LENGTH:
+                continue
+            for kind, aliases in tables:
+                if phrase in aliases:
+                    return kind, aliases[phrase]
+    return None
+
+
+def normalize_location(text: str) -> dict:
+    """{"city", "country", "tz"} of a free-text location ("" where unknown).
+
+    city is the gazetteer name ("Munich"), country the ISO code ("DE").
+    """
+    found = {}
+    for i, part in enumerate(PART_RE.split(text or "")):
+        part = part.strip()
+        words = WORD_RE.findall(fold(part))
+        if not words:
+            continue
+        # Two uppercase letters after a comma are a country or US state code:
+        # "Berlin, DE", "Austin, TX"; the city decides for codes that are both
+        is_code = part in COUNTRY_INFO or part in STATE_INFO
+        if i > 0 and len(part) == 2 and part.isupper() and is_code:
+            city_country = CITY_INFO[found["city"]][0] if "city" in found else None
+            if part in COUNTRY_INFO and (part == city_country or part not in STATE_INFO):
+                match = ("country", part)
+            else:
+                match = ("state", part)
+        else:
+            match = _lookup(words, whole=len(words) == 1)
+        if match:
+            found.setdefault(match[0], match[1])
+
+    city, country, state = found.get("city"), found.get("country"), found.get("state")
+    if state and not country:
+        country = "US"
+    if city and country and CITY_INFO[city][0] != country:
+        city = None  # "Paris, Texas", "London, Ontario"
+    if city and not country:
+        country = CITY_INFO[city][0]
+    if city:
+        tz = CITY_INFO[city][1]
+    elif state and country == "US":
+        tz = STATE_INFO[state][1]
+    elif country:
+        tz = COUNTRY_INFO[country][1]
+    else:
+        tz = ""
+    return {"city": city or "", "country": country or "", "tz": tz}
+
+
+def load_cache(path: str = DEFAULT_CACHE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(cache: dict, path: str = DEFAULT_CACHE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def normalize_locations(values, cache: dict = None):
+    """DataFrame of city, country and tz for a column of locations.
+
+    Each distinct location is normalized once and added to cache.
+    """
+    import pandas as pd
+
+    if cache is None:
+        cache = {}
+    values = pd.Series(values, dtype=object).fillna("")
+    codes, uniques = pd.factorize(values)
+    for location in uniques:
+        if location not in cache:
+            cache[location] = normalize_location(location)
+    # Codes index the distinct locations, so the lookups are array takes
+    normalized = pd.DataFrame(
+        [cache[location] for location in uniques], columns=["city", "country", "tz"]
+    )
+    return normalized.take(codes).set_axis(values.index)
+
+
+def resolve_city(text: str) -> str:
+    """Gazetteer name of a city spelling, or "" ("muenchen" -> "Munich")."""
+    return CITY_ALIASES.get(_key(text), "")
+
+
+def resolve_country(text: str) -> str:
+    """ISO code of a country spelling or code, or "" ("Deutschland" -> "DE")."""
+    key = _key(text)
+    if key.upper() in COUNTRY_INFO:
+        return key.upper()
+    return COUNTRY_ALIASES.get(key, "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalize free-text GitHub locations.")
+    parser.add_argument("locations", nargs="*", help="Locations to normalize")
+    parser.add_argument("--csv", help="Lead CSV: print its most common normalized locations")
+    parser.add_argument("--top", type=int, default=30, help="Rows to print with --csv")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Normalized locations cache")
+    args = parser.parse_args(argv)
+
+    cache = load_cache(args.cache)
+    for location in args.locations:
+        print(f"{location!r}: {cache.get(location) or normalize_location(location)}")
+    if args.csv:
+        import pandas as pd
+
+        locations = pd.read_csv(args.csv, usecols=["Location"])["Location"]
+        normalized = normalize_locations(locations, cache)
+        save_cache(cache, args.cache)
+        known = normalized["country"] != ""
+        print(f"{known.sum()}/{len(normalized)} leads with a known country")
+        counts = normalized[known].value_counts(["country", "city"]).head(args.top)
+        print(counts.to_string())
+
+
+if __name__ == "__main__":
+    main()
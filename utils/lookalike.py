@@ -0,0 +1,401 @@
+# "Leads like my best leads": nearest neighbors of a seed set of leads.
+#
+# Every lead (one per login, from the leads.py store or a lead CSV) becomes a
+# sparse TF-IDF vector of two blocks: the words and word pairs of Bio and
+# Company plus the normalized city/country, and the repos the lead starred.
+# Features are hashed into a fixed 2**20 space, so no vocabulary is kept and
+# new leads never change the layout. The blocks are normalized separately and
+# weighted, so the cosine is (1 - REPO_WEIGHT) * text + REPO_WEIGHT * repos.
+#
+# For the approximate search each vector is also projected to DIM dense
+# dimensions (a sparse random projection) and the leads are clustered with
+# spherical k-means into inverted lists (IVF). A query is the mean of the
+# seeds: only the leads in the lists nearest to it are scored, with the exact
+# sparse cosine. Upserts vectorize only new and changed leads with the stored
+# document frequencies and append them to their nearest list; the lists are
+# retrained when the index has doubled since the last training, or with
+# `index --rebuild`.
+#
+# Usage:
+#   python utils/lookalike.py index
+#   python utils/lookalike.py similar jane-doe john@example.com -k 50
+#   python utils/lookalike.py similar --seeds-csv=emails/booked.csv --output=emails/lookalikes.csv
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from lead_search import tokenize
+from locations import load_cache, normalize_locations, save_cache
+from metrics import count, rows, stage
+
+DEFAULT_INDEX = "emails/lookalike.npz"
+N_FEATURES = 2**20
+DIM = 128
+SEED = 7
+# Share of the similarity that comes from the starred repos
+REPO_WEIGHT = 0.3
+PROFILE_COLUMNS = ["Login", "Bio", "Company", "Location", "repos"]
+
+_projection = None
+
+
+def _hash(features: pd.Series) -> np.ndarray:
+    return (pd.util.hash_array(features.to_numpy(dtype=object)) % N_FEATURES).astype(np.int32)
+
+
+def _block(rows_: np.ndarray, features: pd.Series, n: int, idf: np.ndarray = None):
+    """Row-normalized sublinear TF(-IDF) matrix of (row, feature) pairs."""
+    from scipy import sparse
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows_), dtype=np.float32), (rows_, _hash(features))), shape=(n, N_FEATURES)
+    )
+    matrix.sum_duplicates()
+    matrix.data = 1 + np.log(matrix.data)
+    if idf is not None:
+        matrix.data *= idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def profile_features(frame: pd.DataFrame, locations: dict = None):
+    """(text pairs, repo pairs): (row positions, feature strings) of each block."""
+    frame = frame.reset_index(drop=True)
+    text = [tokenize(frame[c]) for c in ("Bio", "Company") if c in frame.columns]
+    words = pd.concat(text) if text else pd.Series(dtype=object)
+    # Word pairs within a field keep "web automation" apart from "web" + "automation"
+    pairs = []
+    for tokens in text:
+        same_row = tokens.index[1:] == tokens.index[:-1]
+        joined = tokens.iloc[:-1].to_numpy()[same_row] + " " + tokens.iloc[1:].to_numpy()[same_row]
+        pairs.append(pd.Series(joined, index=tokens.index[:-1][same_row], dtype=object))
+    features = [words, *pairs]
+    if "Location" in frame.columns:
+        normalized = normalize_locations(frame["Location"], locations).reset_index(drop=True)
+        for column in ("city", "country"):
+            values = normalized[column]
+            features.append(("loc:" + values[values != ""]).astype(object))
+    text_pairs = pd.concat(features)
+
+    repo_pairs = pd.Series(dtype=object)
+    if "repos" in frame.columns:
+        repo_pairs = frame["repos"].fillna("").astype(object).str.split(";").explode()
+        repo_pairs = "repo:" + repo_pairs[repo_pairs.astype(bool)]
+    return (
+        (text_pairs.index.to_numpy(dtype=np.int64), text_pairs),
+        (repo_pairs.index.to_numpy(dtype=np.int64), repo_pairs),
+    )
+
+
+def projection():
+    """Sparse random projection of the hashed features to DIM dimensions."""
+    global _projection
+    if _projection is None:
+        from scipy import sparse
+
+        # Three +-1 entries per feature (Achlioptas); the same for every run
+        rng = np.random.default_rng(SEED)
+        nonzeros = 3
+        cols = rng.integers(0, DIM, (N_FEATURES, nonzeros)).ravel()
+        signs = rng.choice(np.array([-1, 1], dtype=np.float32), N_FEATURES * nonzeros)
+        rows_ = np.repeat(np.arange(N_FEATURES), nonzeros)
+        _projection = sparse.csr_matrix(
+            (signs / np.sqrt(nonzeros), (rows_, cols)), shape=(N_FEATURES, DIM)
+        )
+    return _projection
+
+
+def _normalize(dense: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return dense / norms
+
+
+class LookalikeIndex:
+    """Sparse TF-IDF vectors, dense projections and IVF lists of the leads."""
+
+    def __init__(
+        self, keys=None, hashes=None, vectors=None, dense=None, centroids=None, lists=None,
+        df=None, trained=0,
+    ):
+        from scipy import sparse
+
+        self.keys = list(keys if keys is not None else [])
+        self.key_rows = {key: i for i, key in enumerate(self.keys)}
+        self.hashes = hashes if hashes is not None else np.zeros(0, dtype=np.uint64)
+        if vectors is None:
+            vectors = sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        self.vectors = vectors
+        self.dense = dense if dense is not None else np.zeros((0, DIM), dtype=np.float16)
+        self.centroids = centroids if centroids is not None else np.zeros((0, DIM), np.float32)
+        self.lists = lists if lists is not None else np.zeros(0, dtype=np.int32)
+        # Documents per hashed feature, for the IDF of new leads
+        self.df = df if df is not None else np.zeros(N_FEATURES, dtype=np.int32)
+        self.trained = trained
+        self._order()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _order(self):
+        self.order = np.argsort(self.lists, kind="stable")
+        self.offsets = np.searchsorted(
+            self.lists[self.order], np.arange(len(self.centroids) + 1)
+        )
+
+    def idf(self, n_docs: int = None) -> np.ndarray:
+        """Smoothed IDF; n_docs must be the count self.df was taken over."""
+        n_docs = len(self) if n_docs is None else n_docs
+        return (np.log((1 + n_docs) / (1 + self.df)) + 1).astype(np.float32)
+
+    # Upserts
+
+    def upsert(self, frame: pd.DataFrame, locations: dict = None) -> dict:
+        """Add new leads and revectorize changed ones (keyed by lowercase Login)."""
+        from scipy import sparse
+
+        frame = frame.dropna(subset=["Login"])
+        frame = frame.assign(key=frame["Login"].str.lower()).drop_duplicates("key", keep="last")
+        columns = [c for c in PROFILE_COLUMNS if c in frame.columns]
+        hashes = pd.util.hash_pandas_object(frame[columns].astype(object), index=False)
+        hashes = hashes.to_numpy()
+        known = np.fromiter((self.key_rows.get(k, -1) for k in frame["key"]), np.int64, len(frame))
+        changed = known >= 0
+        changed[changed] = self.hashes[known[changed]] != hashes[changed]
+        fresh = (known < 0) | changed
+        result = {"new": int((known < 0).sum()), "updated": int(changed.sum())}
+        if not fresh.any():
+            return result
+
+        # Changed leads are dropped and added again at the end
+        stale = known[changed]
+        keep = np.ones(len(self), dtype=bool)
+        keep[stale] = False
+        self.df -= np.bincount(self.vectors[stale].indices, minlength=N_FEATURES).astype(np.int32)
+
+        batch = frame[fresh].reset_index(drop=True)
+        (text_rows, text), (repo_rows, repos) = profile_features(batch, locations)
+        n = len(batch)
+        # Document frequencies count the batch before its own IDF is taken
+        for block_rows, block in ((text_rows, text), (repo_rows, repos)):
+            unique = np.unique(block_rows.astype(np.int64) * N_FEATURES + _hash(block))
+            self.df += np.bincount(unique % N_FEATURES, minlength=N_FEATURES).astype(np.int32)
+        idf = self.idf(len(self) - len(stale) + n)
+        vectors = np.sqrt(1 - REPO_WEIGHT) * _block(text_rows, text, n, idf) + np.sqrt(
+            REPO_WEIGHT
+        ) * _block(repo_rows, repos, n, idf)
+        vectors = sparse.csr_matrix(vectors, dtype=np.float32)
+        dense = _normalize(np.asarray((vectors @ projection()).todense(), dtype=np.float32))
+
+        self.keys = [k for k, kept in zip(self.keys, keep) if kept] + batch["key"].tolist()
+        self.key_rows = {key: i for i, key in enumerate(self.keys)}
+        self.hashes = np.concatenate([self.hashes[keep], hashes[fresh]])
+        self.vectors = sparse.vstack([self.vectors[keep], vectors], format="csr")
+        self.dense = np.vstack([self.dense[keep], dense.astype(np.float16)])
+        if len(self.centroids) and len(self) <= 2 * self.trained:
+            self.lists = np.concatenate([self.lists[keep], self._nearest(dense)])
+            self._order()
+        else:
+            self.train()
+        return result
+
+    def train(self, nlist: int = None, iterations: int = 10):
+        """Spherical k-means over (a sample of) the dense vectors."""
+        from scipy import sparse
+
+        n = len(self)
+        if n == 0:
+            return
+        nlist = nlist or int(np.clip(np.sqrt(n), 1, 1024))
+        rng = np.random.default_rng(SEED)
+        sample = self.dense[rng.permutation(n)[: max(nlist * 40, 20_000)]].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            members = sparse.csr_matrix(
+                (np.ones(len(sample), dtype=np.float32), (labels, np.arange(len(sample)))),
+                shape=(nlist, len(sample)),
+            )
+            sums = members @ sample
+            filled = np.asarray(members.sum(axis=1)).ravel() > 0
+            centroids[filled] = _normalize(sums[filled])
+        self.centroids = centroids
+        self.lists = self._nearest(self.dense)
+        self.trained = n
+        self._order()
+        count("lookalike_trainings")
+
+    def _nearest(self, dense: np.ndarray, chunk: int = 50_000) -> np.ndarray:
+        return np.concatenate(
+            [
+                np.argmax(dense[i : i + chunk].astype(np.float32) @ self.centroids.T, axis=1)
+                for i in range(0, len(dense), chunk)
+            ]
+            or [np.zeros(0, dtype=np.int64)]
+        ).astype(np.int32)
+
+    # Queries
+
+    def rows_of(self, logins) -> np.ndarray:
+        """Row per login (case-insensitive); -1 if not indexed."""
+        return np.fromiter(
+            (self.key_rows.get(str(login).lower(), -1) for login in logins), np.int64
+        )
+
+    def similar(self, seeds, k: int = 50, nprobe: int = 16, exact: bool = False):
+        """(keys, scores) of the k leads most similar to the seed rows.
+
+        The score is the cosine with the mean of the seeds' vectors; with
+        exact every lead is scored instead of the nprobe nearest lists.
+        """
+        seeds = np.unique(np.asarray(seeds, dtype=np.int64))
+        query = np.asarray(self.vectors[seeds].mean(axis=0), dtype=np.float32).ravel()
+        query /= np.linalg.norm(query) or 1
+        if exact or not len(self.centroids):
+            candidates = np.arange(len(self))
+        else:
+            dense_query = _normalize(
+                self.dense[seeds].astype(np.float32).mean(axis=0, keepdims=True)
+            )[0]
+            probes = np.argsort(-(self.centroids @ dense_query))[:nprobe]
+            candidates = np.concatenate(
+                [self.order[self.offsets[p] : self.offsets[p + 1]] for p in probes]
+            )
+        candidates = np.setdiff1d(candidates, seeds)
+        scores = self.vectors[candidates] @ query
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [self.keys[i] for i in candidates[top]], scores[top]
+
+    # Persistence
+
+    def save(self, path: str = DEFAULT_INDEX):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            keys=np.array(self.keys, dtype=str),
+            hashes=self.hashes,
+            indptr=self.vectors.indptr,
+            indices=self.vectors.indices,
+            data=self.vectors.data,
+            dense=self.dense,
+            centroids=self.centroids,
+            lists=self.lists,
+            df=self.df,
+            trained=np.array(self.trained),
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX):
+        from scipy import sparse
+
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            vectors = sparse.csr_matrix(
+                (data["data"], data["indices"], data["indptr"]),
+                shape=(len(data["keys"]), N_FEATURES),
+            )
+            return cls(
+                keys=data["keys"].tolist(),
+                hashes=data["hashes"],
+                vectors=vectors,
+                dense=data["dense"],
+                centroids=data["centroids"],
+                lists=data["lists"],
+                df=data["df"],
+                trained=int(data["trained"]),
+            )
+
+
+def read_profiles(store_path: str = None, csv_path: str = None) -> pd.DataFrame:
+    """Leads with Login, Email, Name and PROFILE_COLUMNS from a CSV or the store."""
+    if csv_path:
+        from lead_schema import read_leads
+
+        return read_leads(csv_path)
+    from leads import DEFAULT_STORE, LeadStore
+
+    return LeadStore.load(store_path or DEFAULT_STORE).to_frame()
+
+
+def _seed_logins(seeds: list, profiles: pd.DataFrame, seeds_csv: str = None) -> list:
+    """Logins of the seeds; emails are looked up in profiles."""
+    if seeds_csv:
+        seed_frame = pd.read_csv(seeds_csv)
+        column = "Login" if "Login" in seed_frame.columns else "Email"
+        seeds = seeds + seed_frame[column].dropna().astype(str).tolist()
+    emails = [s.lower() for s in seeds if "@" in s]
+    logins = [s for s in seeds if "@" not in s]
+    if emails and "Email" in profiles.columns:
+        matched = profiles[profiles["Email"].astype(object).str.lower().isin(emails)]
+        logins += matched["Login"].astype(str).tolist()
+    return logins
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leads most similar to a seed set.")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index file")
+    parser.add_argument("--store", help="leads.py store (default: emails/leads.npz)")
+    parser.add_argument("--csv", help="Lead CSV instead of the store, e.g. emails/all.csv")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("index", help="Add new and changed leads to the index")
+    build.add_argument("--rebuild", action="store_true", help="Start from an empty index")
+
+    similar = sub.add_parser("similar", help="Leads most similar to the seeds")
+    similar.add_argument("seeds", nargs="*", help="Logins or emails of good leads")
+    similar.add_argument("--seeds-csv", help="CSV with a Login or Email column")
+    similar.add_argument("-k", type=int, default=50, help="Leads to return")
+    similar.add_argument("--nprobe", type=int, default=16, help="Inverted lists to scan")
+    similar.add_argument("--exact", action="store_true", help="Score every lead")
+    similar.add_argument("--output", help="Write the similar leads to this CSV")
+    args = parser.parse_args(argv)
+
+    profiles = read_profiles(args.store, args.csv)
+    if args.command == "index":
+        index = LookalikeIndex() if args.rebuild else LookalikeIndex.load(args.index)
+        locations = load_cache()
+        with stage("index", rows_in=len(profiles)):
+            result = index.upsert(profiles, locations)
+            rows(rows_out=result["new"] + result["updated"])
+        save_cache(locations)
+        index.save(args.index)
+        print(
+            f"{len(index)} leads in {args.index} ({result['new']} new,"
+            f" {result['updated']} updated, {len(index.centroids)} lists)"
+        )
+        return
+
+    index = LookalikeIndex.load(args.index)
+    if not len(index):
+        sys.exit(f"No leads in {args.index}; run `index` first")
+    logins = _seed_logins(args.seeds, profiles, args.seeds_csv)
+    seeds = index.rows_of(logins)
+    if not (seeds >= 0).any():
+        sys.exit("None of the seeds is in the index")
+    print(f"{(seeds >= 0).sum()}/{len(logins)} seeds indexed", file=sys.stderr)
+
+    start = time.perf_counter()
+    keys, scores = index.similar(seeds[seeds >= 0], args.k, args.nprobe, args.exact)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{len(keys)} similar leads in {elapsed:.1f} ms", file=sys.stderr)
+
+    matches = pd.DataFrame({"key": keys, "similarity": scores.round(3)})
+    profiles = profiles.assign(key=profiles["Login"].astype(object).str.lower())
+    result = matches.merge(profiles.drop_duplicates("key"), on="key", how="left")
+    result = result.drop(columns="key")
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"Wrote {len(result)} leads to {args.output}", file=sys.stderr)
+    else:
+        shown = ["similarity", "Login", "Email", "Company", "Location", "Bio"]
+        print(result[[c for c in shown if c in result.columns]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# Per-run timings, counters and memory for the pipeline scripts.
+#
+# Scripts wrap their steps in `with stage("name"):` and count events with
+# count("name"); the shared GitHub client counts requests, retries and
+# rate-limit waits on its own. At exit one JSON report per run is written to
+# output/metrics/ at the repo root (wherever the script runs from) and, when
+# STARGAZERS_PROM_DIR is set, a Prometheus textfile for the node exporter's
+# textfile collector.
+#
+# Environment:
+#   STARGAZERS_METRICS_DIR  report folder (default <repo>/output/metrics, "" disables)
+#   STARGAZERS_PROM_DIR     also write <dir>/stargazers_<run>.prom
+#   STARGAZERS_PROFILE      "cprofile" dumps a .prof per stage, "sample" runs
+#                           py-spy against the process for the whole run
+import atexit
+import cProfile
+import datetime
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_METRICS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output", "metrics"
+)
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_name() -> str:
+    """Script name of the run: "pytest" for `python -m pytest`, "python" for -c."""
+    script = sys.argv[0] if sys.argv else ""
+    if not os.path.isfile(script):
+        return "python"
+    name = os.path.splitext(os.path.basename(script))[0]
+    if name == "__main__":
+        name = os.path.basename(os.path.dirname(os.path.abspath(script)))
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name).lstrip("-.") or "python"
+
+
+class Metrics:
+    """Stage timers and counters of one run."""
+
+    def __init__(self, run: str = None, profile: str = None):
+        self.run = run or _run_name()
+        self.profile = profile
+        self.started = time.time()
+        self.stages = []
+        self.counters = Counter()
+        self._local = threading.local()
+        self._sampler = None
+        if profile == "sample":
+            self._start_sampler()
+
+    @property
+    def _active(self) -> list:
+        # Stages nest per thread; parallel stages are siblings
+        if not hasattr(self._local, "stages"):
+            self._local.stages = []
+        return self._local.stages
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """Time a block; nested stages are recorded as parent/child."""
+        record = {
+            "stage": "/".join([s["stage"] for s in self._active] + [name]),
+            "rows_in": rows_in,
+            "rows_out": None,
+            "counters": Counter(),
+        }
+        self._active.append(record)
+        # cProfile can't nest, so only top-level stages on the main thread
+        # get a profile
+        top_level = len(self._active) == 1 and threading.current_thread() is threading.main_thread()
+        profiler = cProfile.Profile() if self.profile == "cprofile" and top_level else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record["seconds"] = round(time.perf_counter() - wall, 4)
+            record["cpu_seconds"] = round(time.process_time() - cpu, 4)
+            record["peak_rss_bytes"] = peak_rss()
+            self._active.pop()
+            self.stages.append(record)
+            if profiler is not None:
+                record["profile"] = self._dump_profile(profiler, record["stage"])
+
+    def count(self, name: str, n=1):
+        """Add n to a counter of the run and of every active stage."""
+        self.counters[name] += n
+        for record in self._active:
+            record["counters"][name] += n
+
+    def rows(self, rows_in: int = None, rows_out: int = None):
+        """Row counts of the innermost active stage."""
+        if not self._active:
+            return
+        record = self._active[-1]
+        if rows_in is not None:
+            record["rows_in"] = int(rows_in)
+        if rows_out is not None:
+            record["rows_out"] = int(rows_out)
+
+    def report(self) -> dict:
+        return {
+            "run": self.run,
+            "argv": sys.argv[1:],
+            "started": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "seconds": round(time.time() - self.started, 3),
+            "peak_rss_bytes": peak_rss(),
+            "counters": _rounded(self.counters),
+            "stages": [dict(s, counters=_rounded(s["counters"])) for s in self.stages],
+        }
+
+    # Output
+
+    def _base_path(self, directory: str) -> str:
+        stamp = datetime.datetime.fromtimestamp(self.started).strftime("%Y%m%dT%H%M%S")
+        return os.path.join(directory, f"{self.run}-{stamp}-{os.getpid()}")
+
+    def write(self, directory: str = None) -> str:
+        """Write the JSON report; returns its path."""
+        directory = directory or os.getenv("STARGAZERS_METRICS_DIR", DEFAULT_METRICS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = self._base_path(directory) + ".json"
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def write_prometheus(self, directory: str) -> str:
+        """Write a node exporter textfile, replaced atomically."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"stargazers_{self.run}.prom")
+        tmp = f"{path}.{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+        return path
+
+    def prometheus(self) -> str:
+        report = self.report()
+        run = _label(self.run)
+        lines = [
+            "# HELP stargazers_run_seconds Wall time of the last run.",
+            "# TYPE stargazers_run_seconds gauge",
+            f'stargazers_run_seconds{{run="{run}"}} {report["seconds"]}',
+            "# HELP stargazers_run_timestamp_seconds Start of the last run.",
+            "# TYPE stargazers_run_timestamp_seconds gauge",
+            f'stargazers_run_timestamp_seconds{{run="{run}"}} {self.started:.0f}',
+            "# HELP stargazers_peak_rss_bytes Peak resident memory of the last run.",
+            "# TYPE stargazers_peak_rss_bytes gauge",
+            f'stargazers_peak_rss_bytes{{run="{run}"}} {report["peak_rss_bytes"]}',
+            "# HELP stargazers_events Events counted during the last run.",
+            "# TYPE stargazers_events gauge",
+        ]
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f'stargazers_events{{run="{run}",name="{_label(name)}"}} {value}')
+        lines += [
+            "# HELP stargazers_stage_seconds Wall time per stage of the last run.",
+            "# TYPE stargazers_stage_seconds gauge",
+        ]
+        for s in report["stages"]:
+            lines.append(
+                f'stargazers_stage_seconds{{run="{run}",stage="{_label(s["stage"])}"}} {s["seconds"]}'
+            )
+        lines += [
+            "# HELP stargazers_stage_rows Rows in and out per stage of the last run.",
+            "# TYPE stargazers_stage_rows gauge",
+        ]
+        for s in report["stages"]:
+            for direction in ("in", "out"):
+                if s[f"rows_{direction}"] is not None:
+                    lines.append(
+                        f'stargazers_stage_rows{{run="{run}",stage="{_label(s["stage"])}",'
+                        f'direction="{direction}"}} {s[f"rows_{direction}"]}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    # Profiling
+
+    def _dump_profile(self, profiler, stage: str) -> str:
+        directory = os.getenv("STARGAZERS_METRICS_DIR", DEFAULT_METRICS_DIR) or "."
+        os.makedirs(directory, exist_ok=True)
+        path = f"{self._base_path(directory)}-{re.sub(r'[^A-Za-z0-9_-]', '_', stage)}.prof"
+        profiler.dump_stats(path)
+        return path
+
+    def _start_sampler(self):
+        py_spy = shutil.which("py-spy")
+        if py_spy is None:
+            print("STARGAZERS_PROFILE=sample needs py-spy on PATH; not sampling", file=sys.stderr)
+            return
+        directory = os.getenv("STARGAZERS_METRICS_DIR", DEFAULT_METRICS_DIR) or "."
+        os.makedirs(directory, exist_ok=True)
+        self.sample_file = self._base_path(directory) + ".svg"
+        self._sampler = subprocess.Popen(
+            [py_spy, "record", "--pid", str(os.getpid()), "--output", self.sample_file],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def close(self):
+        """Stop the sampler and write the reports configured by the environment."""
+        if self._sampler is not None:
+            self._sampler.terminate()
+            self._sampler.wait()
+            self._sampler = None
+        if not (self.stages or self.counters):
+            return
+        if os.getenv("STARGAZERS_METRICS_DIR", DEFAULT_METRICS_DIR):
+            self.write()
+        if os.getenv("STARGAZERS_PROM_DIR"):
+            self.write_prometheus(os.environ["STARGAZERS_PROM_DIR"])
+
+
+def _rounded(counters: Counter) -> dict:
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in counters.items()}
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+_metrics = None
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics, reported when the process exits."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics(profile=os.getenv("STARGAZERS_PROFILE") or None)
+        atexit.register(_metrics.close)
+    return _metrics
+
+
+def stage(name: str, rows_in: int = None):
+    return get_metrics().stage(name, rows_in)
+
+
+def count(name: str, n=1):
+    get_metrics().count(name, n)
+
+
+def rows(rows_in: int = None, rows_out: int = None):
+    get_metrics().rows(rows_in, rows_out)
+
+
+if __name__ == "__main__":
+    # Summarize a report: python utils/metrics.py output/metrics/<run>.json
+    with open(sys.argv[1]) as f:
+        report = json.load(f)
+    print(f"{report['run']} {report['started']}: {report['seconds']}s,"
+          f" peak RSS {report['peak_rss_bytes'] / 2**20:.0f} MiB")
+    for s in report["stages"]:
+        rows_in = "-" if s["rows_in"] is None else s["rows_in"]
+        rows_out = "-" if s["rows_out"] is None else s["rows_out"]
+        print(f"  {s['stage']:<30}{s['seconds']:>9.3f}s  rows {rows_in} -> {rows_out}")
+    for name, value in sorted(report["counters"].items()):
+        print(f"  {name:<30}{value:>10}")
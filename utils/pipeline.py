@@ -0,0 +1,406 @@
+# End-to-end outreach pipeline as a DAG of stages.
+#
+# Replaces running competition_scraping.py, ./stargazers analyze,
+# create_data.py and create_personlized_message.py by hand. Every stage
+# declares the files it reads and writes; edges follow from outputs feeding
+# inputs. A stage is skipped when all its outputs are newer than its inputs
+# and its definition has not changed since the last run (fetches also expire
+# after --max-age hours). Ready stages run in
+# parallel, so the per-repo fetch/analyze branches overlap (bounded by the
+# number of GitHub tokens), and the email stages (combine, filter, score) run
+# in-process and hand DataFrames to each other in memory instead of
+# re-reading the CSVs.
+#
+# Usage:
+#   python utils/pipeline.py --repos-csv=repos.csv
+#   python utils/pipeline.py --repos-csv=repos.csv --mode=full --until=filter
+#   python utils/pipeline.py --repos-csv=repos.csv --dry-run
+import argparse
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import stage as metrics_stage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATE_FILE = os.path.join(".delta", "pipeline.json")
+
+
+class Stage:
+    """One step of the pipeline.
+
+    run is called with the Pipeline; it can read and write pipeline.data to
+    pass objects to later stages. inputs may contain glob patterns; outputs
+    are plain paths. limit names a Pipeline concurrency limit the stage
+    counts against (e.g. "github"); outputs older than max_age seconds are
+    stale even when the inputs have not changed.
+    """
+
+    def __init__(
+        self, name, run, inputs=(), outputs=(), after=(), limit=None, max_age=None, signature=""
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.limit = limit
+        self.max_age = max_age
+        # Changing the signature (command line, mode, ...) forces a rerun
+        self.signature = signature
+
+    def input_files(self) -> list:
+        files = []
+        for pattern in self.inputs:
+            if glob.has_magic(pattern):
+                files.extend(sorted(glob.glob(pattern)))
+            elif os.path.exists(pattern):
+                files.append(pattern)
+        return files
+
+    def fingerprint(self) -> str:
+        key = json.dumps([self.signature, self.inputs, self.outputs])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+class Pipeline:
+    def __init__(self, stages, jobs: int = 4, limits=None, state_file: str = DEFAULT_STATE_FILE):
+        self.stages = {s.name: s for s in stages}
+        self.jobs = jobs
+        self.limits = {k: threading.Semaphore(v) for k, v in (limits or {}).items()}
+        self.state_file = state_file
+        self.data = {}
+        self.state = {}
+        if os.path.exists(state_file):
+            with open(state_file, "r") as f:
+                self.state = json.load(f)
+        self.dependencies = self._dependencies()
+
+    def _dependencies(self) -> dict:
+        """Stage name -> names of stages whose outputs it reads."""
+        producers = [(out, s.name) for s in self.stages.values() for out in s.outputs]
+        deps = {}
+        for s in self.stages.values():
+            needed = set(s.after)
+            for pattern in s.inputs:
+                for output, producer in producers:
+                    if producer != s.name and fnmatch.fnmatch(output, pattern):
+                        needed.add(producer)
+            deps[s.name] = needed
+        return deps
+
+    def upstream(self, targets) -> set:
+        """Targets plus everything they depend on."""
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.dependencies[name])
+        return selected
+
+    def up_to_date(self, s: Stage) -> bool:
+        if not s.outputs or self.state.get(s.name) != s.fingerprint():
+            return False
+        if not all(os.path.exists(out) for out in s.outputs):
+            return False
+        oldest_output = min(os.path.getmtime(out) for out in s.outputs)
+        if s.max_age is not None and time.time() - oldest_output > s.max_age:
+            return False
+        inputs = s.input_files()
+        if not inputs:
+            return True
+        return max(os.path.getmtime(i) for i in inputs) <= oldest_output
+
+    def run(self, targets=None, force: bool = False, dry_run: bool = False) -> dict:
+        """Run the stages needed for targets; returns stage name -> status."""
+        selected = self.upstream(targets or list(self.stages))
+        pending = {n: set(self.dependencies[n]) & selected for n in selected}
+        status = {}
+        # A stage reruns when it is stale or anything upstream reran
+        reran = set()
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            running = {}
+            while pending or running:
+                ready = [n for n, deps in pending.items() if not deps]
+                for name in sorted(ready):
+                    del pending[name]
+                    s = self.stages[name]
+                    failed = [d for d in self.dependencies[name] if status.get(d) == "failed"]
+                    if failed:
+                        status[name] = "failed"
+                        print(f"[{name}] not run: {', '.join(sorted(failed))} failed")
+                        self._done(name, pending)
+                        continue
+                    stale = force or not self.up_to_date(s) or (self.dependencies[name] & reran)
+                    if not stale:
+                        status[name] = "up to date"
+                        print(f"[{name}] up to date")
+                        self._done(name, pending)
+                        continue
+                    if dry_run:
+                        status[name] = "would run"
+                        reran.add(name)
+                        print(f"[{name}] would run")
+                        self._done(name, pending)
+                        continue
+                    running[executor.submit(self._run_stage, s)] = name
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        status[name] = "failed"
+                        print(f"[{name}] failed: {e}")
+                    else:
+                        status[name] = "ran"
+                        reran.add(name)
+                        self.state[name] = self.stages[name].fingerprint()
+                        self._save_state()
+                    self._done(name, pending)
+        return status
+
+    def _run_stage(self, s: Stage):
+        limit = self.limits.get(s.limit)
+        if limit is not None:
+            limit.acquire()
+        try:
+            print(f"[{s.name}] running")
+            for out in s.outputs:
+                os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+            with metrics_stage(s.name):
+                s.run(self)
+        finally:
+            if limit is not None:
+                limit.release()
+
+    @staticmethod
+    def _done(name: str, pending: dict):
+        for deps in pending.values():
+            deps.discard(name)
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = self.state_file + f".{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+
+# The outreach pipeline
+
+
+def _command(cmd, **kwargs):
+    def run(pipeline):
+        subprocess.run(cmd, check=True, **kwargs)
+
+    return run
+
+
+def _fetch(repo: str, mode: str, pool):
+    def run(pipeline):
+        from cache_archive import has_archive, unpack
+
+        # The Go fetcher reads loose files only; packed entries would be refetched
+        repo_dir = os.path.join("stargazer_cache", repo)
+        if has_archive(repo_dir):
+            unpack(repo_dir)
+        with pool.lease("core") as token:
+            cmd = ["./stargazers", "fetch", f"--repo={repo}", f"--token={token}"]
+            cmd += ["--cache=./stargazer_cache", f"--mode={mode}"]
+            subprocess.run(cmd, check=True)
+
+    return run
+
+
+def _collect(source: str, target: str):
+    # The Go fetcher writes emails/, create_data reads email_reachout/
+    def run(pipeline):
+        shutil.copyfile(source, target)
+
+    return run
+
+
+def _combine(full: bool):
+    def run(pipeline):
+        sys.path.insert(0, os.path.join(ROOT, "emails"))
+        from create_data import combine_csv_files
+        from delta import DeltaTracker
+
+        tracker = DeltaTracker("create_data")
+        if full:
+            tracker.reset()
+        pipeline.data["combined"] = combine_csv_files("email_reachout", "emails/all.csv", tracker)
+        pipeline.data["create_data_tracker"] = tracker
+
+    return run
+
+
+def _filter(full: bool):
+    def run(pipeline):
+        sys.path.insert(0, os.path.join(ROOT, "emails"))
+        from create_data import filter_data
+        from lead_schema import read_leads
+        from leads import DEFAULT_STORE, LeadStore
+
+        combined = pipeline.data.get("combined")
+        if combined is None:  # combine was up to date
+            combined = read_leads("emails/all.csv")
+            full_run = True
+        else:
+            full_run = full
+        store = LeadStore() if full_run else LeadStore.load(DEFAULT_STORE)
+        pipeline.data["filtered"] = filter_data(
+            combined, "emails/all_competitors_filtered.csv", not full_run, store
+        )
+        store.save(DEFAULT_STORE)
+        tracker = pipeline.data.get("create_data_tracker")
+        if tracker is not None:
+            tracker.save()
+
+    return run
+
+
+def _score(pipeline):
+    sys.path.insert(0, os.path.join(ROOT, "emails"))
+    from create_personlized_message import make_client, score_new_leads
+    from lead_schema import read_leads
+    from suppression import load_suppression
+
+    leads = pipeline.data.get("filtered")
+    if leads is None:  # filter was up to date
+        leads = read_leads("emails/all_competitors_filtered.csv")
+    pipeline.data["scored"] = score_new_leads(
+        leads, make_client(), suppression=load_suppression()
+    )
+
+
+def build_outreach_pipeline(
+    repos, mode: str = "basic", full: bool = False, pool=None, max_age: float = None
+):
+    """Stages from fetching each repo to scored leads.
+
+    Correlated repos (./stargazers analyze) need the starred lists that only
+    --mode=full fetches, so the analyze stages exist in full mode only.
+    """
+    stages = [
+        Stage(
+            "build",
+            _command(["go", "build"]),
+            inputs=["*.go", "*/*.go"],
+            outputs=["stargazers"],
+        )
+    ]
+    for repo in repos:
+        owner, name = repo.split("/")
+        emails_csv = f"emails/{owner}_{name}_emails.csv"
+        repo_dir = f"stargazer_cache/{repo}"
+        stages.append(
+            Stage(
+                f"fetch:{repo}",
+                _fetch(repo, mode, pool),
+                inputs=["stargazers"],
+                outputs=[f"{repo_dir}/saved_state", emails_csv],
+                limit="github",
+                max_age=max_age,
+                signature=mode,
+            )
+        )
+        if mode == "full":
+            stages.append(
+                Stage(
+                    f"analyze:{repo}",
+                    _command(["./stargazers", "analyze", f"--repo={repo}"]),
+                    inputs=[f"{repo_dir}/saved_state"],
+                    outputs=[f"{repo_dir}/correlated_starred_repos.csv"],
+                )
+            )
+        stages.append(
+            Stage(
+                f"collect:{repo}",
+                _collect(emails_csv, f"email_reachout/{owner}_{name}_emails.csv"),
+                inputs=[emails_csv],
+                outputs=[f"email_reachout/{owner}_{name}_emails.csv"],
+            )
+        )
+    stages += [
+        Stage(
+            "combine",
+            _combine(full),
+            inputs=["email_reachout/*_emails.csv"],
+            outputs=["emails/all.csv"],
+            signature=str(full),
+        ),
+        Stage(
+            "filter",
+            _filter(full),
+            inputs=["emails/all.csv"],
+            outputs=["emails/all_competitors_filtered.csv", "emails/leads.npz"],
+        ),
+        Stage(
+            "score",
+            _score,
+            # New suppressions drop leads from the scored output
+            inputs=["emails/all_competitors_filtered.csv", "emails/suppression.sqlite"],
+            outputs=["emails/all_competitors_with_intros.csv"],
+        ),
+    ]
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the outreach pipeline.")
+    parser.add_argument("--repos-csv", required=True, help='CSV with a "Repository" column')
+    parser.add_argument("--token", action="append", default=[], help="GitHub token (repeatable)")
+    parser.add_argument("--mode", default="basic", choices=["basic", "full"], help="Fetch mode")
+    parser.add_argument("--jobs", type=int, default=4, help="Stages run in parallel")
+    parser.add_argument(
+        "--max-age", type=float, default=24, help="Refetch repos older than this many hours"
+    )
+    parser.add_argument("--until", action="append", help="Only run up to these stages")
+    parser.add_argument("--force", action="store_true", help="Rerun every selected stage")
+    parser.add_argument("--full", action="store_true", help="Reprocess all rows, not the delta")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would run")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from github_client import TokenPool, tokens_from_env
+
+    tokens = list(dict.fromkeys(args.token + tokens_from_env()))
+    pool = TokenPool(tokens)
+    repos = pd.read_csv(args.repos_csv)["Repository"].dropna().tolist()
+
+    stages = build_outreach_pipeline(
+        repos, mode=args.mode, full=args.full, pool=pool, max_age=args.max_age * 3600
+    )
+    # One fetch per token at a time; each fetch leases its own token
+    pipeline = Pipeline(stages, jobs=args.jobs, limits={"github": max(len(tokens), 1)})
+    unknown = set(args.until or []) - set(pipeline.stages)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    status = pipeline.run(args.until, force=args.force, dry_run=args.dry_run)
+    failed = [name for name, s in status.items() if s == "failed"]
+    print(f"\n{len(status) - len(failed)}/{len(status)} stages ok")
+    if failed:
+        sys.exit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
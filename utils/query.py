@@ -0,0 +1,254 @@
+# SQL over every CSV and Parquet file in stargazer_cache/ and email_reachout/.
+#
+# Files are registered as tables by name, one table across all repos with a
+# `repo` column ("owner/repo"):
+#   stargazer_cache/<owner>/<repo>/committers.csv    -> committers
+#   stargazer_cache/<owner>/<repo>/followers.csv     -> followers
+#   email_reachout/<owner>_<repo>_emails.csv         -> emails
+#   anything else, e.g. stargazer_cache/x/report.parquet -> report
+#
+# With duckdb installed the tables are views over the files themselves:
+# queries scan them in parallel, out of core, reading only the columns and
+# (for Parquet) row groups they need. Without it the files are streamed into
+# an SQLite cache (.delta/query.sqlite) once and only reloaded when they
+# change; the same SQL works on both for the usual SELECT/JOIN/GROUP BY.
+#
+# Usage:
+#   python utils/query.py --tables
+#   python utils/query.py "SELECT repo, count(*) AS leads, count(Email) AS with_email FROM emails GROUP BY repo"
+#   python utils/query.py "SELECT repo, Login, Email FROM committers WHERE Email IS NOT NULL"
+#   python utils/query.py --format=csv --output=big.csv "SELECT * FROM followers WHERE Followers > 1000"
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from metrics import rows, stage
+
+DEFAULT_ROOTS = ("stargazer_cache", "email_reachout")
+DEFAULT_SQLITE = os.path.join(".delta", "query.sqlite")
+EXTENSIONS = (".csv", ".parquet")
+EMAILS_RE = re.compile(r"^(?P<owner>[^_]+)_(?P<repo>.+)_emails$")
+CHUNK_ROWS = 100_000
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _table_name(stem: str) -> str:
+    return re.sub(r"\W+", "_", stem).strip("_").lower() or "data"
+
+
+def discover(roots=DEFAULT_ROOTS) -> dict:
+    """Table name -> [(path, repo or None), ...] for the data files under roots."""
+    tables = {}
+    for root in roots:
+        for directory, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                stem, ext = os.path.splitext(filename)
+                if ext not in EXTENSIONS:
+                    continue
+                path = os.path.join(directory, filename)
+                parts = os.path.relpath(path, root).split(os.sep)
+                emails = EMAILS_RE.match(stem)
+                if emails:
+                    table, repo = "emails", f"{emails['owner']}/{emails['repo']}"
+                elif len(parts) == 3:  # <owner>/<repo>/<file>
+                    table, repo = _table_name(stem), f"{parts[0]}/{parts[1]}"
+                else:
+                    table, repo = _table_name(stem), None
+                tables.setdefault(table, []).append((path, repo))
+    return tables
+
+
+class DuckDBCatalog:
+    """Views over the files; duckdb does the scanning and parallelism."""
+
+    engine = "duckdb"
+
+    def __init__(self, tables: dict, threads: int = None):
+        import duckdb
+
+        self.tables = tables
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        for name, files in tables.items():
+            self.con.execute(f'CREATE VIEW "{name}" AS {self._scan(files)}')
+
+    @staticmethod
+    def _scan(files: list) -> str:
+        selects = []
+        for ext, reader in ((".csv", "read_csv_auto"), (".parquet", "read_parquet")):
+            paths = [path for path, _ in files if path.endswith(ext)]
+            if not paths:
+                continue
+            listed = ", ".join(_quote(p) for p in paths)
+            select = f"SELECT * FROM {reader}([{listed}], union_by_name = true"
+            if any(repo for _, repo in files):
+                # The repo is taken from the path of the file each row came from
+                repos = " ".join(
+                    f"WHEN {_quote(p)} THEN {_quote(repo)}"
+                    for p, repo in files
+                    if p.endswith(ext) and repo
+                )
+                select = (
+                    f"SELECT * EXCLUDE (filename), CASE filename {repos} END AS repo"
+                    f" FROM {reader}([{listed}], union_by_name = true, filename = true)"
+                )
+            else:
+                select += ")"
+            selects.append(select)
+        return " UNION ALL BY NAME ".join(selects)
+
+    def sql(self, query: str, params=None):
+        return self.con.execute(query, params or []).df()
+
+
+class SQLiteCatalog:
+    """Files streamed into an SQLite cache; reloaded only when they change."""
+
+    engine = "sqlite"
+
+    def __init__(self, tables: dict, path: str = DEFAULT_SQLITE):
+        self.tables = tables
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.con = sqlite3.connect(path)
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS _files"
+            " (path TEXT PRIMARY KEY, tbl TEXT, mtime REAL, size INTEGER)"
+        )
+
+    def _referenced(self, query: str) -> list:
+        words = {w.lower() for w in re.findall(r"\w+", query)}
+        return [name for name in self.tables if name in words]
+
+    def refresh(self, names=None):
+        """Load new and changed files of the given tables (default: all)."""
+        known = {
+            path: (mtime, size)
+            for path, mtime, size in self.con.execute("SELECT path, mtime, size FROM _files")
+        }
+        for name in names or self.tables:
+            files = self.tables[name]
+            current = {path for path, _ in files}
+            for path in [p for p, t in self._files_of(name) if p not in current]:
+                self._drop_file(name, path)
+            for path, repo in files:
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_mtime, stat.st_size):
+                    continue
+                self._drop_file(name, path)
+                self._load_file(name, path, repo)
+                self.con.execute(
+                    "INSERT OR REPLACE INTO _files VALUES (?, ?, ?, ?)",
+                    (path, name, stat.st_mtime, stat.st_size),
+                )
+            self.con.commit()
+
+    def _files_of(self, name: str) -> list:
+        return self.con.execute("SELECT path, tbl FROM _files WHERE tbl = ?", (name,)).fetchall()
+
+    def _columns(self, name: str) -> list:
+        return [row[1] for row in self.con.execute(f'PRAGMA table_info("{name}")')]
+
+    def _drop_file(self, name: str, path: str):
+        if self._columns(name):
+            self.con.execute(f'DELETE FROM "{name}" WHERE _file = ?', (path,))
+        self.con.execute("DELETE FROM _files WHERE path = ?", (path,))
+
+    def _load_file(self, name: str, path: str, repo):
+        import pandas as pd
+
+        if path.endswith(".parquet"):
+            chunks = [pd.read_parquet(path)]
+        else:
+            chunks = pd.read_csv(path, chunksize=CHUNK_ROWS)
+        for chunk in chunks:
+            if repo:
+                chunk = chunk.assign(repo=repo)
+            chunk = chunk.assign(_file=path)
+            # Files of one table may have different columns
+            columns = self._columns(name)
+            for column in chunk.columns:
+                if columns and column not in columns:
+                    self.con.execute(f'ALTER TABLE "{name}" ADD COLUMN "{column}"')
+            chunk.to_sql(name, self.con, if_exists="append", index=False)
+        self.con.execute(f'CREATE INDEX IF NOT EXISTS "{name}__file" ON "{name}" (_file)')
+
+    def sql(self, query: str, params=None):
+        import pandas as pd
+
+        self.refresh(self._referenced(query))
+        df = pd.read_sql_query(query, self.con, params=params)
+        return df.drop(columns=["_file"], errors="ignore")
+
+
+def connect(roots=DEFAULT_ROOTS, engine: str = "auto", threads: int = None):
+    """Catalog over the files under roots; .sql(query) returns a DataFrame.
+
+    engine is "duckdb", "sqlite" or "auto" (duckdb when installed).
+    """
+    tables = discover(roots)
+    if engine == "auto":
+        try:
+            import duckdb  # noqa: F401
+
+            engine = "duckdb"
+        except ImportError:
+            engine = "sqlite"
+    if engine == "duckdb":
+        return DuckDBCatalog(tables, threads)
+    return SQLiteCatalog(tables)
+
+
+def sql(query: str, roots=DEFAULT_ROOTS, engine: str = "auto"):
+    """One-off query: connect(roots, engine).sql(query)."""
+    return connect(roots, engine).sql(query)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQL over the stargazer CSV/Parquet files.")
+    parser.add_argument("query", nargs="?", help="SQL query")
+    parser.add_argument(
+        "--root", action="append", help=f"Folder to register (default: {', '.join(DEFAULT_ROOTS)})"
+    )
+    parser.add_argument("--engine", choices=["auto", "duckdb", "sqlite"], default="auto")
+    parser.add_argument("--threads", type=int, help="duckdb worker threads")
+    parser.add_argument("--tables", action="store_true", help="List the registered tables")
+    parser.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    parser.add_argument("--output", help="Write the result to a file")
+    parser.add_argument("--limit", type=int, default=50, help="Rows to print as a table")
+    args = parser.parse_args(argv)
+
+    catalog = connect(args.root or DEFAULT_ROOTS, args.engine, args.threads)
+    if args.tables or not args.query:
+        for name, files in sorted(catalog.tables.items()):
+            repos = len({repo for _, repo in files if repo})
+            print(f"{name:<36}{len(files):>6} files{repos:>6} repos")
+        return
+
+    start = time.perf_counter()
+    with stage("query"):
+        result = catalog.sql(args.query)
+        rows(rows_out=len(result))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.output or args.format != "table":
+        target = args.output or sys.stdout
+        if args.format == "json":
+            result.to_json(target, orient="records", lines=True)
+        else:
+            result.to_csv(target, index=False)
+    else:
+        print(result.head(args.limit).to_string(index=False))
+        if len(result) > args.limit:
+            print(f"... {len(result) - args.limit} more rows")
+    print(f"{len(result)} rows in {elapsed:.0f} ms ({catalog.engine})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# Topics, language and description of the correlated repos, grouped into tags
+# for visulize_topics.py.
+#
+# Repos are fetched 50 at a time as aliased fields of one GraphQL query (a few
+# queries in parallel) and cached in stargazer_cache/repo_topics.json, so a
+# rerun only fetches repos that are new or older than --max-age. Topics are
+# normalized (case, separators, synonyms) and mapped to tags on whole pandas
+# columns: keyword rules group related topics ("llms", "gpt-4" -> llm), the
+# remaining frequent topics become tags of their own, and repos without topics
+# are tagged from their description. The score comes from get_stars.py's
+# output/repo_analysis.csv.
+#
+# Usage:
+#   python utils/repo_topics.py
+#   python utils/repo_topics.py --analysis=output/repo_analysis.csv --max-tags=40
+#   python utils/repo_topics.py --repo=OWNER/REPO   # no repo_analysis.csv yet
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from metrics import count, rows, stage
+
+DEFAULT_CACHE = "stargazer_cache/repo_topics.json"
+DEFAULT_OUTPUT = "output/repo-tags-all.json"
+BATCH_SIZE = 50
+
+QUERY = (
+    "{alias}: repository(owner: ${owner}, name: ${name}) {{"
+    " description primaryLanguage {{ name }}"
+    " repositoryTopics(first: 20) {{ nodes {{ topic {{ name }} }} }} }}"
+)
+
+# Spellings of the same topic
+TOPIC_ALIASES = {
+    "llms": "llm",
+    "large-language-model": "llm",
+    "large-language-models": "llm",
+    "ai-agent": "ai-agents",
+    "agent": "ai-agents",
+    "agents": "ai-agents",
+    "scraper": "web-scraping",
+    "scraping": "web-scraping",
+    "webscraping": "web-scraping",
+    "web-scraper": "web-scraping",
+    "crawling": "crawler",
+    "web-crawler": "crawler",
+    "ml": "machine-learning",
+    "chatgpt": "openai",
+    "gpt": "openai",
+    "gpt-4": "openai",
+    "js": "javascript",
+    "ts": "typescript",
+}
+
+# tag -> pattern over normalized topics (and descriptions); a topic can match
+# several tags
+TAG_RULES = {
+    "llm": r"\bllm|language-model|\bgpt|openai|chatgpt|claude|gemini|ollama|\bprompt",
+    "agents": r"agent",
+    "scraping": r"scrap|crawl|spider|data-extraction",
+    "browser-automation": r"browser|playwright|puppeteer|selenium|headless",
+    "rag": r"\brag\b|retrieval|vector|embedding",
+    "machine-learning": r"machine-learning|deep-learning|pytorch|tensorflow|neural|\bml\b",
+    "nlp": r"\bnlp\b|natural-language|text-",
+    "automation": r"automation|workflow|\brpa\b",
+}
+
+
+def load_cache(path: str = DEFAULT_CACHE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(cache: dict, path: str = DEFAULT_CACHE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def _fetch_batch(repos: list) -> dict:
+    from github_client import github_graphql_batch
+
+    names = [dict(zip(("owner", "name"), repo.split("/", 1))) for repo in repos]
+    now = time.time()
+    meta = {}
+    for repo, data in zip(repos, github_graphql_batch(QUERY, names)):
+        if data is None:
+            # Deleted or renamed: cached too, so it is not asked for every run
+            meta[repo] = {"topics": [], "language": None, "description": None, "missing": True}
+        else:
+            meta[repo] = {
+                "topics": [n["topic"]["name"] for n in data["repositoryTopics"]["nodes"]],
+                "language": (data.get("primaryLanguage") or {}).get("name"),
+                "description": data.get("description"),
+            }
+        meta[repo]["fetched"] = now
+    return meta
+
+
+def fetch_repo_meta(repos, cache: dict, max_age: float = None, jobs: int = 4) -> dict:
+    """Fill cache with the repos that are missing or older than max_age seconds."""
+    now = time.time()
+    stale = [
+        repo
+        for repo in dict.fromkeys(repos)
+        if repo not in cache or (max_age is not None and now - cache[repo]["fetched"] > max_age)
+    ]
+    count("repo_topics_cache_hits", len(set(repos)) - len(stale))
+    batches = [stale[i : i + BATCH_SIZE] for i in range(0, len(stale), BATCH_SIZE)]
+    print(f"Fetching {len(stale)} of {len(set(repos))} repos in {len(batches)} queries")
+    with stage("fetch", rows_in=len(stale)), ThreadPoolExecutor(jobs) as pool:
+        for i, meta in enumerate(pool.map(_fetch_batch, batches), 1):
+            cache.update(meta)
+            if i % 20 == 0:
+                print(f"  {i}/{len(batches)} queries")
+    return cache
+
+
+def normalize_topics(topics: pd.Series) -> pd.Series:
+    """Lowercase, dash-separated, with synonyms folded together."""
+    normalized = (
+        topics.astype("string")
+        .str.lower()
+        .str.replace(r"[^a-z0-9.+#]+", "-", regex=True)
+        .str.strip("-")
+    )
+    return normalized.replace(TOPIC_ALIASES)
+
+
+def _rule_tags(terms: pd.Series) -> pd.DataFrame:
+    """(term position, tag) for every term matching a TAG_RULES pattern."""
+    matches = np.column_stack(
+        [
+            terms.str.contains(pattern, regex=True).fillna(False).to_numpy()
+            for pattern in TAG_RULES.values()
+        ]
+    )
+    row, rule = np.nonzero(matches)
+    return pd.DataFrame({"row": row, "tag": np.asarray(list(TAG_RULES), dtype=object)[rule]})
+
+
+def tag_repos(meta: pd.DataFrame, min_repos: int = 3, max_tags: int = 30) -> pd.Series:
+    """Repo -> sorted list of tags.
+
+    meta has one row per repo with topics (lists) and description columns.
+    """
+    pairs = meta[["topics"]].explode("topics").dropna()
+    pairs["topic"] = normalize_topics(pairs["topics"])
+    pairs = pairs[pairs["topic"] != ""]
+
+    # Rules run once per distinct topic and are broadcast back to the pairs
+    codes, topics = pd.factorize(pairs["topic"])
+    topics = pd.Series(topics, dtype="string")
+    ruled = _rule_tags(topics)
+    topic_tags = pd.concat(
+        [
+            ruled,
+            # Topics no rule covers stand for themselves
+            pd.DataFrame({"row": np.setdiff1d(np.arange(len(topics)), ruled["row"])}).assign(
+                tag=lambda d: topics.to_numpy()[d["row"]]
+            ),
+        ]
+    )
+    tagged = pd.DataFrame({"repo": pairs.index, "row": codes}).merge(topic_tags, on="row")
+
+    # Repos without topics: the rules over their description
+    untagged = meta.index.difference(tagged["repo"])
+    descriptions = normalize_topics(meta.loc[untagged, "description"].fillna(""))
+    described = _rule_tags(descriptions.reset_index(drop=True))
+    described["repo"] = untagged[described["row"]]
+    tagged = pd.concat([tagged[["repo", "tag"]], described[["repo", "tag"]]]).drop_duplicates()
+
+    # Only tags shared by enough repos, the most common first
+    repos_per_tag = tagged["tag"].value_counts()
+    keep = repos_per_tag[repos_per_tag >= min_repos].index[:max_tags]
+    tagged = tagged[tagged["tag"].isin(keep)].sort_values(["repo", "tag"])
+    repos, starts = np.unique(tagged["repo"].to_numpy(), return_index=True)
+    tags = np.split(tagged["tag"].to_numpy(), starts[1:]) if len(repos) else []
+    return pd.Series([t.tolist() for t in tags], index=repos, dtype=object)
+
+
+def load_scores(analysis: str = None, cache_dir: str = "stargazer_cache", repo: str = None) -> pd.Series:
+    """Repository -> score from get_stars.py.
+
+    With repo, the correlated repos of repo instead (score 0 where the
+    analysis has none).
+    """
+    scores = None
+    if analysis and os.path.exists(analysis):
+        scores = pd.read_csv(analysis).set_index("Repository")["Score"].fillna(0)
+    if repo is None:
+        if scores is None:
+            raise FileNotFoundError(f"{analysis} not found; run get_stars.py or pass --repo")
+        return scores
+    df = pd.read_csv(f"{cache_dir}/{repo}/correlated_starred_repos.csv")
+    repos = df.loc[df["Repository"] != repo, "Repository"].drop_duplicates()
+    if scores is None:
+        return pd.Series(0.0, index=repos.to_numpy())
+    return scores.reindex(repos.to_numpy()).fillna(0.0)
+
+
+def build_repo_tags(scores: pd.Series, cache: dict, min_repos: int = 3, max_tags: int = 30) -> dict:
+    """{"owner/repo": {"tags", "score", "language", "description"}} for tagged repos."""
+    meta = pd.DataFrame.from_dict(
+        {repo: cache[repo] for repo in scores.index if repo in cache}, orient="index"
+    )
+    if meta.empty:
+        return {}
+    tags = tag_repos(meta, min_repos, max_tags)
+    ranked = scores[tags.index].sort_values(ascending=False, kind="stable")
+    return {
+        repo: {
+            "tags": tags[repo],
+            "score": float(score),
+            "language": cache[repo]["language"],
+            "description": cache[repo]["description"],
+        }
+        for repo, score in zip(ranked.index, ranked.to_numpy())
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch repo topics and write repo-tags-all.json.")
+    parser.add_argument(
+        "--analysis", default="output/repo_analysis.csv", help="get_stars.py output with scores"
+    )
+    parser.add_argument("--repo", help="owner/repo whose correlated repos to tag (no scores)")
+    parser.add_argument("--cache-dir", default="stargazer_cache", help="Cache directory")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Topics cache")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Repo tags JSON")
+    parser.add_argument("--top", type=int, help="Only the N best scored repos")
+    parser.add_argument("--max-age", type=float, default=24 * 7, help="Refetch after this many hours")
+    parser.add_argument("--min-repos", type=int, default=3, help="Drop tags on fewer repos")
+    parser.add_argument("--max-tags", type=int, default=30, help="Keep the N most common tags")
+    parser.add_argument("--jobs", type=int, default=4, help="Parallel GraphQL queries")
+    args = parser.parse_args(argv)
+
+    scores = load_scores(args.analysis, args.cache_dir, args.repo)
+    if args.top:
+        scores = scores.sort_values(ascending=False).head(args.top)
+
+    cache = load_cache(args.cache)
+    try:
+        fetch_repo_meta(scores.index, cache, args.max_age * 3600, args.jobs)
+    finally:
+        save_cache(cache, args.cache)
+
+    with stage("tag", rows_in=len(scores)):
+        repo_tags = build_repo_tags(scores, cache, args.min_repos, args.max_tags)
+        rows(rows_out=len(repo_tags))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(repo_tags, f, indent=2)
+    tags = {tag for data in repo_tags.values() for tag in data["tags"]}
+    print(f"Wrote {len(repo_tags)} repos with {len(tags)} tags to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+# Audience estimates for huge repos from a random sample of their stargazers.
+#
+# `fetch --mode=full` crawls every stargazer before correlated_starred_repos.csv
+# exists, which takes days of rate limit for a repo with 100k+ stars. Here the
+# stargazer pages are split into strata by position (GitHub lists stars oldest
+# first, so each stratum is a period of the repo's history), a few pages are
+# drawn at random from every stratum and a subsample of their users is fetched
+# with batched GraphQL: profile, follower count and the last 100 starred repos,
+# like the Go fetcher. Page means give stratified estimates with 95% confidence
+# intervals of the email rate, the follower distribution and how many
+# stargazers also starred each other repo. The defaults fetch about 500
+# profiles per repo in 10 GraphQL queries.
+#
+# The REST API lists at most 400 pages (40k stargazers), so for bigger repos
+# the sample covers the oldest 40k and the estimates assume the rest look
+# alike; the coverage is reported next to them. Strata where no profile
+# could be fetched are left out and count as not covered.
+#
+# Usage:
+#   python utils/sample_audience.py --repo=microsoft/playwright
+#   python utils/sample_audience.py --repos-csv=repos.csv --pages-per-stratum=4 --users-per-page=50
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from metrics import count, rows, stage
+
+PER_PAGE = 100
+MAX_PAGES = 400
+BATCH_SIZE = 50
+Z = 1.96  # 95% confidence
+DEFAULT_OUTPUT = "output/audience_samples.csv"
+
+QUERY = (
+    "{alias}: user(login: ${login}) {{"
+    " login email company location bio followers {{ totalCount }}"
+    " starredRepositories(first: 100, orderBy: {{field: STARRED_AT, direction: DESC}})"
+    " {{ totalCount nodes {{ nameWithOwner }} }} }}"
+)
+
+# Follower count bins, [low, high)
+FOLLOWER_BINS = [0, 10, 100, 1000, np.inf]
+FOLLOWER_LABELS = ["followers_0_9", "followers_10_99", "followers_100_999", "followers_1000_plus"]
+
+
+# Sampling
+
+
+def plan_sample(
+    stargazers: int, strata: int = 10, pages_per_stratum: int = 2, seed: int = 0
+) -> tuple:
+    """(strata, pages) to fetch for a repo with this many stargazers.
+
+    strata has the page range, page count and stargazer count of each
+    stratum; pages the drawn pages and their stratum. Strata are merged until
+    each holds at least pages_per_stratum pages, so every stratum gets a
+    variance estimate.
+    """
+    total_pages = min(math.ceil(stargazers / PER_PAGE), MAX_PAGES)
+    listed = min(stargazers, total_pages * PER_PAGE)
+    strata = max(1, min(strata, total_pages // max(pages_per_stratum, 1)))
+    rng = np.random.default_rng(seed)
+    table, pages = [], []
+    for h, block in enumerate(np.array_split(np.arange(1, total_pages + 1), strata)):
+        if not len(block):
+            continue
+        users = len(block) * PER_PAGE - (total_pages * PER_PAGE - listed if h == strata - 1 else 0)
+        table.append((h, int(block[0]), int(block[-1]), len(block), users))
+        drawn = rng.choice(block, min(pages_per_stratum, len(block)), replace=False)
+        pages.extend((int(page), h) for page in sorted(drawn))
+    strata = pd.DataFrame(table, columns=["stratum", "first_page", "last_page", "pages", "users"])
+    return strata, pd.DataFrame(pages, columns=["page", "stratum"])
+
+
+def repo_stargazers(repo: str, pool=None) -> int:
+    from github_client import API_URL, github_get
+
+    response = github_get(f"{API_URL}/repos/{repo}", pool=pool)
+    response.raise_for_status()
+    return int(response.json()["stargazers_count"])
+
+
+def fetch_page(repo: str, page: int, pool=None) -> list:
+    """Logins on one stargazer page."""
+    from github_client import API_URL, github_get
+
+    response = github_get(
+        f"{API_URL}/repos/{repo}/stargazers",
+        params={"per_page": PER_PAGE, "page": page},
+        headers={"Accept": "application/vnd.github.star+json"},
+        pool=pool,
+    )
+    response.raise_for_status()
+    return [item["user"]["login"] for item in response.json() if item.get("user")]
+
+
+def _fetch_batch(logins: list, pool=None) -> dict:
+    from github_client import github_graphql_batch
+
+    profiles = {}
+    results = github_graphql_batch(QUERY, [{"login": login} for login in logins], pool=pool)
+    for login, data in zip(logins, results):
+        if data is None:
+            # Deleted accounts still show up in stargazer lists
+            profiles[login] = None
+            continue
+        starred = data.get("starredRepositories") or {}
+        profiles[login] = {
+            "email": bool(data.get("email")),
+            "company": bool(data.get("company")),
+            "location": bool(data.get("location")),
+            "bio": bool(data.get("bio")),
+            "followers": (data.get("followers") or {}).get("totalCount", 0),
+            "starred_total": starred.get("totalCount", 0),
+            "starred": [n["nameWithOwner"] for n in starred.get("nodes") or []],
+        }
+    return profiles
+
+
+def fetch_profiles(logins: list, profiles: dict, jobs: int = 4, pool=None) -> dict:
+    """Fill profiles with the logins it does not hold yet."""
+    missing = [login for login in dict.fromkeys(logins) if login not in profiles]
+    count("sample_profile_cache_hits", len(set(logins)) - len(missing))
+    batches = [missing[i : i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+    with ThreadPoolExecutor(jobs) as executor:
+        for batch in executor.map(lambda logins: _fetch_batch(logins, pool), batches):
+            profiles.update(batch)
+    return profiles
+
+
+def draw_sample(
+    repo: str,
+    pages: pd.DataFrame,
+    users_per_page: int = 25,
+    seed: int = 0,
+    jobs: int = 4,
+    pool=None,
+) -> pd.DataFrame:
+    """One row per sampled stargazer: login, page, stratum and users listed on the page."""
+    with ThreadPoolExecutor(jobs) as executor:
+        logins = list(executor.map(lambda page: fetch_page(repo, page, pool), pages["page"]))
+    rng = np.random.default_rng([seed, 1])
+    sample = []
+    for (page, stratum), users in zip(pages.itertuples(index=False), logins):
+        for login in rng.permutation(users)[:users_per_page]:
+            sample.append((str(login), page, stratum, len(users)))
+    return pd.DataFrame(sample, columns=["login", "page", "stratum", "listed"])
+
+
+# Estimation
+
+
+def stratified_estimate(values, sample: pd.DataFrame, strata: pd.DataFrame) -> tuple:
+    """(mean, standard error) per column of values, one row per sampled user.
+
+    Pages are drawn within each stratum and users within each page, so the
+    variance has two stages: the between-page variance with the finite
+    population correction of the pages drawn, plus the within-page variance
+    of the users not fetched (sample["listed"] holds the users on each page,
+    PER_PAGE if missing). Only strata with fetched users are estimated. The
+    error is NaN when a stratum has one page drawn out of several and no
+    other page to borrow a variance from. values may be a scipy sparse matrix.
+    """
+    from scipy import sparse
+
+    page_codes, page_keys = pd.factorize(sample["page"])
+    fetched = np.bincount(page_codes)
+    averaging = sparse.csr_matrix(
+        (1.0 / fetched[page_codes], (page_codes, np.arange(len(sample)))),
+        shape=(len(page_keys), len(sample)),
+    )
+    squares = values.multiply(values) if sparse.issparse(values) else np.square(values)
+    page_means, page_squares = (_dense(averaging @ v) for v in (values, squares))
+    pages = sample.groupby("page")
+    page_strata = pages["stratum"].first().reindex(page_keys).to_numpy()
+    listed = (
+        pages["listed"].first().reindex(page_keys).to_numpy()
+        if "listed" in sample
+        else np.full(len(page_keys), PER_PAGE)
+    )
+
+    # Within-page variance of each page; pages with one fetched user borrow
+    # the average of the others
+    m = fetched[:, None].astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        within = np.maximum(page_squares - page_means**2, 0) * m / (m - 1)
+    single = fetched < 2
+    pooled_within = within[~single].mean(axis=0) if (~single).any() else np.full(m.shape[1], np.nan)
+    within[single] = pooled_within
+    unfetched = (1 - fetched / np.maximum(listed, fetched))[:, None] * within / m
+    pooled = page_means.var(axis=0, ddof=1) if len(page_means) > 1 else np.nan
+
+    strata = strata[strata["stratum"].isin(page_strata)]
+    weights = strata["users"].to_numpy() / strata["users"].sum()
+    mean = np.zeros(page_means.shape[1])
+    variance = np.zeros(page_means.shape[1])
+    for weight, (h, total) in zip(weights, strata[["stratum", "pages"]].itertuples(index=False)):
+        drawn = page_strata == h
+        means = page_means[drawn]
+        n = len(means)
+        mean += weight * means.mean(axis=0)
+        between = 0.0
+        if n < total:
+            # A stratum left with one page borrows the variance of all pages
+            spread = means.var(axis=0, ddof=1) if n > 1 else pooled
+            between = (1 - n / total) * spread / n
+        variance += weight**2 * (between + n / total * unfetched[drawn].sum(axis=0) / n**2)
+    return mean, np.sqrt(variance)
+
+
+def _dense(matrix) -> np.ndarray:
+    from scipy import sparse
+
+    return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, quantiles) -> np.ndarray:
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    cumulative /= cumulative[-1]
+    positions = np.searchsorted(cumulative, quantiles, side="left")
+    return values[order][np.minimum(positions, len(values) - 1)]
+
+
+def _interval(mean, se, scale=1.0, upper=None) -> dict:
+    lower, high = (mean - Z * se) * scale, (mean + Z * se) * scale
+    if upper is not None:
+        high = min(high, upper * scale)
+    return {"estimate": mean * scale, "lower": max(lower, 0.0), "upper": high}
+
+
+def estimate_audience(
+    repo: str, stargazers: int, sample: pd.DataFrame, strata: pd.DataFrame, profiles: dict
+) -> tuple:
+    """(summary dict, correlated repos DataFrame) from the fetched sample."""
+    from scipy import sparse
+
+    sample = sample[sample["login"].map(lambda login: profiles.get(login) is not None)]
+    sample = sample.reset_index(drop=True)
+    if sample.empty:
+        raise ValueError(f"No profiles fetched for {repo}")
+    users = pd.DataFrame([profiles[login] for login in sample["login"]])
+    followers = users["followers"].to_numpy(dtype=np.float64)
+    bins = pd.cut(followers, FOLLOWER_BINS, right=False, labels=FOLLOWER_LABELS)
+    rates = ["email", "company", "location", "bio"]
+    values = np.column_stack(
+        [users[rates].to_numpy(dtype=np.float64)]
+        + [pd.get_dummies(bins).reindex(columns=FOLLOWER_LABELS, fill_value=False).to_numpy(float)]
+        + [followers, users["starred_total"].to_numpy(dtype=np.float64)]
+    )
+    mean, se = stratified_estimate(values, sample, strata)
+    names = [f"{rate}_rate" for rate in rates] + FOLLOWER_LABELS
+    estimates = {name: _interval(m, s, upper=1.0) for name, m, s in zip(names, mean, se)}
+    estimates["mean_followers"] = _interval(mean[-2], se[-2])
+    estimates["mean_starred"] = _interval(mean[-1], se[-1])
+    estimates["emails"] = _interval(mean[0], se[0], scale=stargazers, upper=1.0)
+
+    # Users x repos starred; the share of stargazers per repo scales to a count
+    starred = users["starred"]
+    lengths = starred.str.len().to_numpy()
+    codes, names = pd.factorize(pd.Series([r for repos in starred for r in repos], dtype=object))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(codes)), (np.repeat(np.arange(len(users)), lengths), codes)),
+        shape=(len(users), len(names)),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    share, share_se = stratified_estimate(matrix, sample, strata)
+    correlated = pd.DataFrame(
+        {
+            "Repository": names,
+            "URL": [f"https://github.com/{name}" for name in names],
+            "Count": np.rint(share * stargazers).astype(np.int64),
+            "Lower": np.rint(np.maximum(share - Z * share_se, 0) * stargazers).astype(np.int64),
+            "Upper": np.rint(np.minimum(share + Z * share_se, 1) * stargazers).astype(np.int64),
+            "Share": share,
+            "Sampled": np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64),
+        }
+    )
+    correlated = correlated[correlated["Repository"].str.lower() != repo.lower()]
+    correlated = correlated.sort_values(["Count", "Sampled"], ascending=False, ignore_index=True)
+
+    # Design weight of a user: stratum share / pages drawn / users on the page
+    per_page = sample.groupby("page")["login"].transform("size").to_numpy()
+    pages_drawn = sample.groupby("stratum")["page"].transform("nunique").to_numpy()
+    stratum_users = strata.set_index("stratum")["users"].reindex(sample["stratum"]).to_numpy()
+    weights = stratum_users / pages_drawn / per_page
+    p50, p90, p99 = weighted_quantiles(followers, weights, [0.5, 0.9, 0.99])
+    # Strata without a fetched profile drop out of the estimates, so they do
+    # not count as covered
+    covered = strata[strata["stratum"].isin(sample["stratum"])]
+    listed = int(covered["users"].sum())
+    summary = {
+        "repo": repo,
+        "stargazers": stargazers,
+        "listed": listed,
+        "coverage": listed / stargazers if stargazers else 1.0,
+        "strata": len(covered),
+        "strata_missing": len(strata) - len(covered),
+        "pages": int(sample["page"].nunique()),
+        "profiles": len(sample),
+        "estimates": estimates,
+        "followers_quantiles": {"p50": p50, "p90": p90, "p99": p99},
+    }
+    return summary, correlated
+
+
+# Running
+
+
+def _sample_path(cache_dir: str, repo: str, name: str) -> str:
+    return os.path.join(cache_dir, repo, name)
+
+
+def sample_repo(
+    repo: str,
+    cache_dir: str = "stargazer_cache",
+    strata: int = 10,
+    pages_per_stratum: int = 2,
+    users_per_page: int = 25,
+    seed: int = 0,
+    jobs: int = 4,
+    refresh: bool = False,
+    pool=None,
+) -> dict:
+    """Sample, estimate and write sample_summary.json and sample_correlated_repos.csv.
+
+    Profiles are kept in sample_profiles.json, so a rerun with the same seed
+    only fetches the stargazer pages again. pool is the github_client
+    TokenPool to use, the one from the environment by default.
+    """
+    profiles_path = _sample_path(cache_dir, repo, "sample_profiles.json")
+    profiles = {}
+    if os.path.exists(profiles_path) and not refresh:
+        with open(profiles_path) as f:
+            profiles = json.load(f)
+
+    with stage(f"sample/{repo}"):
+        stargazers = repo_stargazers(repo, pool)
+        strata_table, pages = plan_sample(stargazers, strata, pages_per_stratum, seed)
+        sample = draw_sample(repo, pages, users_per_page, seed, jobs, pool)
+        fetch_profiles(sample["login"].tolist(), profiles, jobs, pool)
+        rows(rows_out=len(sample))
+    count("sample_profiles", len(sample))
+
+    os.makedirs(os.path.dirname(profiles_path), exist_ok=True)
+    tmp = f"{profiles_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(profiles, f)
+    os.replace(tmp, profiles_path)
+
+    with stage(f"estimate/{repo}", rows_in=len(sample)):
+        summary, correlated = estimate_audience(repo, stargazers, sample, strata_table, profiles)
+    summary["seed"] = seed
+    correlated.to_csv(_sample_path(cache_dir, repo, "sample_correlated_repos.csv"), index=False)
+    summary["top_correlated"] = correlated["Repository"].head(10).tolist()
+    with open(_sample_path(cache_dir, repo, "sample_summary.json"), "w") as f:
+        json.dump(summary, f, indent=2, default=float)
+    return summary
+
+
+def triage_row(summary: dict) -> dict:
+    """One line of the triage table."""
+    estimates = summary["estimates"]
+    return {
+        "repo": summary["repo"],
+        "stargazers": summary["stargazers"],
+        "coverage": round(summary["coverage"], 3),
+        "profiles": summary["profiles"],
+        "email_rate": round(estimates["email_rate"]["estimate"], 3),
+        "email_rate_ci": "{lower:.3f}-{upper:.3f}".format(**estimates["email_rate"]),
+        "emails": int(round(estimates["emails"]["estimate"])),
+        "emails_ci": "{lower:.0f}-{upper:.0f}".format(**estimates["emails"]),
+        "median_followers": int(summary["followers_quantiles"]["p50"]),
+        "followers_100_plus": round(
+            estimates["followers_100_999"]["estimate"]
+            + estimates["followers_1000_plus"]["estimate"],
+            3,
+        ),
+        "top_correlated": ";".join(summary["top_correlated"][:5]),
+    }
+
+
+def sample_repos(repos: list, output: str = DEFAULT_OUTPUT, **kwargs) -> pd.DataFrame:
+    """Sample every repo and write the triage table, most reachable emails first."""
+    table = []
+    for repo in repos:
+        print(f"Sampling {repo}...")
+        try:
+            summary = sample_repo(repo, **kwargs)
+        except Exception as e:
+            print(f"Failed to sample {repo}: {e}")
+            count("sample_repos_failed")
+            continue
+        table.append(triage_row(summary))
+    table = pd.DataFrame(table)
+    if not table.empty:
+        table = table.sort_values("emails", ascending=False, ignore_index=True)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    table.to_csv(output, index=False)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Estimate a repo's audience from a stratified sample of its stargazers."
+    )
+    parser.add_argument("--repo", action="append", default=[], help="owner/repo (repeatable)")
+    parser.add_argument("--repos-csv", help="CSV with a Repository column")
+    parser.add_argument("--cache-dir", default="stargazer_cache", help="Cache directory")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Triage table CSV")
+    parser.add_argument("--strata", type=int, default=10, help="Strata of stargazer pages")
+    parser.add_argument(
+        "--pages-per-stratum", type=int, default=2, help="Pages drawn per stratum (at least 2)"
+    )
+    parser.add_argument("--users-per-page", type=int, default=25, help="Profiles per page drawn")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--jobs", type=int, default=4, help="Parallel requests")
+    parser.add_argument("--refresh", action="store_true", help="Refetch cached profiles")
+    args = parser.parse_args(argv)
+
+    repos = list(args.repo)
+    if args.repos_csv:
+        repos += pd.read_csv(args.repos_csv)["Repository"].tolist()
+    if not repos:
+        parser.error("give --repo or --repos-csv")
+    if args.pages_per_stratum < 2:
+        parser.error("--pages-per-stratum must be at least 2 for a variance estimate")
+
+    table = sample_repos(
+        list(dict.fromkeys(repos)),
+        args.output,
+        cache_dir=args.cache_dir,
+        strata=args.strata,
+        pages_per_stratum=args.pages_per_stratum,
+        users_per_page=args.users_per_page,
+        seed=args.seed,
+        jobs=args.jobs,
+        refresh=args.refresh,
+    )
+    if table.empty:
+        raise SystemExit("No repo could be sampled")
+    with pd.option_context("display.width", 200, "display.max_colwidth", 60):
+        print(table.to_string(index=False))
+    print(f"Wrote {len(table)} repos to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import re
+import json
+from pathlib import Path
+
+# The Go fetcher writes two JSON documents into saved_state: the stargazer
+# list followed by the map of repos (see SaveState in fetch/query.go).
+_WHITESPACE = re.compile(r"\s*")
+
+
+def state_path(cache_dir: str, repo: str) -> str:
+    """Path of the saved_state file for owner/repo."""
+    return os.path.join(cache_dir, repo, "saved_state")
+
+
+def list_cached_repos(cache_dir: str = "stargazer_cache") -> list:
+    """List every owner/repo under cache_dir that has a saved_state file."""
+    root = Path(cache_dir)
+    if not root.exists():
+        return []
+    return sorted(
+        f"{p.parent.parent.name}/{p.parent.name}" for p in root.glob("*/*/saved_state")
+    )
+
+
+def load_state(cache_dir: str, repo: str):
+    """Read (stargazers, repos) from the saved_state of owner/repo."""
+    with open(state_path(cache_dir, repo), "r") as f:
+        content = f.read()
+
+    decoder = json.JSONDecoder()
+    stargazers, end = decoder.raw_decode(content)
+    end = _WHITESPACE.match(content, end).end()
+    repos = {}
+    if end < len(content):
+        repos, _ = decoder.raw_decode(content, end)
+
+    # Go encodes nil slices and maps as null
+    return stargazers or [], repos or {}
+
+
+def user_record(stargazer: dict) -> dict:
+    """Flatten the embedded Go User of a stargazer into a profile record."""
+    user = stargazer.get("user") or {}
+    return {
+        "Login": user.get("login", ""),
+        "Email": user.get("email", ""),
+        "Name": user.get("name", ""),
+        "Company": user.get("company", ""),
+        "Location": user.get("location", ""),
+        "Bio": user.get("bio", ""),
+        "Followers": user.get("followers", 0),
+        "Following": user.get("following", 0),
+        "PublicRepos": user.get("public_repos", 0),
+        "CreatedAt": user.get("created_at", ""),
+        "StarredAt": stargazer.get("starred_at", ""),
+    }
@@ -0,0 +1,241 @@
+# Send plan for the scored leads across a pool of sender mailboxes.
+#
+# Replaces splitting all_competitors_with_intros_high.csv into batches by
+# hand. Every mailbox sends at most its daily cap (30 by default, see the
+# README). Leads go out best score first: with C sends per day across all
+# mailboxes, the top C leads fill the first day, the next C the second, and
+# so on, which is the order that gets the most score out in any number of
+# days. Within a day the leads are ordered by the UTC time their local send
+# window opens and dealt to the mailboxes by a weighted round-robin, so every
+# mailbox gets its share of each time zone and its sends are spread over the
+# day instead of going out in one burst. Time zones come from Location via
+# locations.py. Everything after the one-off preparation is array
+# arithmetic, so planning again after adding or removing a mailbox takes
+# milliseconds for tens of thousands of leads.
+#
+# Usage:
+#   python utils/send_plan.py --mailbox=magnus@browser-use.com --mailbox=hi@browser-use.com:20
+#   python utils/send_plan.py --mailboxes=emails/mailboxes.csv --min-score=0.35 --days=10
+import argparse
+import datetime as dt
+import os
+import time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+import pandas as pd
+
+from metrics import rows, stage
+
+DEFAULT_INPUT = "emails/all_competitors_with_intros.csv"
+DEFAULT_OUTPUT_DIR = "emails/send_plan"
+SCORE = "personalized_intro_score"
+DAILY_CAP = 30
+# Local hours the emails should arrive in, [start, end)
+WINDOW = (9, 12)
+GAP_MINUTES = 2
+# Plan files are plan_<mailbox>.csv, so replanning never touches other CSVs
+PLAN_PREFIX = "plan_"
+
+
+def parse_mailboxes(values: list, cap: int = DAILY_CAP) -> dict:
+    """mailbox -> daily cap from "address" or "address:cap" values."""
+    mailboxes = {}
+    for value in values:
+        address, _, limit = value.partition(":")
+        mailboxes[address.strip()] = int(limit) if limit else cap
+    return mailboxes
+
+
+def read_mailboxes(path: str, cap: int = DAILY_CAP) -> dict:
+    """mailbox -> daily cap from a CSV with a mailbox and an optional daily_cap column."""
+    df = pd.read_csv(path, dtype={"mailbox": str})
+    caps = df["daily_cap"].fillna(cap) if "daily_cap" in df.columns else pd.Series(cap, df.index)
+    return dict(zip(df["mailbox"].str.strip(), caps.astype(int)))
+
+
+def send_days(start: dt.date, days: int, weekends: bool = False) -> list:
+    """The next days sending days from start, weekdays only unless weekends."""
+    dates = []
+    day = start
+    while len(dates) < days:
+        if weekends or day.weekday() < 5:
+            dates.append(day)
+        day += dt.timedelta(days=1)
+    return dates
+
+
+def _round_robin(caps: np.ndarray) -> np.ndarray:
+    """Mailbox index of each of a day's sum(caps) slots, interleaved by cap.
+
+    Mailbox m takes the slots at (k + 0.5) / caps[m], so a mailbox with twice
+    the cap comes up twice as often all through the day.
+    """
+    mailbox = np.repeat(np.arange(len(caps)), caps)
+    k = np.arange(len(mailbox)) - np.repeat(np.cumsum(caps) - caps, caps)
+    position = (k + 0.5) / caps[mailbox]
+    return mailbox[np.lexsort((mailbox, position))]
+
+
+class SendPlanner:
+    """Scored leads prepared once (sorted, time zones resolved) for fast re-planning."""
+
+    def __init__(self, leads: pd.DataFrame, locations: dict = None, default_tz: str = "UTC"):
+        from locations import normalize_locations
+
+        leads = leads[leads["Email"].notna() & leads["Email"].astype(str).ne("")]
+        score = pd.to_numeric(leads[SCORE], errors="coerce").fillna(0)
+        order = np.argsort(-score.to_numpy(), kind="stable")
+        self.leads = leads.iloc[order].reset_index(drop=True)
+        location = self.leads.get("Location", pd.Series("", self.leads.index))
+        tz = normalize_locations(location, locations)["tz"].to_numpy(dtype=object)
+        tz[tz == ""] = default_tz
+        self.tz_codes, self.zones = pd.factorize(pd.Series(tz, dtype=object))
+        self.zones = list(self.zones)
+
+    def __len__(self):
+        return len(self.leads)
+
+    def _window_starts(self, dates: list, hour: int) -> tuple:
+        """(UTC window start, UTC offset) in minutes since the epoch, per zone x date."""
+        starts = np.empty((len(self.zones), len(dates)), dtype=np.int64)
+        offsets = np.empty_like(starts)
+        for z, zone in enumerate(self.zones):
+            try:
+                info = ZoneInfo(zone)
+            except (ZoneInfoNotFoundError, ValueError):
+                info = dt.timezone.utc
+            for d, date in enumerate(dates):
+                local = dt.datetime(date.year, date.month, date.day, hour, tzinfo=info)
+                offsets[z, d] = local.utcoffset() // dt.timedelta(minutes=1)
+                starts[z, d] = local.timestamp() // 60
+        return starts, offsets
+
+    def plan(
+        self,
+        mailboxes: dict,
+        dates: list,
+        window: tuple = WINDOW,
+        gap: int = GAP_MINUTES,
+    ) -> pd.DataFrame:
+        """Leads with mailbox, date and send time, for as many as fit in dates."""
+        names = list(mailboxes)
+        caps = np.array([mailboxes[m] for m in names], dtype=np.int64)
+        per_day = int(caps.sum())
+        n = min(len(self), per_day * len(dates))
+        day = np.arange(n) // per_day if per_day else np.zeros(0, dtype=np.int64)
+        zone = self.tz_codes[:n]
+
+        starts, offsets = self._window_starts(dates, window[0])
+        start = starts[zone, day]
+
+        # Deal each day's leads to the mailboxes in order of their window
+        order = np.lexsort((np.arange(n), start, day))
+        slot = np.empty(n, dtype=np.int64)
+        slot[order] = np.arange(n) - day[order] * per_day
+        mailbox = _round_robin(caps)[slot] if n else np.zeros(0, dtype=np.int64)
+
+        # Spread the leads of a zone over its window, then keep the sends of
+        # one mailbox at least gap minutes apart
+        frame = pd.DataFrame({"day": day, "zone": zone, "mailbox": mailbox, "start": start})
+        group = frame.groupby(["day", "zone"], sort=False)
+        spread = group.cumcount().to_numpy() / group["day"].transform("size").to_numpy()
+        frame["send"] = start + (spread * (window[1] - window[0]) * 60).astype(np.int64)
+        frame = frame.sort_values(["mailbox", "day", "send"], kind="stable")
+        nth = frame.groupby(["mailbox", "day"], sort=False).cumcount().to_numpy() * gap
+        earliest = pd.Series(frame["send"].to_numpy() - nth, frame.index)
+        frame["send"] = earliest.groupby([frame["mailbox"], frame["day"]]).cummax() + nth
+        frame = frame.sort_index()
+
+        send = frame["send"].to_numpy()
+        local = send + offsets[zone, day]
+        plan = self.leads.iloc[:n].copy()
+        plan.insert(0, "mailbox", np.asarray(names, dtype=object)[mailbox])
+        plan.insert(1, "date", np.asarray(dates, dtype=object)[day])
+        plan.insert(2, "send_at_utc", pd.to_datetime(send, unit="m", utc=True))
+        plan.insert(3, "local_time", pd.to_datetime(local, unit="m").strftime("%H:%M"))
+        plan.insert(4, "tz", np.asarray(self.zones, dtype=object)[zone])
+        return plan.sort_values(["mailbox", "send_at_utc"], kind="stable", ignore_index=True)
+
+
+def write_plan(plan: pd.DataFrame, output_dir: str = DEFAULT_OUTPUT_DIR) -> list:
+    """One plan_<mailbox>.csv per mailbox in output_dir (older plan files are removed)."""
+    os.makedirs(output_dir, exist_ok=True)
+    for name in os.listdir(output_dir):
+        if name.startswith(PLAN_PREFIX) and name.endswith(".csv"):
+            os.remove(os.path.join(output_dir, name))
+    paths = []
+    for mailbox, group in plan.groupby("mailbox", sort=True):
+        path = os.path.join(output_dir, f"{PLAN_PREFIX}{mailbox}.csv")
+        group.drop(columns="mailbox").to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan the sends of the scored leads per mailbox.")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="Scored leads CSV")
+    parser.add_argument(
+        "--mailbox", action="append", default=[], help="Sender address, or address:cap (repeatable)"
+    )
+    parser.add_argument("--mailboxes", help="CSV with mailbox and daily_cap columns")
+    parser.add_argument("--cap", type=int, default=DAILY_CAP, help="Default daily cap per mailbox")
+    parser.add_argument("--min-score", type=float, default=0.0, help="Skip leads scored below")
+    parser.add_argument("--days", type=int, default=5, help="Sending days to plan")
+    parser.add_argument("--start", type=dt.date.fromisoformat, help="First day (default tomorrow)")
+    parser.add_argument("--weekends", action="store_true", help="Also send on Saturday/Sunday")
+    parser.add_argument(
+        "--window", default=f"{WINDOW[0]}-{WINDOW[1]}", help="Local arrival hours, e.g. 9-12"
+    )
+    parser.add_argument("--gap", type=int, default=GAP_MINUTES, help="Minutes between sends")
+    parser.add_argument("--default-tz", default="UTC", help="Time zone of unknown locations")
+    parser.add_argument("--suppression", help="Suppression database (default: emails/)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Per-mailbox CSVs")
+    args = parser.parse_args(argv)
+
+    mailboxes = parse_mailboxes(args.mailbox, args.cap)
+    if args.mailboxes:
+        mailboxes = {**read_mailboxes(args.mailboxes, args.cap), **mailboxes}
+    if not mailboxes:
+        parser.error("give --mailbox or --mailboxes")
+    window = tuple(int(hour) for hour in args.window.split("-"))
+
+    from lead_schema import read_leads
+    from locations import load_cache, save_cache
+    from suppression import DEFAULT_DB, load_suppression
+
+    leads = read_leads(args.input)
+    leads = leads[pd.to_numeric(leads[SCORE], errors="coerce").fillna(0) >= args.min_score]
+    # Already contacted, bounced or unsubscribed people are never planned
+    suppression = load_suppression(args.suppression or DEFAULT_DB)
+    if suppression is not None:
+        leads = suppression.filter(leads)
+
+    with stage("prepare", rows_in=len(leads)):
+        locations = load_cache()
+        planner = SendPlanner(leads, locations, args.default_tz)
+        save_cache(locations)
+    start = args.start or dt.date.today() + dt.timedelta(days=1)
+    dates = send_days(start, args.days, args.weekends)
+
+    began = time.perf_counter()
+    with stage("plan", rows_in=len(planner)):
+        plan = planner.plan(mailboxes, dates, window, args.gap)
+        rows(rows_out=len(plan))
+    elapsed = time.perf_counter() - began
+
+    paths = write_plan(plan, args.output_dir)
+    summary = plan.pivot_table(
+        index="mailbox", columns="date", values="Email", aggfunc="size", fill_value=0
+    )
+    summary.columns = [str(date) for date in summary.columns]
+    print(summary.to_string())
+    print(
+        f"Planned {len(plan)} of {len(planner)} leads over {len(dates)} days"
+        f" in {elapsed * 1000:.0f} ms; {len(planner) - len(plan)} left for later"
+    )
+    print(f"Wrote {len(paths)} mailbox CSVs to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+# Persistent stargazer x repo index built from the Go fetcher's saved_state.
+#
+# Answers "who else starred X" and "top repos among stargazers with >N
+# followers" without re-running `./stargazers analyze`.
+#
+# Usage:
+#   python utils/star_index.py index --repo gregpr07/browser-use
+#   python utils/star_index.py who browser-use/workflow-use --starred gregpr07/browser-use
+#   python utils/star_index.py top --min-followers 100 --has-email
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from metrics import rows, stage
+from saved_state import list_cached_repos, load_state
+
+DEFAULT_INDEX = "stargazer_cache/star_index.npz"
+
+PROFILE_COLUMNS = [
+    "followers",
+    "following",
+    "public_repos",
+    "commits",
+    "has_email",
+    "has_company",
+]
+TIME_COLUMNS = ["starred_at", "created_at"]
+# Bumped whenever the saved arrays change; older index files are rebuilt
+FORMAT_VERSION = 2
+
+
+class StarIndex:
+    """CSR user x repo matrix with login and repo dictionaries."""
+
+    def __init__(self, logins=None, repos=None, matrix=None, profiles=None, sources=None):
+        self.logins = list(logins or [])
+        self.repos = list(repos or [])
+        self.sources = list(sources or [])
+        self.login_ids = {login: i for i, login in enumerate(self.logins)}
+        self.repo_ids = {repo: j for j, repo in enumerate(self.repos)}
+        if matrix is None:
+            matrix = sparse.csr_matrix((len(self.logins), len(self.repos)), dtype=np.uint8)
+        self.matrix = matrix
+        if profiles is None:
+            profiles = _empty_profiles()
+        self.profiles = profiles
+        self._csc = None
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    # Building
+
+    @classmethod
+    def build(cls, cache_dir: str, repos: list):
+        index = cls()
+        for repo in repos:
+            index.append_repo(cache_dir, repo)
+        return index
+
+    def append_repo(self, cache_dir: str, repo: str) -> int:
+        """Merge the saved_state of owner/repo into the index."""
+        stargazers, _ = load_state(cache_dir, repo)
+        added = self.append(stargazers, source=repo)
+        if repo not in self.sources:
+            self.sources.append(repo)
+        return added
+
+    def append(self, stargazers: list, source: str = "") -> int:
+        """Upsert stargazers; returns the number of new logins.
+
+        Logins already in the index keep their profile and get the new
+        starred repos (and source repo) OR-ed into their row.
+        """
+        rows, cols = [], []
+        new_profiles = []
+        for s in stargazers:
+            user = s.get("user") or {}
+            login = user.get("login")
+            if not login:
+                continue
+            row = self.login_ids.get(login)
+            if row is None:
+                row = len(self.logins)
+                self.login_ids[login] = row
+                self.logins.append(login)
+                new_profiles.append(_profile(s))
+
+            starred = list(s.get("starred") or [])
+            # The stargazer starred the scraped repo itself, even if it fell
+            # outside the first maxStarred entries the fetcher collected.
+            if source:
+                starred.append(source)
+            for repo in dict.fromkeys(starred):
+                col = self.repo_ids.get(repo)
+                if col is None:
+                    col = len(self.repos)
+                    self.repo_ids[repo] = col
+                    self.repos.append(repo)
+                rows.append(row)
+                cols.append(col)
+
+        shape = (len(self.logins), len(self.repos))
+        matrix = self.matrix.tocsr(copy=True)
+        matrix.resize(shape)
+        if rows:
+            update = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.uint8), (rows, cols)), shape=shape
+            )
+            matrix = matrix.maximum(update)
+        self.matrix = matrix.astype(np.uint8).tocsr()
+        self.matrix.sort_indices()
+        self._csc = None
+
+        if new_profiles:
+            frame = pd.DataFrame(new_profiles)
+            self.profiles = pd.concat([self.profiles, frame], ignore_index=True)
+        return len(new_profiles)
+
+    # Querying
+
+    def select(
+        self,
+        min_followers=None,
+        max_followers=None,
+        has_email=None,
+        has_company=None,
+        since=None,
+        until=None,
+        starred=None,
+    ) -> np.ndarray:
+        """Boolean row mask; every given filter must hold."""
+        p = self.profiles
+        mask = np.ones(len(self.logins), dtype=bool)
+        if min_followers is not None:
+            mask &= p["followers"].to_numpy() >= min_followers
+        if max_followers is not None:
+            mask &= p["followers"].to_numpy() <= max_followers
+        if has_email is not None:
+            mask &= p["has_email"].to_numpy() == has_email
+        if has_company is not None:
+            mask &= p["has_company"].to_numpy() == has_company
+        starred_at = p["starred_at"].to_numpy()
+        if since is not None:
+            mask &= starred_at >= np.datetime64(pd.Timestamp(since), "s")
+        if until is not None:
+            mask &= starred_at < np.datetime64(pd.Timestamp(until), "s")
+        if starred is not None:
+            mask &= self.starred_mask(starred)
+        return mask
+
+    def starred_mask(self, repo: str) -> np.ndarray:
+        """Boolean row mask of the logins that starred repo."""
+        mask = np.zeros(len(self.logins), dtype=bool)
+        mask[self._rows_of(repo)] = True
+        return mask
+
+    def stargazers_of(self, repo: str, mask=None) -> list:
+        """Logins that starred repo, optionally restricted to a row mask."""
+        rows = self._rows_of(repo)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        return [self.logins[i] for i in rows]
+
+    def repo_counts(self, mask=None) -> np.ndarray:
+        """Number of (masked) logins per repo column."""
+        if mask is None:
+            weights = np.ones(len(self.logins), dtype=np.int64)
+        else:
+            weights = np.asarray(mask, dtype=np.int64)
+        return np.asarray(self.matrix.T @ weights).ravel()
+
+    def top_repos(self, mask=None, n=50, exclude=()) -> pd.DataFrame:
+        """Most starred repos among the (masked) logins."""
+        counts = self.repo_counts(mask)
+        for repo in exclude:
+            if repo in self.repo_ids:
+                counts[self.repo_ids[repo]] = 0
+        n = min(n, int(np.count_nonzero(counts)))
+        if n == 0:
+            return pd.DataFrame({"Repository": [], "Count": []})
+        top = np.argpartition(-counts, n - 1)[:n]
+        top = top[np.argsort(-counts[top], kind="stable")]
+        return pd.DataFrame(
+            {"Repository": [self.repos[j] for j in top], "Count": counts[top]}
+        )
+
+    def _rows_of(self, repo: str) -> np.ndarray:
+        col = self.repo_ids.get(repo)
+        if col is None:
+            return np.array([], dtype=np.int64)
+        if self._csc is None:
+            self._csc = self.matrix.tocsc()
+            self._csc.sort_indices()
+        csc = self._csc
+        return csc.indices[csc.indptr[col] : csc.indptr[col + 1]]
+
+    # Persistence
+
+    def save(self, path: str = DEFAULT_INDEX):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {
+            "indptr": self.matrix.indptr,
+            "indices": self.matrix.indices,
+            "shape": np.array(self.matrix.shape),
+            "logins": np.array(self.logins, dtype=str),
+            "repos": np.array(self.repos, dtype=str),
+            "sources": np.array(self.sources, dtype=str),
+            "version": np.array(FORMAT_VERSION),
+        }
+        for column in PROFILE_COLUMNS:
+            arrays[column] = self.profiles[column].to_numpy()
+        for column in TIME_COLUMNS:
+            arrays[column] = self.profiles[column].to_numpy("datetime64[s]")
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX, cache_dir: str = "./stargazer_cache"):
+        """The saved index; one in an older format is rebuilt from its source repos."""
+        with np.load(path) as data:
+            version = int(data["version"]) if "version" in data else 1
+            if version != FORMAT_VERSION:
+                sources = data["sources"].tolist()
+        if version != FORMAT_VERSION:
+            print(f"{path} is index format {version}, rebuilding", file=sys.stderr)
+            cached = set(list_cached_repos(cache_dir))
+            index = cls.build(cache_dir, [repo for repo in sources if repo in cached])
+            index.save(path)
+            return index
+        with np.load(path) as data:
+            shape = tuple(data["shape"])
+            indices = data["indices"]
+            matrix = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.uint8), indices, data["indptr"]),
+                shape=shape,
+            )
+            profiles = pd.DataFrame(
+                {column: data[column] for column in PROFILE_COLUMNS + TIME_COLUMNS}
+            )
+            return cls(
+                logins=data["logins"].tolist(),
+                repos=data["repos"].tolist(),
+                matrix=matrix,
+                profiles=profiles,
+                sources=data["sources"].tolist(),
+            )
+
+
+def _profile(stargazer: dict) -> dict:
+    user = stargazer.get("user") or {}
+    contributions = stargazer.get("contributions") or {}
+    return {
+        "followers": int(user.get("followers") or 0),
+        "following": int(user.get("following") or 0),
+        "public_repos": int(user.get("public_repos") or 0),
+        "commits": sum(int(c.get("commits") or 0) for c in contributions.values()),
+        "has_email": bool(user.get("email")),
+        "has_company": bool(user.get("company")),
+        "starred_at": _parse_time(stargazer.get("starred_at")),
+        "created_at": _parse_time(user.get("created_at")),
+    }
+
+
+def _parse_time(value):
+    if not value:
+        return np.datetime64("NaT", "s")
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return np.datetime64(ts, "s")
+
+
+def _empty_profiles() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "followers": pd.Series(dtype="int64"),
+            "following": pd.Series(dtype="int64"),
+            "public_repos": pd.Series(dtype="int64"),
+            "commits": pd.Series(dtype="int64"),
+            "has_email": pd.Series(dtype="bool"),
+            "has_company": pd.Series(dtype="bool"),
+            "starred_at": pd.Series(dtype="datetime64[s]"),
+            "created_at": pd.Series(dtype="datetime64[s]"),
+        }
+    )
+
+
+def _filter_args(parser):
+    parser.add_argument("--min-followers", type=int)
+    parser.add_argument("--max-followers", type=int)
+    parser.add_argument("--has-email", action="store_true", default=None)
+    parser.add_argument("--has-company", action="store_true", default=None)
+    parser.add_argument("--since", help="Only stargazers who starred on/after this date")
+    parser.add_argument("--until", help="Only stargazers who starred before this date")
+    parser.add_argument("--starred", help="Only stargazers who also starred owner/repo")
+
+
+def _mask(index: StarIndex, args):
+    return index.select(
+        min_followers=args.min_followers,
+        max_followers=args.max_followers,
+        has_email=args.has_email,
+        has_company=args.has_company,
+        since=args.since,
+        until=args.until,
+        starred=args.starred,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stargazer x repo index queries.")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("index", help="Build or incrementally update the index")
+    build.add_argument("--cache", default="./stargazer_cache", help="Cache directory")
+    build.add_argument(
+        "--repo", action="append", help="owner/repo to add (default: all cached)"
+    )
+    build.add_argument("--rebuild", action="store_true", help="Ignore existing index")
+
+    who = sub.add_parser("who", help="Stargazers who starred a repo")
+    who.add_argument("repo", help="owner/repo")
+    _filter_args(who)
+
+    top = sub.add_parser("top", help="Top repos among filtered stargazers")
+    top.add_argument("-n", type=int, default=50)
+    _filter_args(top)
+
+    args = parser.parse_args()
+
+    if args.command == "index":
+        if os.path.exists(args.index) and not args.rebuild:
+            index = StarIndex.load(args.index, args.cache)
+        else:
+            index = StarIndex()
+        repos = args.repo or list_cached_repos(args.cache)
+        with stage("index", rows_in=index.shape[0]):
+            for repo in repos:
+                added = index.append_repo(args.cache, repo)
+                print(f"{repo}: {added} new stargazers")
+            rows(rows_out=index.shape[0])
+        with stage("save"):
+            index.save(args.index)
+        print(f"Saved {index.shape[0]} stargazers x {index.shape[1]} repos to {args.index}")
+        return
+
+    if not os.path.exists(args.index):
+        sys.exit(f"No index at {args.index}; run `index` first")
+    index = StarIndex.load(args.index)
+    start = time.perf_counter()
+    mask = _mask(index, args)
+    if args.command == "who":
+        result = index.stargazers_of(args.repo, mask)
+        print("\n".join(result))
+        print(f"\n{len(result)} stargazers", file=sys.stderr)
+    else:
+        exclude = [args.starred] if args.starred else []
+        result = index.top_repos(mask, n=args.n, exclude=exclude)
+        print(result.to_string(index=False))
+    print(f"Query took {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# Star velocity, acceleration and spike detection for many repos at once.
+#
+# Starred-at timestamps of every repo are binned into one aligned
+# repos x periods count matrix at any pandas frequency (h, D, W, M, ...).
+# Rolling metrics are then computed for all repos together with cumulative
+# sums along the time axis.
+#
+# Usage:
+#   python utils/star_trends.py --freq=D --window=7
+#   python utils/star_trends.py --repo=gregpr07/browser-use --repo=openai/codex --freq=W
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+from saved_state import list_cached_repos, load_state
+
+
+def load_star_times(cache_dir: str, repos: list) -> dict:
+    """Map owner/repo to its sorted starred-at timestamps (datetime64[s]).
+
+    Reads saved_state, falling back to the daily counts of the Go
+    tool's cumulative_stars.csv when there is no saved state.
+    """
+    times = {}
+    for repo in repos:
+        if os.path.exists(os.path.join(cache_dir, repo, "saved_state")):
+            stargazers, _ = load_state(cache_dir, repo)
+            stamps = pd.to_datetime(
+                [s.get("starred_at") for s in stargazers], utc=True, errors="coerce"
+            )
+            values = stamps.dropna().tz_convert(None).to_numpy("datetime64[s]")
+        else:
+            daily = pd.read_csv(os.path.join(cache_dir, repo, "cumulative_stars.csv"))
+            days = pd.to_datetime(daily["Date"], format="%m/%d/%Y").to_numpy(
+                "datetime64[s]"
+            )
+            values = np.repeat(days, daily["New"].to_numpy())
+        times[repo] = np.sort(values)
+    return times
+
+
+class StarTrends:
+    """Aligned repos x periods star counts with rolling metrics."""
+
+    def __init__(self, repos: list, periods: pd.DatetimeIndex, counts, baseline):
+        self.repos = list(repos)
+        self.periods = periods
+        self.counts = counts  # new stars per repo and period
+        self.baseline = baseline  # stars before the first period
+
+    @classmethod
+    def from_times(cls, times: dict, freq="D", start=None, end=None):
+        """Bin timestamps of every repo into one count matrix."""
+        repos = list(times)
+        lengths = np.array([len(times[r]) for r in repos], dtype=np.int64)
+        stamps = (
+            np.concatenate([times[r] for r in repos])
+            if repos
+            else np.array([], dtype="datetime64[s]")
+        )
+        repo_ids = np.repeat(np.arange(len(repos)), lengths)
+
+        start = pd.Timestamp(start) if start is not None else pd.Timestamp(stamps.min())
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp(stamps.max())
+        periods = pd.period_range(start=start, end=end, freq=freq)
+        edges = np.append(
+            periods.start_time.to_numpy("datetime64[s]"),
+            (periods[-1] + 1).start_time.to_numpy().astype("datetime64[s]"),
+        )
+
+        bins = np.searchsorted(edges, stamps, side="right") - 1
+        n_periods = len(periods)
+        before = bins < 0
+        inside = ~before & (bins < n_periods)
+
+        baseline = np.bincount(repo_ids[before], minlength=len(repos))
+        flat = repo_ids[inside] * n_periods + bins[inside]
+        counts = np.bincount(flat, minlength=len(repos) * n_periods).reshape(
+            len(repos), n_periods
+        )
+        return cls(repos, periods.start_time, counts, baseline)
+
+    def cumulative(self) -> np.ndarray:
+        return self.baseline[:, None] + np.cumsum(self.counts, axis=1)
+
+    def velocity(self, window=7) -> np.ndarray:
+        """Mean new stars per period over the trailing window (inclusive)."""
+        sums, n = _trailing(self.counts, window, include_current=True)
+        return sums / n
+
+    def acceleration(self, window=7) -> np.ndarray:
+        """Change in velocity from one period to the next."""
+        v = self.velocity(window)
+        return np.diff(v, axis=1, prepend=v[:, :1])
+
+    def zscores(self, window=28) -> np.ndarray:
+        """How far each period is above the preceding window, in std devs."""
+        counts = self.counts.astype(np.float64)
+        sums, n = _trailing(counts, window, include_current=False)
+        squares, _ = _trailing(counts**2, window, include_current=False)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sums / n
+            std = np.sqrt(np.maximum(squares / n - mean**2, 0.0))
+            # A flat history has zero spread; measure against one star instead
+            z = (counts - mean) / np.maximum(std, 1.0)
+        z[:, 0] = 0.0
+        return z
+
+    def anomalies(self, window=28, threshold=3.0, min_stars=10) -> pd.DataFrame:
+        """Spikes: periods whose z-score and star count exceed the limits."""
+        z = self.zscores(window)
+        hits = (z >= threshold) & (self.counts >= min_stars)
+        rows, cols = np.nonzero(hits)
+        return pd.DataFrame(
+            {
+                "Repository": [self.repos[i] for i in rows],
+                "Date": self.periods[cols],
+                "New": self.counts[rows, cols],
+                "ZScore": np.round(z[rows, cols], 2),
+            }
+        )
+
+    def to_frame(self, window=7) -> pd.DataFrame:
+        """Long table of every metric per repo and period."""
+        n_repos, n_periods = self.counts.shape
+        return pd.DataFrame(
+            {
+                "Repository": np.repeat(self.repos, n_periods),
+                "Date": np.tile(self.periods, n_repos),
+                "New": self.counts.ravel(),
+                "Cumulative": self.cumulative().ravel(),
+                "Velocity": np.round(self.velocity(window).ravel(), 3),
+                "Acceleration": np.round(self.acceleration(window).ravel(), 3),
+            }
+        )
+
+    def summary(self, window=7, anomaly_window=28, threshold=3.0) -> pd.DataFrame:
+        """Latest velocity and acceleration plus spike count per repo."""
+        spikes = self.anomalies(anomaly_window, threshold)["Repository"].value_counts()
+        return pd.DataFrame(
+            {
+                "Repository": self.repos,
+                "Stars": self.cumulative()[:, -1],
+                "Velocity": np.round(self.velocity(window)[:, -1], 2),
+                "Acceleration": np.round(self.acceleration(window)[:, -1], 2),
+                "Spikes": [int(spikes.get(r, 0)) for r in self.repos],
+            }
+        ).sort_values("Velocity", ascending=False, ignore_index=True)
+
+
+def _trailing(values, window: int, include_current: bool):
+    """Sums and sample sizes of a trailing window along the time axis."""
+    n_periods = values.shape[1]
+    padded = np.zeros((values.shape[0], n_periods + 1), dtype=np.float64)
+    np.cumsum(values, axis=1, out=padded[:, 1:])
+    stop = np.arange(n_periods) + (1 if include_current else 0)
+    begin = np.maximum(stop - window, 0)
+    sums = padded[:, stop] - padded[:, begin]
+    n = np.maximum(stop - begin, 1)
+    return sums, n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Star trends across many repos.")
+    parser.add_argument("--cache", default="./stargazer_cache", help="Cache directory")
+    parser.add_argument(
+        "--repo", action="append", help="owner/repo to include (default: all cached)"
+    )
+    parser.add_argument("--freq", default="D", help="Resampling frequency (h, D, W, M)")
+    parser.add_argument("--start", help="First period (default: first star)")
+    parser.add_argument("--end", help="Last period (default: last star)")
+    parser.add_argument("--window", type=int, default=7, help="Velocity window in periods")
+    parser.add_argument(
+        "--anomaly-window", type=int, default=28, help="History used for spike detection"
+    )
+    parser.add_argument("--threshold", type=float, default=3.0, help="Spike z-score")
+    parser.add_argument("--output", default="output", help="Output folder")
+    args = parser.parse_args()
+
+    repos = args.repo or list_cached_repos(args.cache)
+    with stage("load", rows_in=len(repos)):
+        times = load_star_times(args.cache, repos)
+
+    start = time.perf_counter()
+    with stage("trends"):
+        trends = StarTrends.from_times(times, args.freq, args.start, args.end)
+        frame = trends.to_frame(args.window)
+        spikes = trends.anomalies(args.anomaly_window, args.threshold)
+        summary = trends.summary(args.window, args.anomaly_window, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.output, exist_ok=True)
+    frame.to_csv(f"{args.output}/star_trends.csv", index=False)
+    spikes.to_csv(f"{args.output}/star_spikes.csv", index=False)
+    print(summary.to_string(index=False))
+    print(
+        f"\n{len(repos)} repos x {len(trends.periods)} periods computed in {elapsed:.3f}s;"
+        f" wrote {args.output}/star_trends.csv and star_spikes.csv"
+    )
+
+
+if __name__ == "__main__":
+    main()
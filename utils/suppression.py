@@ -0,0 +1,346 @@
+# Suppression list: people who must not get another email.
+#
+# Contacted, bounced and unsubscribed emails and logins are kept in SQLite
+# (emails/suppression.sqlite), the exact record of who was excluded and why.
+# A Bloom filter over the same keys sits in front of it: lead files are
+# checked in one vectorized pass of hashes and bit lookups, and only the few
+# rows the filter flags are looked up in SQLite, so millions of candidates
+# take seconds and the list itself never has to be loaded. The filter is
+# cached in emails/suppression.bloom.npz and rebuilt when the table changed
+# behind its back. create_personlized_message.py drops suppressed leads before
+# scoring and from its output.
+#
+# Usage:
+#   python utils/suppression.py add contacted emails/all_competitors_with_intros_high.csv
+#   python utils/suppression.py add unsubscribed jane@example.com --source=reply
+#   python utils/suppression.py filter emails/all_competitors_with_intros_high.csv --output=send.csv
+#   python utils/suppression.py stats
+import argparse
+import math
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import count, rows, stage
+
+DEFAULT_DB = "emails/suppression.sqlite"
+KINDS = ("contacted", "bounced", "unsubscribed")
+ERROR_RATE = 0.001
+# SQLite's limit on bound parameters is 999 in older builds
+QUERY_CHUNK = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppressed (
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT,
+    added REAL NOT NULL,
+    PRIMARY KEY (key, kind)
+);
+"""
+
+
+def hash_keys(keys) -> np.ndarray:
+    """64-bit hash of every key, vectorized."""
+    return pd.util.hash_array(np.asarray(keys, dtype=object), categorize=False)
+
+
+class BloomFilter:
+    """Bit array with k probes per key (double hashing of one 64-bit hash)."""
+
+    def __init__(self, bits: np.ndarray, probes: int, capacity: int):
+        self.bits = bits
+        self.probes = probes
+        self.capacity = capacity
+        self.mask = np.uint64(len(bits) * 8 - 1)
+
+    @classmethod
+    def sized(cls, capacity: int, error_rate: float = ERROR_RATE):
+        capacity = max(capacity, 1024)
+        size = -capacity * math.log(error_rate) / math.log(2) ** 2
+        # Power of two bits, so positions are a mask instead of a modulo
+        size = 1 << max(math.ceil(math.log2(size)), 6)
+        probes = max(1, round(size / capacity * math.log(2)))
+        return cls(np.zeros(size // 8, dtype=np.uint8), probes, capacity)
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.probes, dtype=np.uint64)
+        return (low[:, None] + steps * high[:, None]) & self.mask
+
+    def add(self, hashes: np.ndarray):
+        positions = self._positions(hashes).ravel()
+        offsets = (positions & np.uint64(7)).astype(np.uint8)
+        flags = np.left_shift(1, offsets, dtype=np.uint8)
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), flags)
+
+    def contains(self, hashes: np.ndarray, block: int = 1 << 20) -> np.ndarray:
+        found = np.empty(len(hashes), dtype=bool)
+        for start in range(0, len(hashes), block):
+            positions = self._positions(hashes[start : start + block])
+            offsets = (positions & np.uint64(7)).astype(np.uint8)
+            set_bits = self.bits[positions >> np.uint64(3)] >> offsets
+            found[start : start + block] = (set_bits & 1).all(axis=1)
+        return found
+
+
+def email_keys(emails: pd.Series) -> pd.Series:
+    """Canonical key of each email (so +tags and gmail dots match), "" if invalid."""
+    from email_normalize import normalize_emails
+
+    keys = normalize_emails(emails)["EmailKey"].astype(object).fillna("")
+    return ("email:" + keys).where(keys != "", "")
+
+
+def login_keys(logins: pd.Series) -> pd.Series:
+    logins = logins.astype(object).where(logins.notna(), "").astype(str).str.strip().str.lower()
+    return ("login:" + logins).where(logins != "", "")
+
+
+class SuppressionList:
+    """Exact set of suppressed keys in SQLite with a Bloom filter in front."""
+
+    def __init__(self, path: str = DEFAULT_DB, error_rate: float = ERROR_RATE):
+        self.path = path
+        self.bloom_path = os.path.splitext(path)[0] + ".bloom.npz"
+        self.error_rate = error_rate
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript(SCHEMA)
+        self.bloom = self._load_bloom()
+
+    def __len__(self):
+        return self.db.execute("SELECT count(DISTINCT key) FROM suppressed").fetchone()[0]
+
+    # Bloom filter
+
+    def _stamp(self) -> list:
+        # Changes by another process show up in the row count or max rowid
+        query = "SELECT count(*), coalesce(max(rowid), 0) FROM suppressed"
+        return list(self.db.execute(query).fetchone())
+
+    def _load_bloom(self) -> BloomFilter:
+        if os.path.exists(self.bloom_path):
+            with np.load(self.bloom_path) as data:
+                if data["stamp"].tolist() == self._stamp():
+                    return BloomFilter(data["bits"], int(data["probes"]), int(data["capacity"]))
+        return self._rebuild_bloom()
+
+    def _rebuild_bloom(self, capacity: int = 0) -> BloomFilter:
+        keys = [key for (key,) in self.db.execute("SELECT DISTINCT key FROM suppressed")]
+        bloom = BloomFilter.sized(max(capacity, 2 * len(keys)), self.error_rate)
+        bloom.add(hash_keys(keys))
+        count("suppression_bloom_rebuilds")
+        self.bloom = bloom
+        self._save_bloom()
+        return bloom
+
+    def _save_bloom(self):
+        tmp = f"{self.bloom_path}.tmp.npz"
+        np.savez(
+            tmp,
+            bits=self.bloom.bits,
+            probes=self.bloom.probes,
+            capacity=self.bloom.capacity,
+            stamp=np.array(self._stamp()),
+        )
+        os.replace(tmp, self.bloom_path)
+
+    # Changing the list
+
+    def add(self, keys, kind: str, source: str = "") -> int:
+        """Suppress keys (from email_keys/login_keys); returns the new ones."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r}; use one of {', '.join(KINDS)}")
+        keys = [key for key in dict.fromkeys(keys) if key]
+        before = self.db.total_changes
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO suppressed (key, kind, source, added) VALUES (?, ?, ?, ?)",
+                ((key, kind, source, now) for key in keys),
+            )
+        added = self.db.total_changes - before
+        if len(self) > self.bloom.capacity:
+            self._rebuild_bloom(2 * len(self))
+        else:
+            self.bloom.add(hash_keys(keys))
+            self._save_bloom()
+        return added
+
+    def remove(self, keys, kind: str = None) -> int:
+        """Take keys off the list (of one kind only if given)."""
+        keys = [key for key in dict.fromkeys(keys) if key]
+        before = self.db.total_changes
+        with self.db:
+            for start in range(0, len(keys), QUERY_CHUNK):
+                chunk = keys[start : start + QUERY_CHUNK]
+                query = f"DELETE FROM suppressed WHERE key IN ({','.join('?' * len(chunk))})"
+                if kind:
+                    self.db.execute(query + " AND kind = ?", chunk + [kind])
+                else:
+                    self.db.execute(query, chunk)
+        # A Bloom filter cannot forget keys
+        self._rebuild_bloom(self.bloom.capacity)
+        return self.db.total_changes - before
+
+    # Lookups
+
+    def _lookup(self, keys: list, kinds=None) -> set:
+        """The keys that are in the table (with one of kinds, if given)."""
+        found = set()
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start : start + QUERY_CHUNK]
+            query = "SELECT DISTINCT key FROM suppressed WHERE key IN "
+            query += f"({','.join('?' * len(chunk))})"
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            found.update(key for (key,) in self.db.execute(query, chunk + list(kinds or [])))
+        return found
+
+    def contains(self, keys, kinds=None) -> np.ndarray:
+        """Which keys are suppressed; each distinct key is checked once."""
+        codes, uniques = pd.factorize(pd.Series(keys, dtype=object))
+        return np.append(self._contains_distinct(uniques, kinds), False)[codes]
+
+    def _contains_distinct(self, keys, kinds=None) -> np.ndarray:
+        keys = np.asarray(keys, dtype=object)
+        candidates = self.bloom.contains(hash_keys(keys)) & (keys != "")
+        found = self._lookup(keys[candidates].tolist(), kinds)
+        count("suppression_bloom_hits", int(candidates.sum()))
+        count("suppression_false_positives", int(candidates.sum()) - len(found))
+        suppressed = np.zeros(len(keys), dtype=bool)
+        suppressed[candidates] = [key in found for key in keys[candidates]]
+        return suppressed
+
+    def mask(self, leads: pd.DataFrame, kinds=None) -> np.ndarray:
+        """Rows of leads whose email or login is suppressed."""
+        columns = []
+        if "EmailKey" in leads.columns:
+            columns.append((leads["EmailKey"], lambda keys: "email:" + keys))
+        elif "Email" in leads.columns:
+            columns.append((leads["Email"], email_keys))
+        if "Login" in leads.columns:
+            columns.append((leads["Login"], login_keys))
+        suppressed = np.zeros(len(leads), dtype=bool)
+        for values, to_keys in columns:
+            # Keys are built for the distinct values only; missing ones are -1
+            codes, uniques = pd.factorize(values.astype(object))
+            keys = to_keys(pd.Series(uniques, dtype=object))
+            suppressed |= np.append(self._contains_distinct(keys, kinds), False)[codes]
+        return suppressed
+
+    def filter(self, leads: pd.DataFrame, kinds=None) -> pd.DataFrame:
+        """leads without the suppressed rows."""
+        with stage("suppress", rows_in=len(leads)):
+            suppressed = self.mask(leads, kinds)
+            rows(rows_out=int((~suppressed).sum()))
+        count("suppressed_rows", int(suppressed.sum()))
+        return leads[~suppressed]
+
+    def stats(self) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT kind, count(*) AS keys, sum(key LIKE 'email:%') AS emails,"
+            " sum(key LIKE 'login:%') AS logins, datetime(max(added), 'unixepoch') AS last_added"
+            " FROM suppressed GROUP BY kind ORDER BY kind",
+            self.db,
+        )
+
+    def close(self):
+        self.db.close()
+
+
+def load_suppression(path: str = DEFAULT_DB):
+    """The suppression list at path, or None if nobody was suppressed yet."""
+    return SuppressionList(path) if os.path.exists(path) else None
+
+
+def keys_from_values(values: list) -> list:
+    """Keys of command-line values: emails have an @, anything else is a login."""
+    values = pd.Series(values, dtype=object)
+    is_email = values.str.contains("@", regex=False)
+    return email_keys(values[is_email]).tolist() + login_keys(values[~is_email]).tolist()
+
+
+def keys_from_csv(path: str) -> list:
+    """Keys of the email and login columns of a CSV (any capitalization)."""
+    df = pd.read_csv(path, dtype=str)
+    columns = {c.lower(): c for c in df.columns}
+    keys = []
+    if "email" in columns:
+        keys += email_keys(df[columns["email"]]).tolist()
+    if "login" in columns:
+        keys += login_keys(df[columns["login"]]).tolist()
+    if not keys:
+        raise ValueError(f"{path} has no Email or Login column")
+    return keys
+
+
+def _keys(items: list) -> list:
+    keys = []
+    values = []
+    for item in items:
+        if item.endswith(".csv") and os.path.exists(item):
+            keys += keys_from_csv(item)
+        else:
+            values.append(item)
+    return keys + (keys_from_values(values) if values else [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contacted, bounced and unsubscribed leads.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Suppression database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Suppress emails/logins, or the leads of CSV files")
+    add.add_argument("kind", choices=KINDS)
+    add.add_argument("items", nargs="+", help="Emails, logins or CSV files")
+    add.add_argument("--source", default="", help="Campaign or file the keys came from")
+
+    remove = commands.add_parser("remove", help="Take emails/logins off the list")
+    remove.add_argument("items", nargs="+", help="Emails, logins or CSV files")
+    remove.add_argument("--kind", choices=KINDS, help="Only this kind")
+
+    filter_ = commands.add_parser("filter", help="Drop the suppressed rows of a lead CSV")
+    filter_.add_argument("input", help="Lead CSV")
+    filter_.add_argument("--output", help="Output CSV (default: overwrite input)")
+    filter_.add_argument("--kind", action="append", choices=KINDS, help="Only these kinds")
+
+    commands.add_parser("stats", help="Suppressed keys per kind")
+    args = parser.parse_args(argv)
+
+    suppression = SuppressionList(args.db)
+    if args.command == "add":
+        source = args.source or ",".join(i for i in args.items if i.endswith(".csv"))
+        added = suppression.add(_keys(args.items), args.kind, source)
+        print(f"Added {added} {args.kind} keys ({len(suppression)} suppressed)")
+    elif args.command == "remove":
+        removed = suppression.remove(_keys(args.items), args.kind)
+        print(f"Removed {removed} entries ({len(suppression)} suppressed)")
+    elif args.command == "filter":
+        from lead_schema import read_leads
+
+        leads = read_leads(args.input)
+        start = time.perf_counter()
+        kept = suppression.filter(leads, args.kind)
+        elapsed = time.perf_counter() - start
+        output = args.output or args.input
+        kept.to_csv(output, index=False)
+        print(
+            f"Dropped {len(leads) - len(kept)} of {len(leads)} rows in {elapsed:.2f}s;"
+            f" wrote {len(kept)} to {output}"
+        )
+    else:
+        print(suppression.stats().to_string(index=False))
+        bloom = suppression.bloom
+        kib = len(bloom.bits) // 1024
+        print(f"{len(suppression)} keys; Bloom filter {kib} KiB, {bloom.probes} probes")
+    suppression.close()
+
+
+if __name__ == "__main__":
+    main()